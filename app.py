@@ -2,46 +2,220 @@
 Applicazione Flask principale per gestione interrogazioni programmate
 Fornisce API REST per gestione studenti e calendario interrogazioni
 """
-# Usa PyMySQL al posto di mysqlclient su Windows
-import pymysql
-pymysql.install_as_MySQLdb()
-
-from flask import Flask, render_template, request, jsonify, send_file, make_response
+from flask import Blueprint, Flask, Response, current_app, render_template, request, jsonify, send_file, make_response
 from flask_cors import CORS
+from sqlalchemy import case, literal, update
+from sqlalchemy.orm import joinedload
 from werkzeug.utils import secure_filename
 import os
 import json
+import importlib
 import csv
+import hashlib
 import random
+import threading
+import time
 from datetime import datetime
-from io import StringIO
-from reportlab.lib.pagesizes import A4, letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.units import cm
+from io import StringIO, BytesIO
 
 # Import moduli personalizzati
-from app.models import db, Student, Interrogation, CalendarConfiguration
+from app.models import db, Student, Interrogation, CalendarConfiguration, InterrogationChange
+from app.serializers import InterrogationProjection
 from config.config import get_config
-from utils.database_manager import TinyDBManager
 from utils.ai_advisor import AIAdvisor
+from utils.export_store import ExportStore
+from utils.compression import ResponseCompressor
+from utils.pagination import paginate_keyset, DEFAULT_PAGE_SIZE
+from utils.json_provider import FastJSONProvider, dumps as json_dumps
+from utils.events import EventBroker
+from utils.analysis_cache import AnalysisCache
+from utils.metrics import RequestMetrics
+from utils.query_inspector import NPlusOneDetector
+from utils.profiling import RequestProfiler, TOKEN_HEADER
+from utils.sqlite import configure_sqlite, is_sqlite_uri
+from utils.calendar_search import layout_calendar, search_calendar
+from utils.helpers import chunk_list
+from utils.exporters import (
+    RENDERERS, interrogation_row, render_export, render_student_agenda,
+    process_pool, stream_zip
+)
+
+# Route dell'applicazione, registrate da create_app
+bp = Blueprint('main', __name__)
+
+# Moduli pesanti importati solo al primo utilizzo (vedi preload_modules)
+LAZY_MODULES = (
+    'reportlab.platypus',
+    'reportlab.lib.styles',
+    'reportlab.lib.colors',
+    'utils.database_manager'
+)
+
+# Senza stato: condiviso da tutte le applicazioni del processo. I gestori con
+# stato sono creati da create_app per ogni applicazione (app.extensions)
+ai_advisor = AIAdvisor()
 
-# Inizializza Flask app
-app = Flask(__name__)
-app.config.from_object(get_config())
+# Protegge la creazione pigra del gestore TinyDB (get_tinydb_manager)
+_tinydb_manager_lock = threading.Lock()
 
-# Inizializza estensioni
-CORS(app)
-db.init_app(app)
 
-# Inizializza gestori
-tinydb_manager = TinyDBManager(app.config['TINYDB_PATH'])
-ai_advisor = AIAdvisor()
+def create_app(config_name=None):
+    """
+    Crea e configura l'applicazione Flask
+
+    Args:
+        config_name (str, optional): Nome della configurazione (development, production);
+                                     default dalla variabile FLASK_CONFIG
+
+    Returns:
+        Flask: Applicazione pronta per il server WSGI
+    """
+    app = Flask(__name__)
+    app.config.from_object(get_config(config_name or os.getenv('FLASK_CONFIG', 'default')))
+    app.json = FastJSONProvider(app)
+
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('mysql://'):
+        # Usa PyMySQL al posto di mysqlclient su Windows (importato solo con MySQL)
+        import pymysql
+        pymysql.install_as_MySQLdb()
+
+    # Inizializza estensioni (profilatore e metriche per primi: includono anche gli altri hook)
+    app.extensions['profiler'] = RequestProfiler(app)
+    app.extensions['metrics'] = RequestMetrics(app)
+    NPlusOneDetector(app)
+    CORS(app)
+    db.init_app(app)
+    
+    if is_sqlite_uri(app.config['SQLALCHEMY_DATABASE_URI']):
+        # WAL e PRAGMA su ogni connessione; la cartella del file deve esistere
+        if app.config['DB_BACKEND'] == 'sqlite':
+            os.makedirs(os.path.dirname(os.path.abspath(app.config['SQLITE_PATH'])), exist_ok=True)
+        with app.app_context():
+            configure_sqlite(db.engine, app.config['SQLITE_BUSY_TIMEOUT'])
+    
+    ResponseCompressor(app)
+
+    # Inizializza gestori dell'applicazione (TinyDB viene aperto al primo utilizzo).
+    # Con il preload (gunicorn.conf.py) sono creati una volta nel master e i
+    # worker li ereditano con il fork, condividendo le pagine in copy-on-write
+    app.extensions['tinydb_manager'] = None
+    app.extensions['export_store'] = ExportStore(app.config['EXPORT_FOLDER'], app.config['EXPORT_MAX_BYTES'])
+    app.extensions['calendar_events'] = EventBroker(
+        app.config['EVENTS_QUEUE_SIZE'],
+        app.config['EVENTS_HEARTBEAT'],
+        app.config['EVENTS_MAX_CONNECTIONS'],
+        app.config['EVENTS_MAX_LIFETIME']
+    )
+    app.extensions['analysis_cache'] = AnalysisCache()
+
+    # Crea directory necessarie
+    os.makedirs('uploads', exist_ok=True)
+
+    app.register_blueprint(bp)
+    return app
+
+
+def get_tinydb_manager():
+    """
+    Restituisce il gestore TinyDB, creandolo al primo utilizzo
+
+    TinyDB viene importato e il file aperto solo quando una richiesta ne ha
+    bisogno, non all'avvio dei worker.
+
+    Returns:
+        TinyDBManager: Gestore del database locale
+    """
+    if current_app.extensions['tinydb_manager'] is None:
+        # Con i worker gthread due richieste possono arrivare qui insieme
+        with _tinydb_manager_lock:
+            if current_app.extensions['tinydb_manager'] is None:
+                from utils.database_manager import TinyDBManager
+                current_app.extensions['tinydb_manager'] = TinyDBManager(current_app.config['TINYDB_PATH'])
+    return current_app.extensions['tinydb_manager']
+
+
+def get_export_store():
+    """
+    Restituisce la cache dei file esportati dell'applicazione corrente
+
+    Returns:
+        ExportStore: Cache delle esportazioni
+    """
+    return current_app.extensions['export_store']
+
+
+def get_calendar_events():
+    """
+    Restituisce il broker delle notifiche dell'applicazione corrente
+
+    Returns:
+        EventBroker: Broker degli eventi SSE
+    """
+    return current_app.extensions['calendar_events']
+
+
+def get_analysis_cache():
+    """
+    Restituisce la cache delle analisi AI dell'applicazione corrente
 
-# Crea directory necessarie
-os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
-os.makedirs('uploads', exist_ok=True)
+    Returns:
+        AnalysisCache: Cache delle analisi
+    """
+    return current_app.extensions['analysis_cache']
+
+
+def preload_modules():
+    """
+    Importa subito i moduli che altrimenti sono caricati al primo utilizzo
+
+    Usato dal master di gunicorn con il preload: i worker creati con il fork
+    trovano i moduli già in memoria e li condividono in copy-on-write.
+
+    Returns:
+        None
+    """
+    for name in LAZY_MODULES:
+        importlib.import_module(name)
+
+
+def init_database(app):
+    """
+    Crea tabelle e indici se non esistono (se il database è disponibile)
+
+    Args:
+        app (Flask): Applicazione creata da create_app
+
+    Returns:
+        bool: True se il database è raggiungibile
+    """
+    backend = 'SQLite' if is_sqlite_uri(app.config['SQLALCHEMY_DATABASE_URI']) else 'MySQL'
+    with app.app_context():
+        try:
+            db.create_all()
+            print(f"✓ Database {backend} connesso e tabelle create")
+            return True
+        except Exception as e:
+            print(f"⚠ {backend} non disponibile: {e}")
+            print("✓ L'applicazione funzionerà solo con TinyDB")
+            return False
+
+
+def init_worker(app):
+    """
+    Prepara un processo worker appena creato con il fork dal master
+
+    Le connessioni al database aperte nel master (es. da init_database) non
+    possono essere condivise tra processi: il worker le abbandona senza
+    chiuderle, così il master e gli altri worker non ne risentono.
+
+    Args:
+        app (Flask): Applicazione caricata nel master
+
+    Returns:
+        None
+    """
+    with app.app_context():
+        db.engine.dispose(close=False)
 
 
 # ==================== UTILITY FUNCTIONS ====================
@@ -57,142 +231,359 @@ def allowed_file(filename):
         bool: True se permesso
     """
     return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
 
 def generate_pdf_calendar(filepath, materia, interrogations):
     """
     Genera un file PDF con il calendario delle interrogazioni
     
+    Il layout è quello di utils.exporters.render_pdf, usato anche dagli
+    export per materia e dai pacchetti ZIP.
+    
     Args:
-        filepath (str): Percorso del file PDF da creare
+        filepath (str|file): Percorso del file PDF da creare o buffer binario
         materia (str): Nome della materia
         interrogations (list): Lista di oggetti Interrogation
     """
-    # Crea documento PDF
-    doc = SimpleDocTemplate(
-        filepath,
-        pagesize=A4,
-        rightMargin=2*cm,
-        leftMargin=2*cm,
-        topMargin=2*cm,
-        bottomMargin=2*cm
+    rows = sorted(
+        (interrogation_row(interr) for interr in interrogations),
+        key=lambda row: (row['lezione_num'], row['ordine'])
     )
+    content = render_export('pdf', materia, rows)
     
-    # Elementi del documento
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Titolo
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#667eea'),
-        spaceAfter=30,
-        alignment=1  # Center
+    if hasattr(filepath, 'write'):
+        filepath.write(content)
+    else:
+        with open(filepath, 'wb') as f:
+            f.write(content)
+
+
+def get_materia_version(materia, variant=''):
+    """
+    Calcola un token di versione economico per i dati di una materia
+    
+    Usa solo aggregati (numero righe, ultimo aggiornamento e id massimo delle
+    interrogazioni; ultima modifica registrata nel log; numero e id massimo
+    degli studenti), senza caricare le interrogazioni. La versione del log
+    cambia a ogni modifica anche quando updated_at non cambia (MySQL lo salva
+    al secondo). Gli studenti contano perché le risposte includono i loro
+    dati; variant distingue le rappresentazioni diverse degli stessi dati.
+    
+    Args:
+        materia (str): Nome materia
+        variant (str, optional): Parametri della rappresentazione (vedi representation_variant)
+        
+    Returns:
+        tuple: (etag, data ultimo aggiornamento o None)
+    """
+    count, last_update, max_id = db.session.query(
+        db.func.count(Interrogation.id),
+        db.func.max(Interrogation.updated_at),
+        db.func.max(Interrogation.id)
+    ).filter(Interrogation.materia == materia).one()
+    student_count, student_max_id = db.session.query(
+        db.func.count(Student.id),
+        db.func.max(Student.id)
+    ).one()
+    
+    change_version = get_materia_change_version(materia)
+    
+    token = (
+        f'{materia}|{count}|{last_update.isoformat() if last_update else ""}|{max_id or 0}'
+        f'|{change_version}|{student_count}|{student_max_id or 0}|{variant}'
     )
-    title = Paragraph(f"Calendario Interrogazioni<br/>{materia}", title_style)
-    elements.append(title)
-    
-    # Data di generazione
-    date_style = ParagraphStyle(
-        'DateStyle',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=colors.grey,
-        alignment=1
+    etag = hashlib.sha1(token.encode('utf-8')).hexdigest()
+    return etag, last_update
+
+
+def representation_variant(*names):
+    """
+    Parametri della richiesta che cambiano la rappresentazione della risposta
+    
+    Args:
+        *names (str): Nomi dei parametri (es. 'fields', 'shape', 'since')
+        
+    Returns:
+        str: Parametri presenti in forma canonica (es. "fields=id&shape=normalized")
+    """
+    return '&'.join(
+        f'{name}={request.args[name]}' for name in sorted(names) if name in request.args
     )
-    date_text = Paragraph(f"Generato il {datetime.now().strftime('%d/%m/%Y alle %H:%M')}", date_style)
-    elements.append(date_text)
-    elements.append(Spacer(1, 1*cm))
-    
-    # Raggruppa interrogazioni per lezione
-    lezioni = {}
-    for interr in interrogations:
-        if interr.lezione_num not in lezioni:
-            lezioni[interr.lezione_num] = []
-        lezioni[interr.lezione_num].append(interr)
-    
-    # Crea tabelle per ogni lezione
-    for lezione_num in sorted(lezioni.keys()):
-        # Titolo lezione
-        lezione_style = ParagraphStyle(
-            'LessonTitle',
-            parent=styles['Heading2'],
-            fontSize=14,
-            textColor=colors.HexColor('#764ba2'),
-            spaceAfter=10
-        )
-        lezione_title = Paragraph(f"Lezione {lezione_num}", lezione_style)
-        elements.append(lezione_title)
+
+
+def not_modified_response(version):
+    """
+    Restituisce una risposta 304 se il client ha già la versione corrente
+    
+    Args:
+        version (tuple): Versione calcolata da get_materia_version
         
-        # Dati tabella
-        table_data = [['Ordine', 'Registro', 'Nome', 'Cognome', 'Data Lezione']]
+    Returns:
+        Response: Risposta 304, oppure None se il client deve ricevere i dati
+    """
+    # Confronto debole: le risposte compresse hanno un ETag debole
+    if not request.if_none_match.contains_weak(version[0]):
+        return None
+    
+    return with_version_headers(make_response('', 304), version)
+
+
+def with_version_headers(response, version):
+    """
+    Aggiunge gli header ETag e Last-Modified a una risposta
+    
+    Args:
+        response (Response): Risposta Flask
+        version (tuple): Versione calcolata da get_materia_version
         
-        for interr in sorted(lezioni[lezione_num], key=lambda x: x.ordine):
-            table_data.append([
-                str(interr.ordine),
-                str(interr.student.registro_num),
-                interr.student.nome,
-                interr.student.cognome,
-                interr.data_lezione.strftime('%d/%m/%Y') if interr.data_lezione else 'N/A'
-            ])
-        
-        # Crea tabella
-        table = Table(table_data, colWidths=[2*cm, 2.5*cm, 4*cm, 4*cm, 3*cm])
-        table.setStyle(TableStyle([
-            # Header
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            
-            # Body
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-            ('ALIGN', (0, 1), (1, -1), 'CENTER'),  # Centra ordine e registro
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 8),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        
-        elements.append(table)
-        elements.append(Spacer(1, 0.5*cm))
-    
-    # Statistiche finali
-    elements.append(Spacer(1, 1*cm))
-    stats_style = ParagraphStyle(
-        'StatsStyle',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=colors.HexColor('#333333')
-    )
+    Returns:
+        Response: La stessa risposta con gli header di validazione
+    """
+    etag, last_update = version
+    response.set_etag(etag)
+    if last_update:
+        response.last_modified = last_update
+    # Il client può riusare la copia locale solo dopo averla rivalidata
+    response.cache_control.no_cache = True
+    return response
+
+
+def get_calendar_stats(materia):
+    """
+    Calcola in SQL gli aggregati del calendario usati dall'AI Advisor
+    
+    Una sola query (UNION ALL di due GROUP BY) restituisce il numero di
+    interrogazioni per lezione e gli studenti ripetuti, senza caricare
+    le interrogazioni: il costo dipende dal numero di lezioni.
+    
+    Args:
+        materia (str): Nome materia
+        
+    Returns:
+        dict: {
+            'student_counts': {lezione_num: numero interrogazioni},
+            'duplicates': {registro_num: occorrenze (> 1)}
+        }
+    """
+    per_lesson = db.session.query(
+        literal('lesson').label('kind'),
+        Interrogation.lezione_num.label('key'),
+        db.func.count(Interrogation.id).label('total')
+    ).filter(
+        Interrogation.materia == materia
+    ).group_by(Interrogation.lezione_num)
+    
+    repeated = db.session.query(
+        literal('student').label('kind'),
+        Student.registro_num.label('key'),
+        db.func.count(Interrogation.id).label('total')
+    ).join(
+        Student, Interrogation.student_id == Student.id
+    ).filter(
+        Interrogation.materia == materia
+    ).group_by(Student.registro_num).having(db.func.count(Interrogation.id) > 1)
+    
+    stats = {'student_counts': {}, 'duplicates': {}}
+    for kind, key, total in per_lesson.union_all(repeated):
+        if kind == 'lesson':
+            stats['student_counts'][key] = total
+        else:
+            stats['duplicates'][key] = total
+    return stats
+
+
+def record_calendar_change(materia, op, lezioni=None):
+    """
+    Registra le lezioni modificate nel log delle modifiche
+    
+    Da chiamare prima del commit, così il log è salvato nella stessa
+    transazione delle interrogazioni. Una modifica dell'intero calendario
+    rende superflue le righe precedenti della materia, che vengono eliminate;
+    altrimenti si conservano solo le ultime CALENDAR_CHANGES_RETAIN righe
+    (get_changed_lessons chiede il calendario completo per versioni più vecchie).
+    
+    Args:
+        materia (str): Nome materia
+        op (str): Tipo di modifica (es. 'move', 'date', 'delete')
+        lezioni (iterable, optional): Lezioni modificate; None = intero calendario
+        
+    Returns:
+        int: Versione della modifica (id dell'ultima riga inserita), da
+             pubblicare con notify_calendar_change
+    """
+    if lezioni is None:
+        change = InterrogationChange(materia=materia, lezione_num=None, op=op)
+        db.session.add(change)
+        db.session.flush()
+        # Si conserva la nuova riga: la versione (id massimo) non deve mai diminuire
+        InterrogationChange.query.filter(
+            InterrogationChange.materia == materia,
+            InterrogationChange.id < change.id
+        ).delete(synchronize_session=False)
+        return change.id
+    
+    changes = [
+        InterrogationChange(materia=materia, lezione_num=lezione_num, op=op)
+        for lezione_num in sorted(set(lezioni))
+    ]
+    if not changes:
+        return get_materia_change_version(materia)
+    db.session.add_all(changes)
+    db.session.flush()
+    version = max(change.id for change in changes)
+    
+    # Id della riga più recente tra quelle da eliminare (indice materia, id)
+    retain = current_app.config['CALENDAR_CHANGES_RETAIN']
+    cutoff = db.session.query(InterrogationChange.id).filter(
+        InterrogationChange.materia == materia
+    ).order_by(InterrogationChange.id.desc()).offset(retain).limit(1).scalar()
+    if cutoff is not None:
+        InterrogationChange.query.filter(
+            InterrogationChange.materia == materia,
+            InterrogationChange.id <= cutoff
+        ).delete(synchronize_session=False)
+    return version
+
+
+def get_materia_change_version(materia):
+    """
+    Restituisce la versione corrente del calendario (ultima modifica registrata)
+    
+    Args:
+        materia (str): Nome materia
+        
+    Returns:
+        int: Versione, 0 se non ci sono modifiche registrate
+    """
+    return db.session.query(db.func.max(InterrogationChange.id)).filter(
+        InterrogationChange.materia == materia
+    ).scalar() or 0
+
+
+def get_changed_lessons(materia, since, current_version):
+    """
+    Elenca le lezioni modificate dopo una versione, leggendo solo il log
+    
+    Args:
+        materia (str): Nome materia
+        since (int): Versione nota al client
+        current_version (int): Versione corrente della materia
+        
+    Returns:
+        tuple: (numeri di lezione modificati, versione dell'ultima modifica letta),
+               o (None, None) se serve il calendario completo (calendario
+               ricreato, versione sconosciuta al server o più vecchia delle
+               righe conservate nel log)
+    """
+    if since > current_version:
+        return None, None
+    
+    # Le righe successive a "since" potrebbero essere state eliminate dalla potatura
+    oldest = db.session.query(db.func.min(InterrogationChange.id)).filter(
+        InterrogationChange.materia == materia
+    ).scalar()
+    if oldest is not None and since < oldest:
+        return None, None
+    
+    rows = db.session.query(InterrogationChange.id, InterrogationChange.lezione_num).filter(
+        InterrogationChange.materia == materia,
+        InterrogationChange.id > since
+    ).all()
+    
+    lessons = {row.lezione_num for row in rows}
+    if None in lessons:
+        return None, None
+    # La versione è quella delle modifiche lette, non il massimo calcolato prima:
+    # il client non avanza oltre una modifica che non ha ricevuto
+    return sorted(lessons), max((row.id for row in rows), default=since)
+
+
+def get_analysis_version(materia):
+    """
+    Versione dei dati da cui dipendono le analisi AI di una materia
+    
+    Args:
+        materia (str): Nome materia
+        
+    Returns:
+        tuple: (versione del calendario, numero di studenti)
+    """
+    return get_materia_change_version(materia), Student.query.count()
+
+
+# Campi delle interrogazioni usati dalla pagina calendario (forma normalizzata)
+CALENDAR_VIEW_FIELDS = 'id,data_lezione,ordine,student.id,student.nome,student.cognome,student.registro_num'
+
+
+def notify_calendar_change(materia, version, lezioni=None):
+    """
+    Invia ai client in ascolto lo stato aggiornato delle lezioni modificate
+    
+    Da chiamare dopo il commit; invalida anche le analisi AI della materia.
+    Le lezioni sono lette con una sola query e solo se qualcuno è iscritto
+    alla materia; i client sostituiscono le lezioni ricevute (una lista
+    vuota indica una lezione eliminata).
+    
+    Args:
+        materia (str): Nome materia
+        version (int): Versione restituita da record_calendar_change
+        lezioni (iterable, optional): Numeri delle lezioni modificate;
+                                      None se è cambiato l'intero calendario
+        
+    Returns:
+        None
+    """
+    # Le analisi AI calcolate sulla versione precedente non servono più
+    get_analysis_cache().invalidate(materia)
+    
+    if not get_calendar_events().has_subscribers(materia):
+        return
+    
+    try:
+        publish_lessons(materia, version, lezioni)
+    except Exception as e:
+        # Le modifiche sono già salvate: un errore di notifica non fa fallire la richiesta
+        current_app.logger.warning('Notifica calendario %s non inviata: %s', materia, e)
+
+
+def publish_lessons(materia, version, lezioni):
+    """
+    Legge le lezioni indicate e le pubblica come evento 'lessons'
     
-    total_interr = len(interrogations)
-    total_lezioni = len(lezioni)
-    studenti_unici = len(set(i.student_id for i in interrogations))
+    La versione dell'evento è quella della modifica pubblicata, non l'ultima
+    della materia: con due modifiche concorrenti i due eventi hanno versioni
+    diverse e il client può riconoscere quello arrivato fuori ordine.
     
-    stats_text = f"""
-    <b>Statistiche:</b><br/>
-    • Totale interrogazioni: {total_interr}<br/>
-    • Numero lezioni: {total_lezioni}<br/>
-    • Studenti coinvolti: {studenti_unici}
+    Args:
+        materia (str): Nome materia
+        version (int): Versione della modifica (record_calendar_change)
+        lezioni (iterable): Numeri delle lezioni, o None per tutto il calendario
+        
+    Returns:
+        None
     """
+    projection = InterrogationProjection(CALENDAR_VIEW_FIELDS, 'normalized')
+    query = projection.query('lezione_num').filter(Interrogation.materia == materia)
+    if lezioni is not None:
+        lezioni = sorted(set(lezioni))
+        query = query.filter(Interrogation.lezione_num.in_(lezioni))
     
-    stats = Paragraph(stats_text, stats_style)
-    elements.append(stats)
+    students = {}
+    lessons = {lezione_num: [] for lezione_num in (lezioni or [])}
+    for interr in query.order_by(Interrogation.lezione_num, Interrogation.ordine):
+        lessons.setdefault(interr.lezione_num, []).append(
+            projection.serialize_normalized(interr, students)
+        )
     
-    # Genera il PDF
-    doc.build(elements)
+    get_calendar_events().publish(materia, 'lessons', {
+        'materia': materia,
+        'version': version,
+        'full': lezioni is None,
+        'fields': projection.tuple_fields,
+        'students': students,
+        'lessons': lessons
+    }, event_id=version)
 
 
 def parse_csv(file_path):
@@ -291,45 +682,73 @@ def create_random_calendar(students, lessons_per_week, distribution_per_lesson):
     available_students = students.copy()
     random.shuffle(available_students)
     
-    total_students = len(available_students)
-    
-    # Calcola quanti studenti interroghiamo ogni settimana
-    students_per_week = sum(distribution_per_lesson)
+    # Cicla la distribuzione settimanale finché non finiamo gli studenti
+    return layout_calendar(available_students, lessons_per_week, distribution_per_lesson)
+
+
+def search_best_calendar(materia, students, lessons_per_week, distribution, candidates=None, time_budget=None):
+    """
+    Sceglie il calendario migliore tra K candidati generati nel pool di processi
     
-    # Calcola il numero totale di lezioni necessarie per interrogare tutti
-    # Cicliamo la distribuzione settimanale finché non finiamo gli studenti
-    calendario = {}
-    student_index = 0
-    lezione_num = 1
-    week = 1
+    I candidati sono valutati anche rispetto ai calendari delle altre materie
+    (equità delle posizioni), letti una sola volta qui.
     
-    while student_index < total_students:
-        # Per ogni giorno della settimana
-        for day_index in range(lessons_per_week):
-            if student_index >= total_students:
-                break
-                
-            num_students_needed = distribution_per_lesson[day_index]
-            
-            # Estrai studenti per questa lezione
-            students_for_lesson = []
-            for i in range(num_students_needed):
-                if student_index < total_students:
-                    students_for_lesson.append(available_students[student_index])
-                    student_index += 1
-            
-            if students_for_lesson:  # Solo se ci sono studenti
-                calendario[lezione_num] = students_for_lesson
-                lezione_num += 1
+    Args:
+        materia (str): Materia del nuovo calendario (esclusa dal confronto)
+        students (list): Studenti (dizionari con 'id')
+        lessons_per_week (int): Giorni a settimana con interrogazioni
+        distribution (list): Studenti per giorno della settimana
+        candidates (int, optional): Numero di candidati, limitato dalla configurazione
+        time_budget (float, optional): Secondi di ricerca, limitati dalla configurazione
+        
+    Returns:
+        tuple: (calendario {lezione_num: [studenti]}, informazioni sulla ricerca)
         
-        week += 1
+    Raises:
+        ValueError: Se candidates o time_budget non sono validi
+    """
+    max_candidates = current_app.config['CALENDAR_SEARCH_CANDIDATES']
+    max_budget = current_app.config['CALENDAR_SEARCH_TIME_BUDGET']
+    # Solo i valori assenti prendono il massimo: 0 non è valido
+    candidates = min(int(max_candidates if candidates is None else candidates), max_candidates)
+    time_budget = min(float(max_budget if time_budget is None else time_budget), max_budget)
+    if candidates < 1 or time_budget <= 0:
+        raise ValueError('Parametri di ricerca non validi')
+    
+    # Posizioni relative degli studenti nelle altre materie
+    rows = db.session.query(
+        Interrogation.student_id, Interrogation.materia, Interrogation.lezione_num
+    ).filter(Interrogation.materia != materia).all()
+    
+    last_lesson = {}
+    for row in rows:
+        last_lesson[row.materia] = max(last_lesson.get(row.materia, 1), row.lezione_num)
     
-    return calendario
+    other_positions = {}
+    for row in rows:
+        last = last_lesson[row.materia]
+        position = (row.lezione_num - 1) / (last - 1) if last > 1 else 0.5
+        other_positions.setdefault(row.student_id, []).append(position)
+    
+    workers = current_app.config['EXPORT_WORKERS'] or os.cpu_count() or 1
+    with process_pool(workers) as pool:
+        result = search_calendar(
+            pool, workers, [s['id'] for s in students],
+            lessons_per_week, distribution, len(students),
+            other_positions, candidates, time_budget
+        )
+    
+    by_id = {s['id']: s for s in students}
+    calendario = {
+        lezione_num: [by_id[student_id] for student_id in ids]
+        for lezione_num, ids in result.pop('calendario').items()
+    }
+    return calendario, result
 
 
 # ==================== ROUTES - PAGINE ====================
 
-@app.route('/')
+@bp.route('/')
 def index():
     """
     Homepage - Configurazione calendario
@@ -340,7 +759,7 @@ def index():
     return render_template('index.html')
 
 
-@app.route('/upload')
+@bp.route('/upload')
 def upload_page():
     """
     Pagina upload studenti
@@ -351,7 +770,7 @@ def upload_page():
     return render_template('upload.html')
 
 
-@app.route('/calendar')
+@bp.route('/calendar')
 def calendar_page():
     """
     Pagina visualizzazione calendario
@@ -362,7 +781,7 @@ def calendar_page():
     return render_template('calendar.html')
 
 
-@app.route('/interrogations')
+@bp.route('/interrogations')
 def interrogations_page():
     """
     Pagina gestione interrogazioni per estrazione
@@ -375,26 +794,44 @@ def interrogations_page():
 
 # ==================== API - STUDENTI ====================
 
-@app.route('/api/students', methods=['GET'])
+@bp.route('/api/students', methods=['GET'])
 def get_students():
     """
-    Recupera tutti gli studenti
+    Recupera gli studenti, tutti o una pagina alla volta
+    
+    Query Parameters:
+        limit (int, optional): Numero di studenti per pagina
+        cursor (str, optional): Cursore restituito dalla pagina precedente (next_cursor)
     
     Returns:
         JSON: Lista studenti
     """
     try:
-        students = Student.query.all()
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        
+        next_cursor = None
+        if limit or cursor:
+            try:
+                students, next_cursor = paginate_keyset(
+                    Student.query, [Student.id], limit or DEFAULT_PAGE_SIZE, cursor
+                )
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+        else:
+            students = Student.query.all()
+        
         return jsonify({
             'success': True,
             'students': [student.to_dict() for student in students],
-            'count': len(students)
+            'count': len(students),
+            'next_cursor': next_cursor
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/add-student', methods=['POST'])
+@bp.route('/api/add-student', methods=['POST'])
 def add_student():
     """
     Aggiunge un nuovo studente
@@ -430,7 +867,7 @@ def add_student():
         db.session.commit()
         
         # Salva anche su TinyDB
-        tinydb_manager.add_student(data['registro_num'], data['nome'], data['cognome'])
+        get_tinydb_manager().add_student(data['registro_num'], data['nome'], data['cognome'])
         
         return jsonify({
             'success': True,
@@ -443,7 +880,7 @@ def add_student():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/remove-student/<int:registro_num>', methods=['DELETE'])
+@bp.route('/api/remove-student/<int:registro_num>', methods=['DELETE'])
 def remove_student(registro_num):
     """
     Rimuove uno studente
@@ -460,11 +897,23 @@ def remove_student(registro_num):
         if not student:
             return jsonify({'success': False, 'error': 'Studente non trovato'}), 404
         
+        # Lezioni che perdono lo studente (le interrogazioni sono eliminate in cascata)
+        changed = {}
+        for interr in student.interrogazioni:
+            changed.setdefault(interr.materia, set()).add(interr.lezione_num)
+        
+        versions = {
+            materia: record_calendar_change(materia, 'delete', lezioni)
+            for materia, lezioni in changed.items()
+        }
         db.session.delete(student)
         db.session.commit()
         
+        for materia, lezioni in changed.items():
+            notify_calendar_change(materia, versions[materia], lezioni)
+        
         # Rimuovi anche da TinyDB
-        tinydb_manager.delete_student(registro_num)
+        get_tinydb_manager().delete_student(registro_num)
         
         return jsonify({
             'success': True,
@@ -476,7 +925,7 @@ def remove_student(registro_num):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/upload-students', methods=['POST'])
+@bp.route('/api/upload-students', methods=['POST'])
 def upload_students():
     """
     Upload file CSV o JSON con lista studenti
@@ -512,30 +961,43 @@ def upload_students():
         skipped_count = 0
         errors = []
         
-        for student_data in students:
-            try:
-                # Controlla se esiste già
-                existing = Student.query.filter_by(registro_num=student_data['registro_num']).first()
-                if existing:
-                    skipped_count += 1
-                    continue
-                
-                # Crea nuovo studente
-                student = Student(**student_data)
-                db.session.add(student)
-                
-                # Aggiungi anche a TinyDB
-                tinydb_manager.add_student(
-                    student_data['registro_num'],
-                    student_data['nome'],
-                    student_data['cognome']
+        # Numeri di registro già presenti, letti con una query ogni 1000 studenti
+        # (SQLite limita il numero di parametri di una query)
+        existing = set()
+        for registro_nums in chunk_list(sorted({s['registro_num'] for s in students}), 1000):
+            existing.update(
+                row.registro_num for row in db.session.query(Student.registro_num).filter(
+                    Student.registro_num.in_(registro_nums)
                 )
-                
-                imported_count += 1
-                
-            except Exception as e:
-                errors.append(f"Errore studente {student_data.get('registro_num', '?')}: {str(e)}")
+            )
         
+        # Un solo salvataggio del file TinyDB per tutto l'import
+        tinydb_manager = get_tinydb_manager()
+        with tinydb_manager.transaction():
+            for student_data in students:
+                try:
+                    # Controlla se esiste già (anche se ripetuto nello stesso file)
+                    if student_data['registro_num'] in existing:
+                        skipped_count += 1
+                        continue
+                    existing.add(student_data['registro_num'])
+                    
+                    # Crea nuovo studente
+                    student = Student(**student_data)
+                    db.session.add(student)
+                    
+                    # Aggiungi anche a TinyDB
+                    tinydb_manager.add_student(
+                        student_data['registro_num'],
+                        student_data['nome'],
+                        student_data['cognome']
+                    )
+                    
+                    imported_count += 1
+                    
+                except Exception as e:
+                    errors.append(f"Errore studente {student_data.get('registro_num', '?')}: {str(e)}")
+            
         db.session.commit()
         
         # Rimuovi file temporaneo
@@ -554,9 +1016,99 @@ def upload_students():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@bp.route('/api/students/agenda-batch', methods=['GET'])
+def export_student_agendas():
+    """
+    Genera l'agenda PDF personale di ogni studente e le restituisce in un archivio ZIP
+    
+    Le interrogazioni di tutte le materie sono lette con una sola query,
+    raggruppate per studente e i PDF sono generati in parallelo su più processi.
+    
+    Query Parameters:
+        da (str, optional): Data minima YYYY-MM-DD (default: oggi); le lezioni
+                            senza data sono sempre incluse
+        materie (str, optional): Materie da includere, separate da virgola (default: tutte)
+        
+    Returns:
+        File: Archivio ZIP con un PDF per studente
+    """
+    try:
+        da = request.args.get('da')
+        try:
+            from_date = datetime.strptime(da, '%Y-%m-%d').date() if da else datetime.now().date()
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Formato data non valido. Usa YYYY-MM-DD'}), 400
+        
+        materie = [m.strip() for value in request.args.getlist('materie') for m in value.split(',') if m.strip()]
+        
+        # Un'unica query per tutte le interrogazioni in programma
+        query = db.session.query(
+            Interrogation.student_id,
+            Interrogation.materia,
+            Interrogation.lezione_num,
+            Interrogation.data_lezione,
+            Interrogation.ordine,
+            Student.registro_num,
+            Student.nome,
+            Student.cognome
+        ).join(Student, Interrogation.student_id == Student.id).filter(
+            db.or_(Interrogation.data_lezione.is_(None), Interrogation.data_lezione >= from_date)
+        )
+        
+        if materie:
+            query = query.filter(Interrogation.materia.in_(materie))
+        
+        # Raggruppa per studente
+        students = {}
+        rows_by_student = {}
+        for row in query.order_by(Interrogation.student_id):
+            row = row._asdict()
+            if row['student_id'] not in students:
+                students[row['student_id']] = {
+                    'registro_num': row['registro_num'],
+                    'nome': row['nome'],
+                    'cognome': row['cognome']
+                }
+                rows_by_student[row['student_id']] = []
+            rows_by_student[row['student_id']].append(row)
+        
+        if not students:
+            return jsonify({'success': False, 'error': 'Nessuna interrogazione in programma'}), 404
+        
+        # Generazione parallela: i PDF sono piccoli, quindi li inviamo ai processi a blocchi
+        start = time.perf_counter()
+        workers = current_app.config['EXPORT_WORKERS'] or os.cpu_count() or 1
+        chunksize = max(1, len(students) // (workers * 4))
+        with process_pool(workers) as pool:
+            agendas = list(pool.map(
+                render_student_agenda,
+                students.values(),
+                rows_by_student.values(),
+                chunksize=chunksize
+            ))
+        elapsed = time.perf_counter() - start
+        
+        pages = sum(num_pages for _, _, num_pages in agendas)
+        pages_per_second = pages / elapsed if elapsed > 0 else 0.0
+        
+        archive = b''.join(stream_zip((filename, content) for filename, content, _ in agendas))
+        
+        response = make_response(archive)
+        response.headers['Content-Type'] = 'application/zip'
+        response.headers['Content-Disposition'] = f'attachment; filename=agende_studenti_{datetime.now().strftime("%Y%m%d")}.zip'
+        response.headers['X-Agenda-Count'] = str(len(agendas))
+        response.headers['X-Agenda-Pages'] = str(pages)
+        response.headers['X-Render-Seconds'] = f'{elapsed:.3f}'
+        response.headers['X-Pages-Per-Second'] = f'{pages_per_second:.1f}'
+        return response
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 # ==================== API - CALENDARIO ====================
 
-@app.route('/api/create-calendar', methods=['POST'])
+@bp.route('/api/create-calendar', methods=['POST'])
 def create_calendar():
     """
     Crea un nuovo calendario di interrogazioni
@@ -565,6 +1117,9 @@ def create_calendar():
         materia (str): Nome materia
         num_lezioni (int): Numero lezioni settimanali
         distribuzione (list): Numero studenti per lezione
+        search (bool, optional): Sceglie il migliore tra più calendari candidati
+        candidates (int, optional): Numero di candidati (max CALENDAR_SEARCH_CANDIDATES)
+        time_budget (float, optional): Secondi di ricerca (max CALENDAR_SEARCH_TIME_BUDGET)
         
     Returns:
         JSON: Calendario creato
@@ -580,6 +1135,11 @@ def create_calendar():
         giorni_settimana = data['num_lezioni']  # Giorni a settimana con interrogazioni
         distribuzione = data['distribuzione']  # Studenti per ciascun giorno
         
+        # Solo un booleano JSON: la stringa "false" non deve avviare la ricerca
+        search = data.get('search', False)
+        if not isinstance(search, bool):
+            return jsonify({'success': False, 'error': 'search deve essere true o false'}), 400
+        
         # Recupera studenti
         students = Student.query.all()
         students_list = [s.to_dict() for s in students]
@@ -595,8 +1155,19 @@ def create_calendar():
         weeks_needed = (total_students + students_per_week - 1) // students_per_week
         num_lezioni_totali = weeks_needed * giorni_settimana
         
-        # Crea calendario casuale (interroga tutti gli studenti una volta)
-        calendario = create_random_calendar(students_list, giorni_settimana, distribuzione)
+        search_info = None
+        if search:
+            # Migliore tra più candidati casuali, valutati in parallelo
+            try:
+                calendario, search_info = search_best_calendar(
+                    materia, students_list, giorni_settimana, distribuzione,
+                    data.get('candidates'), data.get('time_budget')
+                )
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'error': 'Parametri di ricerca non validi'}), 400
+        else:
+            # Crea calendario casuale (interroga tutti gli studenti una volta)
+            calendario = create_random_calendar(students_list, giorni_settimana, distribuzione)
         
         # Salva interrogazioni nel database
         Interrogation.query.filter_by(materia=materia).delete()  # Pulisci vecchie
@@ -618,26 +1189,38 @@ def create_calendar():
             distribuzione=json.dumps(distribuzione)
         )
         db.session.add(config)
+        version = record_calendar_change(materia, 'create')
         db.session.commit()
+        notify_calendar_change(materia, version)
         
         # Ottieni consigli AI
         ai_analysis = ai_advisor.analyze_distribution(calendario)
-        quality_score = ai_advisor.evaluate_schedule_quality(calendario, len(students_list))
+        quality_score = ai_advisor.evaluate_schedule_quality(
+            calendario, len(students_list), distribution_analysis=ai_analysis
+        )
+        get_analysis_cache().store(
+            materia, get_analysis_version(materia),
+            distribution=ai_analysis, quality=quality_score
+        )
         
-        return jsonify({
+        result = {
             'success': True,
             'message': 'Calendario creato con successo',
             'calendario': calendario,
             'ai_analysis': ai_analysis,
             'quality_score': quality_score
-        })
+        }
+        if search_info is not None:
+            result['search'] = search_info
+        
+        return jsonify(result)
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/shuffle-assignments', methods=['POST'])
+@bp.route('/api/shuffle-assignments', methods=['POST'])
 def shuffle_assignments():
     """
     Rimescola le assegnazioni mantenendo la distribuzione
@@ -687,11 +1270,19 @@ def shuffle_assignments():
                 )
                 db.session.add(interrogation)
         
+        version = record_calendar_change(materia, 'shuffle')
         db.session.commit()
+        notify_calendar_change(materia, version)
         
         # AI analysis
         ai_analysis = ai_advisor.analyze_distribution(calendario)
-        quality_score = ai_advisor.evaluate_schedule_quality(calendario, len(students_list))
+        quality_score = ai_advisor.evaluate_schedule_quality(
+            calendario, len(students_list), distribution_analysis=ai_analysis
+        )
+        get_analysis_cache().store(
+            materia, get_analysis_version(materia),
+            distribution=ai_analysis, quality=quality_score
+        )
         
         return jsonify({
             'success': True,
@@ -706,7 +1297,7 @@ def shuffle_assignments():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/get-calendar/<materia>', methods=['GET'])
+@bp.route('/api/get-calendar/<materia>', methods=['GET'])
 def get_calendar(materia):
     """
     Recupera il calendario per una materia
@@ -714,32 +1305,130 @@ def get_calendar(materia):
     Args:
         materia (str): Nome materia
         
+    Query Parameters:
+        fields (str, optional): Campi da restituire per ogni interrogazione,
+                                separati da virgola (es. "ordine,student.nome")
+        shape (str, optional): 'normalized' per ricevere gli studenti una sola
+                               volta in una mappa per id e le interrogazioni
+                               come liste di valori (vedi "fields" nella risposta)
+        since (int, optional): Versione già nota al client: restituisce solo le
+                               lezioni modificate dopo di essa
+        
     Returns:
         JSON: Calendario
     """
     try:
-        interrogations = Interrogation.query.filter_by(materia=materia).order_by(
+        try:
+            projection = InterrogationProjection(
+                request.args.get('fields'), request.args.get('shape')
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        since = None
+        if 'since' in request.args:
+            since = request.args.get('since', type=int)
+            if since is None or since < 0:
+                return jsonify({'success': False, 'error': 'Versione non valida'}), 400
+        
+        version = get_materia_version(materia, representation_variant('fields', 'shape', 'since'))
+        not_modified = not_modified_response(version)
+        if not_modified:
+            return not_modified
+        
+        change_version = get_materia_change_version(materia)
+        
+        query = projection.query('lezione_num').filter(Interrogation.materia == materia)
+        
+        # Delta: solo le lezioni registrate nel log delle modifiche dopo "since"
+        changed_lessons = None
+        if since is not None:
+            changed_lessons, delta_version = get_changed_lessons(materia, since, change_version)
+            if changed_lessons is not None:
+                query = query.filter(Interrogation.lezione_num.in_(changed_lessons))
+                change_version = delta_version
+        
+        interrogations = query.order_by(
             Interrogation.lezione_num, Interrogation.ordine
         ).all()
         
         # Organizza per lezione
+        if projection.normalized:
+            students = {}
+            serialize = lambda interr: projection.serialize_normalized(interr, students)
+        else:
+            serialize = projection.serialize
+        
         calendario = {}
         for interr in interrogations:
             if interr.lezione_num not in calendario:
                 calendario[interr.lezione_num] = []
-            calendario[interr.lezione_num].append(interr.to_dict())
-        
-        return jsonify({
-            'success': True,
+            calendario[interr.lezione_num].append(serialize(interr))
+        
+        result = {'success': True}
+        if projection.normalized:
+            result.update({
+                'shape': 'normalized',
+                'fields': projection.tuple_fields,
+                'students': students
+            })
+        result.update({
             'calendario': calendario,
-            'total_interrogations': len(interrogations)
+            'total_interrogations': len(interrogations),
+            'version': change_version
         })
         
+        if since is not None:
+            result['since'] = since
+            result['full'] = changed_lessons is None
+            # Tombstone: lezioni modificate che non hanno più interrogazioni
+            result['deleted_lessons'] = [
+                lezione_num for lezione_num in (changed_lessons or [])
+                if lezione_num not in calendario
+            ]
+        
+        return with_version_headers(jsonify(result), version)
+        
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/modify-day', methods=['PUT'])
+@bp.route('/api/calendar-events/<materia>', methods=['GET'])
+def calendar_events_stream(materia):
+    """
+    Flusso Server-Sent Events con le modifiche al calendario di una materia
+    
+    Ogni evento 'lessons' contiene le lezioni modificate nella forma
+    normalizzata di get-calendar; 'reset' chiede al client di ricaricare
+    il calendario completo. Il flusso non usa il database.
+    
+    Ogni flusso occupa un thread del worker: oltre EVENTS_MAX_CONNECTIONS
+    flussi aperti la richiesta è rifiutata con 503 e il client resta sulle
+    ricariche con since=.
+    
+    Args:
+        materia (str): Nome materia
+        
+    Returns:
+        Response: Flusso text/event-stream
+    """
+    calendar_events = get_calendar_events()
+    subscription = calendar_events.subscribe(materia)
+    if subscription is None:
+        response = jsonify({'success': False, 'error': 'Troppe connessioni aperte, riprova più tardi'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(calendar_events.max_lifetime or 60)
+        return response
+    
+    response = Response(calendar_events.stream(materia, subscription), mimetype='text/event-stream')
+    # Libera il posto anche se il flusso viene chiuso prima di partire
+    response.call_on_close(lambda: calendar_events.unsubscribe(materia, subscription))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disabilita il buffering dei proxy (nginx)
+    return response
+
+
+@bp.route('/api/modify-day', methods=['PUT'])
 def modify_day():
     """
     Modifica il numero di studenti in un giorno specifico
@@ -791,7 +1480,9 @@ def modify_day():
                 )
                 db.session.add(new_interr)
         
+        version = record_calendar_change(materia, 'modify', [lezione_num])
         db.session.commit()
+        notify_calendar_change(materia, version, [lezione_num])
         
         return jsonify({
             'success': True,
@@ -803,7 +1494,7 @@ def modify_day():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/change-student-in-day', methods=['PUT'])
+@bp.route('/api/change-student-in-day', methods=['PUT'])
 def change_student_in_day():
     """
     Cambia uno studente specifico in un giorno
@@ -842,7 +1533,9 @@ def change_student_in_day():
         
         # Aggiorna
         interrogation.student_id = new_student.id
+        version = record_calendar_change(materia, 'student', [lezione_num])
         db.session.commit()
+        notify_calendar_change(materia, version, [lezione_num])
         
         return jsonify({
             'success': True,
@@ -855,7 +1548,7 @@ def change_student_in_day():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/set-lesson-date', methods=['PUT'])
+@bp.route('/api/set-lesson-date', methods=['PUT'])
 def set_lesson_date():
     """
     Assegna una data effettiva a una lezione
@@ -878,11 +1571,11 @@ def set_lesson_date():
         lezione_num = data['lezione_num']
         data_lezione = data['data_lezione']
         
-        # Valida formato data
+        # Valida formato data (la colonna è DATE: SQLite non accetta stringhe)
         try:
             from datetime import datetime
-            datetime.strptime(data_lezione, '%Y-%m-%d')
-        except ValueError:
+            data_lezione = datetime.strptime(data_lezione, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
             return jsonify({'success': False, 'error': 'Formato data non valido. Usa YYYY-MM-DD'}), 400
         
         # Aggiorna tutte le interrogazioni della lezione
@@ -897,7 +1590,9 @@ def set_lesson_date():
         for interr in interrogations:
             interr.data_lezione = data_lezione
         
+        version = record_calendar_change(materia, 'date', [lezione_num])
         db.session.commit()
+        notify_calendar_change(materia, version, [lezione_num])
         
         return jsonify({
             'success': True,
@@ -910,7 +1605,7 @@ def set_lesson_date():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/set-all-dates', methods=['POST'])
+@bp.route('/api/set-all-dates', methods=['POST'])
 def set_all_dates():
     """
     Assegna date automatiche a tutte le lezioni di una materia
@@ -951,6 +1646,11 @@ def set_all_dates():
         
         num_lezioni = config.num_lezioni
         
+        # Interrogazioni della materia lette una sola volta, raggruppate per lezione
+        lessons = {}
+        for interr in Interrogation.query.filter_by(materia=materia):
+            lessons.setdefault(interr.lezione_num, []).append(interr)
+        
         # Assegna date progressivamente
         lezione_count = 0
         dates_assigned = {}
@@ -961,19 +1661,16 @@ def set_all_dates():
                 lezione_count += 1
                 
                 # Aggiorna interrogazioni per questa lezione
-                interrogations = Interrogation.query.filter_by(
-                    materia=materia,
-                    lezione_num=lezione_count
-                ).all()
-                
-                for interr in interrogations:
-                    interr.data_lezione = current_date.strftime('%Y-%m-%d')
+                for interr in lessons.get(lezione_count, []):
+                    interr.data_lezione = current_date.date()
                 
                 dates_assigned[lezione_count] = current_date.strftime('%Y-%m-%d')
             
             current_date += timedelta(days=1)
         
+        version = record_calendar_change(materia, 'date', dates_assigned.keys())
         db.session.commit()
+        notify_calendar_change(materia, version, dates_assigned.keys())
         
         return jsonify({
             'success': True,
@@ -988,7 +1685,7 @@ def set_all_dates():
 
 # ==================== API - SALVATAGGIO ED ESPORTAZIONE ====================
 
-@app.route('/api/save-to-db', methods=['POST'])
+@bp.route('/api/save-to-db', methods=['POST'])
 def save_to_db():
     """
     Forza il salvataggio su MySQL (già fatto automaticamente)
@@ -1006,7 +1703,7 @@ def save_to_db():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/save-to-tinydb', methods=['POST'])
+@bp.route('/api/save-to-tinydb', methods=['POST'])
 def save_to_tinydb():
     """
     Salva tutto su TinyDB
@@ -1015,28 +1712,31 @@ def save_to_tinydb():
         JSON: Conferma
     """
     try:
-        # Esporta studenti
-        students = Student.query.all()
-        tinydb_manager.clear_students()
-        for student in students:
-            tinydb_manager.add_student(
-                student.registro_num,
-                student.nome,
-                student.cognome
-            )
-        
-        # Esporta interrogazioni
-        interrogations = Interrogation.query.all()
-        tinydb_manager.clear_interrogations()
-        for interr in interrogations:
-            tinydb_manager.add_interrogation(
-                interr.materia,
-                interr.student.registro_num,
-                interr.lezione_num,
-                interr.ordine,
-                interr.data_lezione.isoformat() if interr.data_lezione else None
-            )
-        
+        # Un solo salvataggio del file TinyDB, senza scritture di altri processi a metà
+        tinydb_manager = get_tinydb_manager()
+        with tinydb_manager.transaction():
+            # Esporta studenti
+            students = Student.query.all()
+            tinydb_manager.clear_students()
+            for student in students:
+                tinydb_manager.add_student(
+                    student.registro_num,
+                    student.nome,
+                    student.cognome
+                )
+            
+            # Esporta interrogazioni
+            interrogations = Interrogation.query.all()
+            tinydb_manager.clear_interrogations()
+            for interr in interrogations:
+                tinydb_manager.add_interrogation(
+                    interr.materia,
+                    interr.student.registro_num,
+                    interr.lezione_num,
+                    interr.ordine,
+                    interr.data_lezione.isoformat() if interr.data_lezione else None
+                )
+            
         return jsonify({
             'success': True,
             'message': 'Dati salvati su TinyDB'
@@ -1046,7 +1746,7 @@ def save_to_tinydb():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/export', methods=['POST'])
+@bp.route('/api/export', methods=['POST'])
 def export_data():
     """
     Esporta il calendario in CSV, JSON o PDF
@@ -1063,68 +1763,81 @@ def export_data():
         materia = data.get('materia')
         format_type = data.get('format', 'csv')
         
-        # Recupera interrogazioni
-        interrogations = Interrogation.query.filter_by(materia=materia).order_by(
-            Interrogation.lezione_num, Interrogation.ordine
-        ).all()
+        # Recupera interrogazioni (con gli studenti in una sola query)
+        interrogations = Interrogation.query.options(joinedload(Interrogation.student)).filter_by(
+            materia=materia
+        ).order_by(Interrogation.lezione_num, Interrogation.ordine).all()
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        extension = format_type if format_type in ('csv', 'pdf') else 'json'
+        download_name = f'calendario_{materia}_{timestamp}.{extension}'
         
-        if format_type == 'csv':
-            # Esporta CSV
-            filename = f'calendario_{materia}_{timestamp}.csv'
-            filepath = os.path.join(app.config['EXPORT_FOLDER'], filename)
-            
-            with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
+        # Righe esportate: determinano il contenuto del file e quindi la chiave
+        rows = [
+            [
+                interr.materia,
+                interr.lezione_num,
+                interr.ordine,
+                interr.student.registro_num,
+                interr.student.nome,
+                interr.student.cognome,
+                interr.data_lezione.isoformat() if interr.data_lezione else ''
+            ]
+            for interr in interrogations
+        ]
+        records = [interr.to_dict() for interr in interrogations] if extension == 'json' else rows
+        key = get_export_store().make_key(extension, materia, records)
+        
+        if extension == 'csv':
+            def render():
+                output = StringIO(newline='')
+                writer = csv.writer(output)
                 writer.writerow(['Materia', 'Lezione', 'Ordine', 'Registro', 'Nome', 'Cognome', 'Data'])
-                
-                for interr in interrogations:
-                    writer.writerow([
-                        interr.materia,
-                        interr.lezione_num,
-                        interr.ordine,
-                        interr.student.registro_num,
-                        interr.student.nome,
-                        interr.student.cognome,
-                        interr.data_lezione.isoformat() if interr.data_lezione else ''
-                    ])
-            
-            return send_file(filepath, as_attachment=True, download_name=filename)
+                writer.writerows(rows)
+                return output.getvalue().encode('utf-8')
         
-        elif format_type == 'pdf':
-            # Esporta PDF
-            filename = f'calendario_{materia}_{timestamp}.pdf'
-            filepath = os.path.join(app.config['EXPORT_FOLDER'], filename)
-            
-            # Crea il PDF
-            generate_pdf_calendar(filepath, materia, interrogations)
-            
-            return send_file(filepath, as_attachment=True, download_name=filename)
+        elif extension == 'pdf':
+            def render():
+                buffer = BytesIO()
+                generate_pdf_calendar(buffer, materia, interrogations)
+                return buffer.getvalue()
         
         else:
-            # Esporta JSON
-            filename = f'calendario_{materia}_{timestamp}.json'
-            filepath = os.path.join(app.config['EXPORT_FOLDER'], filename)
-            
-            export_data = {
-                'materia': materia,
-                'exported_at': datetime.now().isoformat(),
-                'interrogations': [interr.to_dict() for interr in interrogations]
-            }
-            
-            with open(filepath, 'w', encoding='utf-8') as jsonfile:
-                json.dump(export_data, jsonfile, ensure_ascii=False, indent=2)
-            
-            return send_file(filepath, as_attachment=True, download_name=filename)
+            def render():
+                # Nessun orario di esportazione: il file viene riusato finché i dati non cambiano
+                export_data = {
+                    'materia': materia,
+                    'interrogations': records
+                }
+                return json_dumps(export_data, indent=True)
+        
+        # Riusa il file già generato se il contenuto non è cambiato; il file è
+        # aperto subito, così un'eliminazione LRU concorrente non lo invalida
+        export_file = get_export_store().open(key, extension, render)
+        
+        return send_file(export_file, as_attachment=True, download_name=download_name)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@bp.route('/api/exports/stats', methods=['GET'])
+def get_export_stats():
+    """
+    Statistiche dell'archivio esportazioni
+    
+    Returns:
+        JSON: Hit, miss, eliminazioni e spazio occupato
+    """
+    return jsonify({
+        'success': True,
+        'stats': get_export_store().stats()
+    })
+
+
 # ==================== API - GESTIONE INTERROGAZIONI ====================
 
-@app.route('/api/interrogations/by-materia/<materia>', methods=['GET'])
+@bp.route('/api/interrogations/by-materia/<materia>', methods=['GET'])
 def get_interrogations_by_materia(materia):
     """
     Recupera tutte le interrogazioni raggruppate per lezione/estrazione
@@ -1136,9 +1849,14 @@ def get_interrogations_by_materia(materia):
         JSON: Interrogazioni raggruppate
     """
     try:
-        interrogations = Interrogation.query.filter_by(materia=materia).order_by(
-            Interrogation.lezione_num, Interrogation.ordine
-        ).all()
+        version = get_materia_version(materia)
+        not_modified = not_modified_response(version)
+        if not_modified:
+            return not_modified
+        
+        interrogations = Interrogation.query.options(joinedload(Interrogation.student)).filter_by(
+            materia=materia
+        ).order_by(Interrogation.lezione_num, Interrogation.ordine).all()
         
         # Raggruppa per lezione (estrazione)
         groups = {}
@@ -1161,19 +1879,19 @@ def get_interrogations_by_materia(materia):
         # Converti in lista ordinata
         groups_list = [groups[k] for k in sorted(groups.keys())]
         
-        return jsonify({
+        return with_version_headers(jsonify({
             'success': True,
             'materia': materia,
             'groups': groups_list,
             'total_lessons': len(groups_list),
             'total_students': len(interrogations)
-        })
+        }), version)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/interrogations/all-materie', methods=['GET'])
+@bp.route('/api/interrogations/all-materie', methods=['GET'])
 def get_all_materie():
     """
     Recupera tutte le materie disponibili
@@ -1194,7 +1912,7 @@ def get_all_materie():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/interrogations/update-student', methods=['PUT'])
+@bp.route('/api/interrogations/update-student', methods=['PUT'])
 def update_interrogation_student():
     """
     Modifica lo studente di un'interrogazione specifica
@@ -1227,7 +1945,9 @@ def update_interrogation_student():
         
         # Aggiorna
         interrogation.student_id = new_student.id
+        version = record_calendar_change(interrogation.materia, 'student', [interrogation.lezione_num])
         db.session.commit()
+        notify_calendar_change(interrogation.materia, version, [interrogation.lezione_num])
         
         return jsonify({
             'success': True,
@@ -1243,7 +1963,199 @@ def update_interrogation_student():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/interrogations/export/<materia>/<format>', methods=['GET'])
+@bp.route('/api/interrogations/update-students-batch', methods=['PUT'])
+def update_interrogation_students_batch():
+    """
+    Modifica lo studente di più interrogazioni in un'unica transazione
+    
+    Interrogazioni e studenti sono letti con una query ciascuno; le operazioni
+    valide sono salvate con un solo commit, quelle non valide sono riportate
+    nei risultati senza bloccare le altre.
+    
+    Request Body:
+        operations (list): Lista di {interrogation_id, new_registro_num}
+        
+    Returns:
+        JSON: Risultato di ogni operazione, nello stesso ordine della richiesta
+    """
+    try:
+        data = request.get_json()
+        
+        operations = data.get('operations') if isinstance(data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'success': False, 'error': 'Dati mancanti'}), 400
+        
+        if not all(
+            isinstance(op, dict) and all(k in op for k in ['interrogation_id', 'new_registro_num'])
+            for op in operations
+        ):
+            return jsonify({'success': False, 'error': 'Operazione non valida: servono interrogation_id e new_registro_num'}), 400
+        
+        # Una query per le interrogazioni e una per gli studenti
+        interrogation_ids = {op['interrogation_id'] for op in operations}
+        registro_nums = {op['new_registro_num'] for op in operations}
+        
+        interrogations = {
+            interr.id: interr
+            for interr in Interrogation.query.filter(Interrogation.id.in_(interrogation_ids))
+        }
+        students = {
+            student.registro_num: student
+            for student in Student.query.filter(Student.registro_num.in_(registro_nums))
+        }
+        
+        results = []
+        for op in operations:
+            interrogation = interrogations.get(op['interrogation_id'])
+            new_student = students.get(op['new_registro_num'])
+            
+            result = {'interrogation_id': op['interrogation_id'], 'success': False}
+            if not interrogation:
+                result['error'] = 'Interrogazione non trovata'
+            elif not new_student:
+                result['error'] = 'Studente non trovato'
+            else:
+                interrogation.student_id = new_student.id
+                result['success'] = True
+                result['student'] = new_student.to_dict()
+            results.append(result)
+        
+        updated = sum(1 for result in results if result['success'])
+        if updated:
+            # Lezioni modificate, raggruppate per materia
+            changed = {}
+            for result in results:
+                if result['success']:
+                    interrogation = interrogations[result['interrogation_id']]
+                    changed.setdefault(interrogation.materia, set()).add(interrogation.lezione_num)
+            
+            versions = {
+                materia: record_calendar_change(materia, 'student', lezioni)
+                for materia, lezioni in changed.items()
+            }
+            db.session.commit()
+            
+            for materia, lezioni in changed.items():
+                notify_calendar_change(materia, versions[materia], lezioni)
+        
+        return jsonify({
+            'success': True,
+            'message': f'{updated} interrogazioni aggiornate su {len(results)}',
+            'updated': updated,
+            'failed': len(results) - updated,
+            'results': results
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@bp.route('/api/interrogations/reorder', methods=['PUT'])
+def reorder_interrogations():
+    """
+    Sposta e riordina le interrogazioni di una materia con un solo UPDATE
+    
+    Riceve la disposizione finale (lezione_num, ordine) delle interrogazioni
+    indicate; quelle non indicate restano dove sono. Chi cambia lezione prende
+    la data della lezione di destinazione.
+    
+    Request Body:
+        materia (str): Nome materia
+        layout (list): Lista di {id, lezione_num, ordine}
+        
+    Returns:
+        JSON: Risultato riordino
+    """
+    try:
+        data = request.get_json()
+        
+        if not isinstance(data, dict) or not data.get('materia') or not isinstance(data.get('layout'), list) or not data['layout']:
+            return jsonify({'success': False, 'error': 'Dati mancanti'}), 400
+        
+        materia = data['materia']
+        layout = data['layout']
+        
+        # Validazione della struttura
+        for item in layout:
+            if not isinstance(item, dict) or not all(
+                isinstance(item.get(k), int) and not isinstance(item.get(k), bool) and item[k] >= 1
+                for k in ['id', 'lezione_num', 'ordine']
+            ):
+                return jsonify({
+                    'success': False,
+                    'error': 'Elemento non valido: servono id, lezione_num e ordine interi positivi'
+                }), 400
+        
+        targets = {item['id']: (item['lezione_num'], item['ordine']) for item in layout}
+        if len(targets) != len(layout):
+            return jsonify({'success': False, 'error': 'Interrogazione ripetuta nel layout'}), 400
+        
+        # Posizioni attuali di tutta la materia (sole colonne necessarie)
+        current = db.session.query(
+            Interrogation.id,
+            Interrogation.lezione_num,
+            Interrogation.ordine,
+            Interrogation.data_lezione
+        ).filter(Interrogation.materia == materia).all()
+        
+        missing = sorted(set(targets) - {row.id for row in current})
+        if missing:
+            return jsonify({
+                'success': False,
+                'error': f'Interrogazioni non trovate per {materia}: {missing}'
+            }), 404
+        
+        # La disposizione finale non deve avere due interrogazioni nella stessa posizione
+        positions = {}
+        lesson_dates = {}
+        for row in current:
+            position = targets.get(row.id, (row.lezione_num, row.ordine))
+            if position in positions:
+                return jsonify({
+                    'success': False,
+                    'error': f'Posizione duplicata: lezione {position[0]}, ordine {position[1]} '
+                             f'(interrogazioni {positions[position]} e {row.id})'
+                }), 400
+            positions[position] = row.id
+            if row.data_lezione is not None:
+                lesson_dates.setdefault(row.lezione_num, row.data_lezione)
+        
+        # Un solo UPDATE con CASE sull'id per tutte le interrogazioni spostate
+        db.session.execute(
+            update(Interrogation)
+            .where(Interrogation.id.in_(list(targets)))
+            .values(
+                lezione_num=case({i: pos[0] for i, pos in targets.items()}, value=Interrogation.id),
+                ordine=case({i: pos[1] for i, pos in targets.items()}, value=Interrogation.id),
+                data_lezione=case(
+                    {i: lesson_dates.get(pos[0]) for i, pos in targets.items()},
+                    value=Interrogation.id
+                )
+            ),
+            execution_options={'synchronize_session': False}
+        )
+        
+        # Lezioni di partenza e di destinazione delle interrogazioni spostate
+        changed = {pos[0] for pos in targets.values()}
+        changed.update(row.lezione_num for row in current if row.id in targets)
+        version = record_calendar_change(materia, 'move', changed)
+        db.session.commit()
+        
+        notify_calendar_change(materia, version, changed)
+        
+        return jsonify({
+            'success': True,
+            'message': f'{len(targets)} interrogazioni riordinate',
+            'updated': len(targets)
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@bp.route('/api/interrogations/export/<materia>/<format>', methods=['GET'])
 def export_interrogations(materia, format):
     """
     Esporta interrogazioni in formato JSON o CSV
@@ -1256,163 +2168,136 @@ def export_interrogations(materia, format):
         File: Download del file
     """
     try:
-        from datetime import datetime
-        import csv
-        from io import StringIO
+        if format not in RENDERERS:
+            return jsonify({'success': False, 'error': 'Formato non valido'}), 400
         
-        interrogations = Interrogation.query.filter_by(materia=materia).order_by(
-            Interrogation.lezione_num, Interrogation.ordine
-        ).all()
+        interrogations = Interrogation.query.options(joinedload(Interrogation.student)).filter_by(
+            materia=materia
+        ).order_by(Interrogation.lezione_num, Interrogation.ordine).all()
+        rows = [interrogation_row(interr) for interr in interrogations]
         
-        if format == 'json':
-            # Export JSON
-            groups = {}
-            for interr in interrogations:
-                lezione_num = interr.lezione_num
-                if lezione_num not in groups:
-                    groups[lezione_num] = {
-                        'lezione': lezione_num,
-                        'data': interr.data_lezione.strftime('%Y-%m-%d') if interr.data_lezione else None,
-                        'studenti': []
-                    }
-                
-                groups[lezione_num]['studenti'].append({
-                    'ordine': interr.ordine,
-                    'registro_num': interr.student.registro_num,
-                    'nome': interr.student.nome,
-                    'cognome': interr.student.cognome
-                })
-            
-            data = {
-                'materia': materia,
-                'data_export': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'estrazioni': [groups[k] for k in sorted(groups.keys())]
-            }
-            
-            response = make_response(json.dumps(data, indent=2, ensure_ascii=False))
-            response.headers['Content-Type'] = 'application/json; charset=utf-8'
-            response.headers['Content-Disposition'] = f'attachment; filename=interrogazioni_{materia}_{datetime.now().strftime("%Y%m%d")}.json'
-            return response
-            
-        elif format == 'csv':
-            # Export CSV
-            output = StringIO()
-            writer = csv.writer(output)
-            writer.writerow(['Lezione', 'Data', 'Ordine', 'Registro', 'Nome', 'Cognome'])
-            
-            for interr in interrogations:
-                writer.writerow([
-                    interr.lezione_num,
-                    interr.data_lezione.strftime('%Y-%m-%d') if interr.data_lezione else '',
-                    interr.ordine,
-                    interr.student.registro_num,
-                    interr.student.nome,
-                    interr.student.cognome
-                ])
-            
-            response = make_response(output.getvalue())
-            response.headers['Content-Type'] = 'text/csv; charset=utf-8'
-            response.headers['Content-Disposition'] = f'attachment; filename=interrogazioni_{materia}_{datetime.now().strftime("%Y%m%d")}.csv'
-            return response
-        
-        elif format == 'pdf':
-            # Export PDF
-            from io import BytesIO
-            from reportlab.lib.pagesizes import A4
-            from reportlab.lib import colors
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.units import cm
-            
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, 
-                                   topMargin=2*cm, bottomMargin=2*cm)
-            
-            elements = []
-            styles = getSampleStyleSheet()
-            
-            # Titolo
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=18,
-                textColor=colors.HexColor('#2c3e50'),
-                spaceAfter=30,
-                alignment=1  # Center
-            )
-            elements.append(Paragraph(f"Calendario Interrogazioni - {materia}", title_style))
-            elements.append(Paragraph(f"Esportato il: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 
-                                     styles['Normal']))
-            elements.append(Spacer(1, 0.5*cm))
-            
-            # Raggruppa per lezione
-            groups = {}
-            for interr in interrogations:
-                lezione_num = interr.lezione_num
-                if lezione_num not in groups:
-                    groups[lezione_num] = []
-                groups[lezione_num].append(interr)
-            
-            # Crea tabelle per ogni gruppo
-            for lezione_num in sorted(groups.keys()):
-                # Header del gruppo
-                header_style = ParagraphStyle(
-                    'GroupHeader',
-                    parent=styles['Heading2'],
-                    fontSize=14,
-                    textColor=colors.HexColor('#3498db'),
-                    spaceAfter=10
-                )
-                
-                data_lezione = groups[lezione_num][0].data_lezione
-                data_str = data_lezione.strftime('%d/%m/%Y') if data_lezione else 'Data non assegnata'
-                elements.append(Paragraph(f"Estrazione {lezione_num} - {data_str}", header_style))
-                
-                # Tabella studenti
-                table_data = [['#', 'Registro', 'Nome', 'Cognome']]
-                for interr in groups[lezione_num]:
-                    table_data.append([
-                        str(interr.ordine),
-                        str(interr.student.registro_num),
-                        interr.student.nome,
-                        interr.student.cognome
-                    ])
-                
-                table = Table(table_data, colWidths=[1.5*cm, 2*cm, 6*cm, 6*cm])
-                table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 11),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#ecf0f1')])
-                ]))
-                
-                elements.append(table)
-                elements.append(Spacer(1, 0.8*cm))
-            
-            # Genera PDF
-            doc.build(elements)
-            buffer.seek(0)
-            
-            response = make_response(buffer.getvalue())
-            response.headers['Content-Type'] = 'application/pdf'
-            response.headers['Content-Disposition'] = f'attachment; filename=interrogazioni_{materia}_{datetime.now().strftime("%Y%m%d")}.pdf'
-            return response
+        render, content_type = RENDERERS[format]
+        response = make_response(render(materia, rows))
+        response.headers['Content-Type'] = content_type
+        response.headers['Content-Disposition'] = f'attachment; filename=interrogazioni_{materia}_{datetime.now().strftime("%Y%m%d")}.{format}'
+        return response
         
-        else:
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@bp.route('/api/interrogations/export-bundle/<format>', methods=['GET'])
+def export_interrogations_bundle(format):
+    """
+    Esporta il calendario di più materie in un unico archivio ZIP
+    
+    I file delle singole materie sono generati in parallelo su più processi
+    e l'archivio viene inviato man mano che i file sono pronti.
+    
+    Args:
+        format (str): 'json', 'csv' o 'pdf'
+        
+    Query Parameters:
+        materie (str, optional): Materie da esportare, ripetute o separate da virgola
+                                 (default: tutte)
+        
+    Returns:
+        File: Archivio ZIP con un file per materia
+    """
+    try:
+        if format not in RENDERERS:
             return jsonify({'success': False, 'error': 'Formato non valido'}), 400
         
+        materie = [m.strip() for value in request.args.getlist('materie') for m in value.split(',') if m.strip()]
+        
+        # Un'unica query per tutte le materie del pacchetto
+        query = db.session.query(
+            Interrogation.materia,
+            Interrogation.lezione_num,
+            Interrogation.data_lezione,
+            Interrogation.ordine,
+            Student.registro_num,
+            Student.nome,
+            Student.cognome
+        ).join(Student, Interrogation.student_id == Student.id)
+        
+        if materie:
+            query = query.filter(Interrogation.materia.in_(materie))
+        
+        rows_by_materia = {}
+        for row in query.order_by(Interrogation.materia, Interrogation.lezione_num, Interrogation.ordine):
+            rows_by_materia.setdefault(row.materia, []).append(row._asdict())
+        
+        if not rows_by_materia:
+            return jsonify({'success': False, 'error': 'Nessuna interrogazione da esportare'}), 404
+        
+        timestamp = datetime.now().strftime('%Y%m%d')
+        
+        workers = current_app.config['EXPORT_WORKERS']
+        
+        def filename(materia):
+            return f'interrogazioni_{secure_filename(materia) or "materia"}_{timestamp}.{format}'
+        
+        def entries():
+            # Con una sola materia non conviene passare dal pool di processi
+            if len(rows_by_materia) == 1:
+                for materia, rows in rows_by_materia.items():
+                    yield filename(materia), render_export(format, materia, rows)
+                return
+            
+            with process_pool(workers) as pool:
+                futures = [pool.submit(render_export, format, materia, rows) for materia, rows in rows_by_materia.items()]
+                for materia, future in zip(rows_by_materia, futures):
+                    yield filename(materia), future.result()
+        
+        response = Response(stream_zip(entries()), mimetype='application/zip')
+        response.headers['Content-Disposition'] = f'attachment; filename=interrogazioni_{format}_{timestamp}.zip'
+        return response
+        
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 # ==================== API - AI ADVISOR ====================
 
-@app.route('/api/ai-advice', methods=['POST'])
+def get_materia_analysis(materia, name):
+    """
+    Restituisce un'analisi AI della materia, calcolandola solo se i dati sono cambiati
+    
+    Gli aggregati SQL e l'analisi della distribuzione sono condivisi tra le
+    analisi della stessa versione dei dati (la qualità riusa la distribuzione).
+    
+    Args:
+        materia (str): Nome materia
+        name (str): 'distribution', 'quality' o 'study_time'
+        
+    Returns:
+        dict: Risultato dell'analisi
+    """
+    version = get_analysis_version(materia)
+    
+    def cached(analysis, compute):
+        return get_analysis_cache().get_or_compute(materia, version, analysis, compute)
+    
+    stats = cached('stats', lambda: get_calendar_stats(materia))
+    
+    def distribution():
+        return cached('distribution', lambda: ai_advisor.analyze_distribution_counts(stats['student_counts']))
+    
+    if name == 'distribution':
+        return distribution()
+    
+    if name == 'quality':
+        return cached('quality', lambda: ai_advisor.evaluate_schedule_quality_counts(
+            stats['student_counts'], stats['duplicates'], version[1],
+            distribution_analysis=distribution()
+        ))
+    
+    # Servono solo i numeri di lezione
+    return cached('study_time', lambda: ai_advisor.generate_study_time_advice(stats['student_counts']))
+
+
+@bp.route('/api/ai-advice', methods=['POST'])
 def get_ai_advice():
     """
     Ottiene consigli AI sul calendario
@@ -1429,39 +2314,8 @@ def get_ai_advice():
         materia = data.get('materia')
         advice_type = data.get('advice_type', 'general')
         
-        if advice_type == 'general':
-            advice = ai_advisor.get_general_advice()
-        
-        elif advice_type == 'distribution':
-            interrogations = Interrogation.query.filter_by(materia=materia).all()
-            calendario = {}
-            for interr in interrogations:
-                if interr.lezione_num not in calendario:
-                    calendario[interr.lezione_num] = []
-                calendario[interr.lezione_num].append(interr.to_dict())
-            
-            advice = ai_advisor.analyze_distribution(calendario)
-        
-        elif advice_type == 'quality':
-            interrogations = Interrogation.query.filter_by(materia=materia).all()
-            calendario = {}
-            for interr in interrogations:
-                if interr.lezione_num not in calendario:
-                    calendario[interr.lezione_num] = []
-                calendario[interr.lezione_num].append(interr.to_dict())
-            
-            total_students = Student.query.count()
-            advice = ai_advisor.evaluate_schedule_quality(calendario, total_students)
-        
-        elif advice_type == 'study_time':
-            interrogations = Interrogation.query.filter_by(materia=materia).all()
-            calendario = {}
-            for interr in interrogations:
-                if interr.lezione_num not in calendario:
-                    calendario[interr.lezione_num] = []
-                calendario[interr.lezione_num].append(interr.to_dict())
-            
-            advice = ai_advisor.generate_study_time_advice(calendario)
+        if advice_type in ('distribution', 'quality', 'study_time'):
+            advice = get_materia_analysis(materia, advice_type)
         
         else:
             advice = ai_advisor.get_general_advice()
@@ -1477,7 +2331,7 @@ def get_ai_advice():
 
 # ==================== VISUALIZZAZIONE INTERROGAZIONI ====================
 
-@app.route('/api/interrogations', methods=['GET'])
+@bp.route('/api/interrogations', methods=['GET'])
 def get_interrogations():
     """
     Endpoint per visualizzare tutte le interrogazioni salvate nel database
@@ -1485,52 +2339,104 @@ def get_interrogations():
     Query Parameters:
         materia (str, optional): Filtra per materia specifica
         student_id (int, optional): Filtra per studente specifico
-        limit (int, optional): Limita il numero di risultati
+        limit (int, optional): Numero di risultati per pagina
+        cursor (str, optional): Cursore restituito dalla pagina precedente (next_cursor)
+        fields (str, optional): Campi da restituire, separati da virgola
+                                (es. "id,ordine,student.nome")
+        shape (str, optional): 'normalized' per ricevere gli studenti in una
+                               mappa per id e le interrogazioni come liste di valori
     
     Returns:
         JSON: {
             "success": bool,
             "count": int,
-            "interrogations": [...]
+            "interrogations": [...],
+            "next_cursor": str | null
         }
+        Con materia la risposta ha gli header ETag/Last-Modified e le
+        richieste condizionali ricevono 304 se i dati non sono cambiati.
     """
     try:
+        try:
+            projection = InterrogationProjection(
+                request.args.get('fields'), request.args.get('shape')
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
         # Ottieni parametri di filtro
         materia = request.args.get('materia')
         student_id = request.args.get('student_id', type=int)
         limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        
+        # Con una sola materia la versione è quella della materia
+        version = None
+        if materia:
+            version = get_materia_version(materia, representation_variant(
+                'cursor', 'fields', 'limit', 'shape', 'student_id'
+            ))
+            not_modified = not_modified_response(version)
+            if not_modified:
+                return not_modified
         
-        # Query base
-        query = Interrogation.query
+        # Query base: solo le colonne richieste (più quelle di ordinamento)
+        query = projection.query('materia', 'lezione_num', 'ordine', 'id')
         
         # Applica filtri se presenti
         if materia:
-            query = query.filter_by(materia=materia)
+            query = query.filter(Interrogation.materia == materia)
         if student_id:
-            query = query.filter_by(student_id=student_id)
+            query = query.filter(Interrogation.student_id == student_id)
         
-        # Ordina per materia, lezione e ordine
-        query = query.order_by(
+        # Ordina per materia, lezione e ordine (id rende la chiave univoca)
+        sort_columns = [
             Interrogation.materia,
             Interrogation.lezione_num,
-            Interrogation.ordine
-        )
-        
-        # Applica limite se specificato
-        if limit:
-            query = query.limit(limit)
-        
-        # Esegui query
-        interrogations = query.all()
+            Interrogation.ordine,
+            Interrogation.id
+        ]
         
-        # Converti in dizionari
-        result = [interr.to_dict() for interr in interrogations]
+        # Paginazione keyset se richiesta, altrimenti tutte le interrogazioni
+        next_cursor = None
+        if limit or cursor:
+            try:
+                interrogations, next_cursor = paginate_keyset(
+                    query, sort_columns, limit or DEFAULT_PAGE_SIZE, cursor
+                )
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+        else:
+            interrogations = query.order_by(*sort_columns).all()
+        
+        if projection.normalized:
+            students = {}
+            result = [
+                projection.serialize_normalized(interr, students)
+                for interr in interrogations
+            ]
+            
+            response = jsonify({
+                'success': True,
+                'shape': 'normalized',
+                'count': len(result),
+                'fields': projection.tuple_fields,
+                'students': students,
+                'interrogations': result,
+                'next_cursor': next_cursor
+            })
+        else:
+            # Converti in dizionari
+            result = [projection.serialize(interr) for interr in interrogations]
+            
+            response = jsonify({
+                'success': True,
+                'count': len(result),
+                'interrogations': result,
+                'next_cursor': next_cursor
+            })
         
-        return jsonify({
-            'success': True,
-            'count': len(result),
-            'interrogations': result
-        })
+        return with_version_headers(response, version) if version else response
         
     except Exception as e:
         return jsonify({
@@ -1539,7 +2445,7 @@ def get_interrogations():
         }), 500
 
 
-@app.route('/api/interrogations/<int:interrogation_id>', methods=['GET'])
+@bp.route('/api/interrogations/<int:interrogation_id>', methods=['GET'])
 def get_interrogation_by_id(interrogation_id):
     """
     Endpoint per visualizzare una singola interrogazione per ID
@@ -1547,6 +2453,9 @@ def get_interrogation_by_id(interrogation_id):
     Args:
         interrogation_id (int): ID dell'interrogazione
     
+    Query Parameters:
+        fields (str, optional): Campi da restituire, separati da virgola
+    
     Returns:
         JSON: {
             "success": bool,
@@ -1554,7 +2463,12 @@ def get_interrogation_by_id(interrogation_id):
         }
     """
     try:
-        interrogation = Interrogation.query.get(interrogation_id)
+        try:
+            projection = InterrogationProjection(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        interrogation = projection.query().filter(Interrogation.id == interrogation_id).first()
         
         if not interrogation:
             return jsonify({
@@ -1564,7 +2478,7 @@ def get_interrogation_by_id(interrogation_id):
         
         return jsonify({
             'success': True,
-            'interrogation': interrogation.to_dict()
+            'interrogation': projection.serialize(interrogation)
         })
         
     except Exception as e:
@@ -1574,7 +2488,7 @@ def get_interrogation_by_id(interrogation_id):
         }), 500
 
 
-@app.route('/interrogations')
+@bp.route('/interrogations')
 def view_interrogations():
     """
     Pagina HTML per visualizzare le interrogazioni salvate
@@ -1582,15 +2496,55 @@ def view_interrogations():
     return render_template('interrogations.html')
 
 
+# ==================== METRICHE ====================
+
+@bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Metriche per route (latenza, stati, query SQL) in formato Prometheus
+    
+    Returns:
+        text/plain: Metriche del processo che risponde
+    """
+    metrics = current_app.extensions['metrics']
+    if not metrics.enabled:
+        return jsonify({'success': False, 'error': 'Metriche disabilitate'}), 404
+    
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """
+    Scarica un profilo salvato con l'header X-Profile (richiede X-Admin-Token)
+    
+    Args:
+        profile_id (str): Id restituito nell'header X-Profile-Id
+        
+    Returns:
+        File: Profilo in formato pstats (python -m pstats <file>)
+    """
+    profiler = current_app.extensions['profiler']
+    if not profiler.check_token(request.headers.get(TOKEN_HEADER, '')):
+        return jsonify({'success': False, 'error': 'Non autorizzato'}), 403
+    
+    path = profiler.get_path(profile_id)
+    if path is None:
+        return jsonify({'success': False, 'error': 'Profilo non trovato'}), 404
+    
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f'{profile_id}.prof')
+
+
 # ==================== ERRORI ====================
 
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(error):
     """Handler errore 404"""
     return jsonify({'success': False, 'error': 'Risorsa non trovata'}), 404
 
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
     """Handler errore 500"""
     db.session.rollback()
@@ -1599,15 +2553,11 @@ def internal_error(error):
 
 # ==================== MAIN ====================
 
+# Applicazione di default: server di sviluppo, test e import esistenti.
+# In produzione usare wsgi.py con gunicorn (vedi DEPLOY.md)
 if __name__ == '__main__':
-    with app.app_context():
-        # Crea tabelle se non esistono (solo se MySQL è disponibile)
-        try:
-            db.create_all()
-            print("✓ Database MySQL connesso e tabelle create")
-        except Exception as e:
-            print(f"⚠ MySQL non disponibile: {e}")
-            print("✓ L'applicazione funzionerà solo con TinyDB")
+    app = create_app()
+    init_database(app)
     
     print("\n" + "="*50)
     print("  Applicazione Interrogazioni Programmate")
@@ -1616,7 +2566,7 @@ if __name__ == '__main__':
     print(f"✓ Accesso LAN: http://<tuo-ip>:{app.config['PORT']}")
     print("\nPremi CTRL+C per fermare il server\n")
     
-    # Avvia server
+    # Avvia server di sviluppo (un solo processo)
     app.run(
         host=app.config['HOST'],
         port=app.config['PORT'],
@@ -1,6 +1,6 @@
 """
 Modelli del database per l'applicazione di gestione interrogazioni
-Utilizza SQLAlchemy per ORM con MySQL
+Utilizza SQLAlchemy per ORM con MySQL o SQLite
 """
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
@@ -21,6 +21,10 @@ class Student(db.Model):
         created_at (datetime): Data di creazione del record
     """
     __tablename__ = 'students'
+    __table_args__ = (
+        # Ricerca per nome e cognome (registro_num è già indicizzato da UNIQUE)
+        db.Index('idx_nome_cognome', 'nome', 'cognome'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     registro_num = db.Column(db.Integer, nullable=False, unique=True)
@@ -35,6 +39,8 @@ class Student(db.Model):
         """
         Converte l'oggetto Student in un dizionario
         
+        Le date restano oggetti datetime: le serializza il provider JSON.
+        
         Returns:
             dict: Rappresentazione in dizionario dello studente
         """
@@ -43,7 +49,7 @@ class Student(db.Model):
             'registro_num': self.registro_num,
             'nome': self.nome,
             'cognome': self.cognome,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
     
     def __repr__(self):
@@ -71,10 +77,20 @@ class Interrogation(db.Model):
         updated_at (datetime): Data di ultimo aggiornamento
     """
     __tablename__ = 'interrogations'
+    __table_args__ = (
+        # Stessi indici di database/schema.sql (usati da create_all, es. con SQLite)
+        db.Index('idx_materia', 'materia'),
+        db.Index('idx_lezione', 'lezione_num'),
+        db.Index('idx_student', 'student_id'),
+        # Copre il calcolo della versione per materia (COUNT/MAX su updated_at)
+        db.Index('idx_materia_updated', 'materia', 'updated_at'),
+        # Ordinamento e paginazione keyset di /api/interrogations
+        db.Index('idx_materia_lezione_ordine', 'materia', 'lezione_num', 'ordine', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     materia = db.Column(db.String(100), nullable=False)
-    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='CASCADE'), nullable=False)
     lezione_num = db.Column(db.Integer, nullable=False)
     data_lezione = db.Column(db.Date, nullable=True)
     ordine = db.Column(db.Integer, nullable=False)
@@ -85,6 +101,8 @@ class Interrogation(db.Model):
         """
         Converte l'oggetto Interrogation in un dizionario
         
+        Le date restano oggetti date/datetime: le serializza il provider JSON.
+        
         Returns:
             dict: Rappresentazione in dizionario dell'interrogazione
         """
@@ -94,10 +112,10 @@ class Interrogation(db.Model):
             'student_id': self.student_id,
             'student': self.student.to_dict() if self.student else None,
             'lezione_num': self.lezione_num,
-            'data_lezione': self.data_lezione.isoformat() if self.data_lezione else None,
+            'data_lezione': self.data_lezione,
             'ordine': self.ordine,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
     
     def __repr__(self):
@@ -122,6 +140,10 @@ class CalendarConfiguration(db.Model):
         created_at (datetime): Data di creazione
     """
     __tablename__ = 'calendar_configurations'
+    __table_args__ = (
+        # idx_materia di schema.sql: in SQLite i nomi degli indici sono unici nel database
+        db.Index('idx_config_materia', 'materia'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     materia = db.Column(db.String(100), nullable=False)
@@ -141,7 +163,7 @@ class CalendarConfiguration(db.Model):
             'materia': self.materia,
             'num_lezioni': self.num_lezioni,
             'distribuzione': self.distribuzione,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
     
     def __repr__(self):
@@ -152,3 +174,56 @@ class CalendarConfiguration(db.Model):
             str: Stringa rappresentativa
         """
         return f'<CalendarConfiguration {self.materia} - {self.num_lezioni} lezioni>'
+
+
+class InterrogationChange(db.Model):
+    """
+    Registro delle modifiche al calendario di una materia
+    
+    L'id crescente è la versione del calendario: un client che conosce la
+    versione v ottiene le lezioni modificate leggendo le righe con id > v.
+    
+    Attributes:
+        id (int): Versione (auto-incrementale, monotona)
+        materia (str): Nome della materia
+        lezione_num (int): Lezione modificata (None = intero calendario)
+        op (str): Tipo di modifica ('create', 'shuffle', 'student', 'move', 'date', 'modify', 'delete')
+        created_at (datetime): Data della modifica
+    """
+    __tablename__ = 'interrogation_changes'
+    __table_args__ = (
+        # Lettura delle modifiche successive a una versione
+        db.Index('idx_materia_id', 'materia', 'id'),
+        # Con SQLite gli id eliminati non vengono riutilizzati (versione monotona)
+        {'sqlite_autoincrement': True},
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    materia = db.Column(db.String(100), nullable=False)
+    lezione_num = db.Column(db.Integer, nullable=True)
+    op = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        """
+        Converte l'oggetto InterrogationChange in un dizionario
+        
+        Returns:
+            dict: Rappresentazione in dizionario
+        """
+        return {
+            'id': self.id,
+            'materia': self.materia,
+            'lezione_num': self.lezione_num,
+            'op': self.op,
+            'created_at': self.created_at
+        }
+    
+    def __repr__(self):
+        """
+        Rappresentazione testuale
+        
+        Returns:
+            str: Stringa rappresentativa
+        """
+        return f'<InterrogationChange {self.id} {self.materia} - lezione {self.lezione_num} ({self.op})>'
@@ -0,0 +1,194 @@
+"""
+Serializzazione delle interrogazioni con proiezione delle colonne
+Legge dal database solo i campi richiesti (parametro fields=) e costruisce
+direttamente i dizionari di risposta, senza caricare gli oggetti ORM;
+le date sono lasciate al provider JSON.
+Con shape=normalized ogni studente compare una sola volta in una mappa per id
+e le interrogazioni diventano liste di valori che lo referenziano
+"""
+from functools import cached_property
+
+from .models import db, Student, Interrogation
+
+
+# Campi selezionabili: nome nel JSON -> colonna del database
+INTERROGATION_FIELDS = {
+    'id': Interrogation.id,
+    'materia': Interrogation.materia,
+    'student_id': Interrogation.student_id,
+    'lezione_num': Interrogation.lezione_num,
+    'data_lezione': Interrogation.data_lezione,
+    'ordine': Interrogation.ordine,
+    'created_at': Interrogation.created_at,
+    'updated_at': Interrogation.updated_at
+}
+
+STUDENT_FIELDS = {
+    'id': Student.id,
+    'registro_num': Student.registro_num,
+    'nome': Student.nome,
+    'cognome': Student.cognome,
+    'created_at': Student.created_at
+}
+
+# Prefisso delle colonne dello studente nella riga risultato
+_STUDENT_PREFIX = 'student__'
+
+# Forme di risposta supportate (parametro shape=)
+SHAPES = ('nested', 'normalized')
+
+
+class InterrogationProjection:
+    """
+    Proiezione dei campi di un'interrogazione richiesti dal client
+
+    Il parametro fields è una lista separata da virgole di campi
+    dell'interrogazione; 'student' include tutto lo studente annidato,
+    'student.nome' solo alcuni suoi campi. Senza fields la risposta ha
+    la stessa forma di Interrogation.to_dict().
+    """
+
+    def __init__(self, fields=None, shape=None):
+        """
+        Interpreta i parametri fields e shape
+
+        Args:
+            fields (str, optional): Campi richiesti separati da virgola
+            shape (str, optional): 'nested' (default) o 'normalized'
+
+        Raises:
+            ValueError: Se è richiesto un campo o una forma sconosciuti
+        """
+        shape = shape or 'nested'
+        if shape not in SHAPES:
+            raise ValueError(f'Formato non valido: {shape}')
+        self.normalized = shape == 'normalized'
+
+        if not fields:
+            self.fields = list(INTERROGATION_FIELDS)
+            self.student_fields = list(STUDENT_FIELDS)
+            # Come in to_dict, 'student' segue 'student_id'
+            self.fields.insert(self.fields.index('student_id') + 1, 'student')
+            return
+
+        self.fields = []
+        self.student_fields = None
+
+        for name in (f.strip() for f in fields.split(',')):
+            if not name:
+                continue
+
+            if name == 'student':
+                self._add_student_fields(list(STUDENT_FIELDS))
+            elif name.startswith('student.'):
+                sub_field = name.split('.', 1)[1]
+                if sub_field not in STUDENT_FIELDS:
+                    raise ValueError(f'Campo non valido: {name}')
+                self._add_student_fields([sub_field])
+            elif name in INTERROGATION_FIELDS:
+                if name not in self.fields:
+                    self.fields.append(name)
+            else:
+                raise ValueError(f'Campo non valido: {name}')
+
+    def _add_student_fields(self, names):
+        """
+        Aggiunge campi dello studente alla proiezione
+
+        Args:
+            names (list): Nomi dei campi dello studente
+
+        Returns:
+            None
+        """
+        if self.student_fields is None:
+            self.student_fields = []
+            self.fields.append('student')
+        for name in names:
+            if name not in self.student_fields:
+                self.student_fields.append(name)
+
+    def query(self, *required):
+        """
+        Crea la query con le sole colonne necessarie
+
+        Args:
+            *required (str): Campi dell'interrogazione sempre letti (es. per
+                             ordinamento e raggruppamento), anche se non restituiti
+
+        Returns:
+            Query: Query SQLAlchemy su interrogations (con join sugli studenti se serve)
+        """
+        names = [name for name in self.fields if name != 'student']
+        names += [name for name in required if name not in names]
+        if self.student_fields is not None and 'student_id' not in names:
+            # Chiave della mappa studenti nella forma normalizzata
+            names.append('student_id')
+
+        columns = [INTERROGATION_FIELDS[name].label(name) for name in names]
+        if self.student_fields is not None:
+            columns += [
+                STUDENT_FIELDS[name].label(_STUDENT_PREFIX + name)
+                for name in self.student_fields
+            ]
+
+        query = db.session.query(*columns).select_from(Interrogation)
+        if self.student_fields is not None:
+            query = query.outerjoin(Student, Interrogation.student_id == Student.id)
+        return query
+
+    def serialize(self, row):
+        """
+        Converte una riga della query in dizionario
+
+        Args:
+            row (Row): Riga prodotta dalla query di questa proiezione
+
+        Returns:
+            dict: Interrogazione con i soli campi richiesti
+        """
+        mapping = row._mapping
+        result = {}
+        for name in self.fields:
+            if name == 'student':
+                values = {key: mapping[_STUDENT_PREFIX + key] for key in self.student_fields}
+                if all(value is None for value in values.values()):
+                    result['student'] = None
+                else:
+                    result['student'] = values
+            else:
+                result[name] = mapping[name]
+        return result
+
+    @cached_property
+    def tuple_fields(self):
+        """
+        Campi di ogni interrogazione nella forma normalizzata, nell'ordine dei valori
+
+        Returns:
+            list: Nomi dei campi ('student_id' referenzia la mappa studenti)
+        """
+        names = [name for name in self.fields if name != 'student']
+        if self.student_fields is not None and 'student_id' not in names:
+            names.append('student_id')
+        return names
+
+    def serialize_normalized(self, row, students):
+        """
+        Converte una riga della query in lista di valori registrando lo studente
+
+        Args:
+            row (Row): Riga prodotta dalla query di questa proiezione
+            students (dict): Mappa id studente -> studente, aggiornata sul posto
+
+        Returns:
+            list: Valori nell'ordine di tuple_fields
+        """
+        mapping = row._mapping
+        if self.student_fields is not None:
+            student_id = mapping['student_id']
+            if student_id is not None and student_id not in students:
+                students[student_id] = {
+                    key: mapping[_STUDENT_PREFIX + key] for key in self.student_fields
+                }
+        return [mapping[name] for name in self.tuple_fields]
@@ -0,0 +1,386 @@
+"""
+Benchmark delle funzioni principali su dati sintetici
+Misura create_random_calendar, parse_csv, parse_json, generate_pdf_calendar,
+AIAdvisor.evaluate_schedule_quality e le operazioni di TinyDBManager su elenchi
+da 30 a 100.000 studenti (benchmarks/dataset.py). I risultati sono salvati in
+JSON e confrontati con benchmarks/baselines.json: termina con errore se un
+caso è più lento della baseline oltre la tolleranza
+
+Esegui con:
+    python benchmarks/bench_functions.py                      # tutte le scale
+    python benchmarks/bench_functions.py --scales 30,1000     # solo alcune scale
+    python benchmarks/bench_functions.py --only tinydb        # solo alcuni casi
+    python benchmarks/bench_functions.py --save-baseline      # aggiorna la baseline
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from benchmarks.dataset import (
+    SCALES, generate_roster, generate_calendar, calendar_to_interrogations,
+    calendar_to_rows, write_roster_csv, write_roster_json
+)
+from utils.ai_advisor import AIAdvisor
+from utils.app_loader import load_app_module
+from utils.database_manager import TinyDBManager
+
+
+BASELINE_PATH = os.path.join(BASE_DIR, 'benchmarks', 'baselines.json')
+RESULTS_PATH = os.path.join(BASE_DIR, 'benchmarks', 'results.json')
+
+# Un caso è una regressione se è più lento della baseline oltre questa frazione
+DEFAULT_TOLERANCE = 0.5
+
+# Ripetizioni: almeno MIN_RUNS, poi finché non si supera MIN_TIME secondi o MAX_RUNS
+MIN_RUNS = 3
+MAX_RUNS = 20
+MIN_TIME = 0.5
+
+# Operazioni singole di TinyDB ripetute su un database di N studenti
+TINYDB_SINGLE_OPS = 20
+
+# Impaginazione semplice: 3 lezioni a settimana da 3 studenti
+LESSONS_PER_WEEK = 3
+DISTRIBUTION = [3, 3, 3]
+
+
+def measure(func, setup=None, min_runs=MIN_RUNS, max_runs=MAX_RUNS, min_time=MIN_TIME):
+    """
+    Misura il tempo di una funzione ripetendola più volte
+
+    Args:
+        func (callable): Funzione da misurare; riceve il risultato di setup se presente
+        setup (callable, optional): Preparazione non cronometrata, eseguita prima di ogni ripetizione
+        min_runs (int): Ripetizioni minime
+        max_runs (int): Ripetizioni massime
+        min_time (float): Secondi cronometrati dopo i quali fermarsi (raggiunte le minime)
+
+    Returns:
+        dict: Mediana, minimo e massimo in millisecondi e numero di ripetizioni
+    """
+    times = []
+    while len(times) < max_runs:
+        args = (setup(),) if setup is not None else ()
+        started = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - started)
+        if len(times) >= min_runs and sum(times) >= min_time:
+            break
+    return {
+        'median_ms': round(statistics.median(times) * 1000, 3),
+        'min_ms': round(min(times) * 1000, 3),
+        'max_ms': round(max(times) * 1000, 3),
+        'runs': len(times)
+    }
+
+
+class Dataset:
+    """
+    Dati sintetici di una scala, con i file di input in una cartella temporanea
+    """
+
+    def __init__(self, num_students, workdir):
+        """
+        Genera elenco, calendario e file CSV/JSON
+
+        Args:
+            num_students (int): Numero di studenti
+            workdir (str): Cartella per i file generati
+        """
+        self.num_students = num_students
+        self.workdir = workdir
+        self.roster = generate_roster(num_students)
+        self.calendario = generate_calendar(self.roster, LESSONS_PER_WEEK, DISTRIBUTION)
+        self.csv_path = write_roster_csv(os.path.join(workdir, f'students_{num_students}.csv'), self.roster)
+        self.json_path = write_roster_json(os.path.join(workdir, f'students_{num_students}.json'), self.roster)
+        self._db_counter = 0
+
+    def new_db_path(self):
+        """
+        Percorso di un nuovo file TinyDB vuoto
+
+        Returns:
+            str: Percorso non ancora esistente
+        """
+        self._db_counter += 1
+        return os.path.join(self.workdir, f'db_{self.num_students}_{self._db_counter}', 'local_db.json')
+
+    def filled_db(self, with_interrogations=False):
+        """
+        Crea un database TinyDB con tutti gli studenti (e il calendario)
+
+        Args:
+            with_interrogations (bool): Importa anche le interrogazioni del calendario
+
+        Returns:
+            TinyDBManager: Gestore del database creato
+        """
+        manager = TinyDBManager(self.new_db_path())
+        manager.import_students_bulk([dict(s) for s in self.roster])
+        if with_interrogations:
+            manager.import_interrogations_bulk(calendar_to_rows(self.calendario))
+        return manager
+
+
+# ==================== CASI ====================
+
+def bench_create_random_calendar(app_module, data):
+    """Calendario casuale (shuffle + impaginazione)"""
+    random.seed(0)
+    return measure(lambda: app_module.create_random_calendar(data.roster, LESSONS_PER_WEEK, DISTRIBUTION))
+
+
+def bench_parse_csv(app_module, data):
+    """Lettura di un elenco CSV caricato"""
+    return measure(lambda: app_module.parse_csv(data.csv_path))
+
+
+def bench_parse_json(app_module, data):
+    """Lettura di un elenco JSON caricato"""
+    return measure(lambda: app_module.parse_json(data.json_path))
+
+
+def bench_generate_pdf_calendar(app_module, data):
+    """PDF del calendario in memoria"""
+    interrogations = calendar_to_interrogations(data.calendario)
+    return measure(lambda: app_module.generate_pdf_calendar(io.BytesIO(), 'Matematica', interrogations),
+                   min_runs=1)
+
+
+def bench_evaluate_schedule_quality(app_module, data):
+    """Valutazione di qualità dell'AI Advisor"""
+    advisor = AIAdvisor()
+    return measure(lambda: advisor.evaluate_schedule_quality(data.calendario, data.num_students))
+
+
+def bench_tinydb_import_students_bulk(app_module, data):
+    """Importazione dell'elenco in un database vuoto"""
+
+    def setup():
+        return TinyDBManager(data.new_db_path()), [dict(s) for s in data.roster]
+    return measure(lambda args: args[0].import_students_bulk(args[1]), setup=setup, min_runs=1)
+
+
+def bench_tinydb_import_interrogations_bulk(app_module, data):
+    """Importazione del calendario in un database vuoto"""
+    rows = calendar_to_rows(data.calendario)
+
+    def setup():
+        return TinyDBManager(data.new_db_path()), [dict(r) for r in rows]
+    return measure(lambda args: args[0].import_interrogations_bulk(args[1]), setup=setup, min_runs=1)
+
+
+def bench_tinydb_get_all_students(app_module, data):
+    """Lettura di tutti gli studenti"""
+    manager = data.filled_db()
+    return measure(manager.get_all_students)
+
+
+def bench_tinydb_get_student_by_registro(app_module, data):
+    """Ricerca di uno studente per registro"""
+    manager = data.filled_db()
+    rng = random.Random(0)
+    return measure(lambda: manager.get_student_by_registro(rng.randint(1, data.num_students)))
+
+
+def bench_tinydb_add_student(app_module, data):
+    """Tempo medio di un singolo inserimento su un database di N studenti"""
+    manager = data.filled_db()
+    next_registro = iter(range(data.num_students + 1, data.num_students + 10 ** 7))
+
+    def add_many():
+        for _ in range(TINYDB_SINGLE_OPS):
+            manager.add_student(next(next_registro), 'Nuovo', 'Studente')
+
+    result = measure(add_many, min_runs=1, max_runs=3)
+    return {key: round(value / TINYDB_SINGLE_OPS, 3) if key.endswith('_ms') else value
+            for key, value in result.items()}
+
+
+def bench_tinydb_get_interrogations_by_materia(app_module, data):
+    """Interrogazioni di una materia"""
+    manager = data.filled_db(with_interrogations=True)
+    return measure(lambda: manager.get_interrogations_by_materia('Matematica'))
+
+
+# Nome del caso -> (funzione, numero massimo di studenti; None = tutte le scale)
+BENCHMARKS = {
+    'create_random_calendar': (bench_create_random_calendar, None),
+    'parse_csv': (bench_parse_csv, None),
+    'parse_json': (bench_parse_json, None),
+    # Un PDF con 100.000 studenti ha decine di migliaia di pagine: non è un caso reale
+    'generate_pdf_calendar': (bench_generate_pdf_calendar, 10000),
+    'evaluate_schedule_quality': (bench_evaluate_schedule_quality, None),
+    'tinydb_import_students_bulk': (bench_tinydb_import_students_bulk, None),
+    'tinydb_import_interrogations_bulk': (bench_tinydb_import_interrogations_bulk, None),
+    'tinydb_get_all_students': (bench_tinydb_get_all_students, None),
+    'tinydb_get_student_by_registro': (bench_tinydb_get_student_by_registro, None),
+    'tinydb_add_student': (bench_tinydb_add_student, None),
+    'tinydb_get_interrogations_by_materia': (bench_tinydb_get_interrogations_by_materia, None),
+}
+
+
+def case_key(name, num_students):
+    """
+    Chiave di un caso nei risultati e nella baseline
+
+    Returns:
+        str: Es. "parse_csv[1000]"
+    """
+    return f'{name}[{num_students}]'
+
+
+def run_suite(scales=SCALES, only=None, log=print):
+    """
+    Esegue i casi selezionati su tutte le scale
+
+    Args:
+        scales (tuple): Numeri di studenti
+        only (list, optional): Sottostringhe dei nomi dei casi da eseguire
+        log (callable): Funzione per l'avanzamento (None per nessun output)
+
+    Returns:
+        dict: Metadati dell'esecuzione e risultati per caso
+    """
+    app_module = load_app_module()
+    selected = {
+        name: case for name, case in BENCHMARKS.items()
+        if not only or any(pattern in name for pattern in only)
+    }
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for num_students in scales:
+            data = Dataset(num_students, workdir)
+            for name, (func, max_students) in selected.items():
+                if max_students is not None and num_students > max_students:
+                    continue
+                result = func(app_module, data)
+                results[case_key(name, num_students)] = result
+                if log:
+                    log(f"  {case_key(name, num_students):<48} {result['median_ms']:>11.3f} ms"
+                        f"  ({result['runs']} run)")
+
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Confronta i risultati con la baseline
+
+    Args:
+        results (dict): Risultati per caso (run_suite()['results'])
+        baseline (dict): Risultati di riferimento per caso
+        tolerance (float): Rallentamento ammesso (0.5 = +50%)
+
+    Returns:
+        list: Dizionari (case, baseline_ms, current_ms, ratio, regression) per i casi in comune
+    """
+    comparison = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if not reference:
+            continue
+        ratio = result['median_ms'] / reference['median_ms'] if reference['median_ms'] else 1.0
+        comparison.append({
+            'case': key,
+            'baseline_ms': reference['median_ms'],
+            'current_ms': result['median_ms'],
+            'ratio': round(ratio, 3),
+            'regression': ratio > 1 + tolerance
+        })
+    return comparison
+
+
+def load_json(path):
+    """
+    Legge un file JSON se esiste
+
+    Returns:
+        dict: Contenuto del file o None
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    """
+    Scrive un file JSON leggibile (chiavi ordinate, per diff puliti)
+
+    Returns:
+        None
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark delle funzioni su dati sintetici')
+    parser.add_argument('--scales', default=','.join(map(str, SCALES)),
+                        help='Numeri di studenti separati da virgola')
+    parser.add_argument('--only', default='', help='Casi da eseguire (sottostringhe separate da virgola)')
+    parser.add_argument('--output', default=RESULTS_PATH, help='File JSON dei risultati')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='File JSON della baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Rallentamento ammesso rispetto alla baseline (0.5 = +50%%)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Aggiorna la baseline con i casi eseguiti')
+    args = parser.parse_args(argv)
+
+    scales = [int(value) for value in args.scales.split(',') if value]
+    only = [value for value in args.only.split(',') if value]
+
+    print(f"Benchmark funzioni - scale: {', '.join(map(str, scales))}")
+    run = run_suite(scales, only)
+    save_json(args.output, run)
+    print(f"\nRisultati salvati in {os.path.relpath(args.output)}")
+
+    baseline = load_json(args.baseline)
+    if args.save_baseline:
+        merged = dict(baseline['results']) if baseline else {}
+        merged.update(run['results'])
+        save_json(args.baseline, dict(run, results=merged))
+        print(f"Baseline aggiornata: {os.path.relpath(args.baseline)}")
+        return 0
+
+    if baseline is None:
+        print("Nessuna baseline: eseguire con --save-baseline per crearla")
+        return 0
+
+    comparison = compare(run['results'], baseline['results'], args.tolerance)
+    regressions = [item for item in comparison if item['regression']]
+    print(f"\nConfronto con la baseline ({baseline.get('created_at')}, Python {baseline.get('python')}):")
+    for item in comparison:
+        mark = '✗' if item['regression'] else ' '
+        print(f"  {mark} {item['case']:<48} {item['baseline_ms']:>11.3f} -> {item['current_ms']:>11.3f} ms"
+              f"  x{item['ratio']:.2f}")
+
+    if regressions:
+        print(f"✗ {len(regressions)} casi più lenti della baseline oltre il {args.tolerance:.0%}")
+        return 1
+    print(f"✓ Nessuna regressione oltre il {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
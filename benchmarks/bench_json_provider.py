@@ -0,0 +1,108 @@
+"""
+Microbenchmark del provider JSON
+Confronta la serializzazione di un payload di /api/interrogations di grandi
+dimensioni con il provider di default di Flask (date formattate in Python con
+isoformat) e con FastJSONProvider (date serializzate in modo nativo)
+
+Esegui con: python benchmarks/bench_json_provider.py [numero_interrogazioni]
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from utils.json_provider import FastJSONProvider, orjson
+
+
+def build_payload(num_interrogations):
+    """
+    Costruisce un payload con la stessa forma della risposta di get_interrogations
+
+    Args:
+        num_interrogations (int): Numero di interrogazioni
+
+    Returns:
+        list: Interrogazioni con date come oggetti date/datetime
+    """
+    now = datetime(2025, 12, 10, 10, 30)
+    interrogations = []
+    for i in range(num_interrogations):
+        student_id = i % 30 + 1
+        interrogations.append({
+            'id': i + 1,
+            'materia': f'Materia {i % 8}',
+            'student_id': student_id,
+            'student': {
+                'id': student_id,
+                'registro_num': student_id,
+                'nome': f'Nome{student_id}',
+                'cognome': f'Cognome{student_id}',
+                'created_at': now
+            },
+            'lezione_num': i // 5 + 1,
+            'data_lezione': date(2025, 12, 15) + timedelta(days=i // 5),
+            'ordine': i % 5 + 1,
+            'created_at': now,
+            'updated_at': now + timedelta(seconds=i)
+        })
+    return interrogations
+
+
+def with_isoformat(interrogations):
+    """
+    Replica il vecchio to_dict(): tutte le date convertite con isoformat in Python
+
+    Args:
+        interrogations (list): Payload con date native
+
+    Returns:
+        list: Payload con date già in stringa
+    """
+    result = []
+    for interr in interrogations:
+        item = dict(interr)
+        item['student'] = dict(interr['student'], created_at=interr['student']['created_at'].isoformat())
+        for key in ('data_lezione', 'created_at', 'updated_at'):
+            item[key] = interr[key].isoformat()
+        result.append(item)
+    return result
+
+
+def main():
+    num_interrogations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeat = 5
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    default_provider.compact = True
+    fast_provider = FastJSONProvider(app)
+    fast_provider.compact = True
+
+    payload = build_payload(num_interrogations)
+
+    def run_default():
+        with app.app_context():
+            default_provider.response({'success': True, 'interrogations': with_isoformat(payload)}).get_data()
+
+    def run_fast():
+        with app.app_context():
+            fast_provider.response({'success': True, 'interrogations': payload}).get_data()
+
+    print(f"Payload: {num_interrogations} interrogazioni - orjson: {'sì' if orjson else 'no (fallback json)'}")
+    results = {}
+    for name, func in (('default + isoformat', run_default), ('FastJSONProvider', run_fast)):
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        results[name] = best
+        print(f"  {name:<22} {best * 1000:8.1f} ms")
+
+    speedup = results['default + isoformat'] / results['FastJSONProvider']
+    print(f"  Speedup: {speedup:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
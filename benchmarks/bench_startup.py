@@ -0,0 +1,143 @@
+"""
+Benchmark del tempo di avvio a freddo
+Avvia più volte un interprete Python nuovo che importa app.py e crea l'app
+(come fa un worker di gunicorn senza preload), misura il tempo totale e, con
+-X importtime, il tempo di import di ogni package. Termina con errore se la
+mediana supera STARTUP_TIME_BUDGET (config/config.py)
+
+Esegui con: python benchmarks/bench_startup.py [numero_avvii]
+"""
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from config.config import get_config
+
+
+# Codice eseguito nell'interprete misurato: carica app.py e crea l'app come wsgi.py
+STARTUP_CODE = (
+    "import sys;"
+    "from utils.app_loader import load_app_module;"
+    "load_app_module().create_app();"
+    "print(','.join(sorted(name for name in sys.modules if '.' not in name)))"
+)
+
+
+def parse_importtime(output):
+    """
+    Somma il tempo di import (self) di ogni package di primo livello
+
+    Args:
+        output (str): Output di python -X importtime (stderr)
+
+    Returns:
+        dict: Nome package -> microsecondi
+    """
+    packages = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    return packages
+
+
+def loaded_packages():
+    """
+    Package di primo livello caricati creando l'app in un interprete nuovo
+
+    Returns:
+        set: Nomi dei package importati
+    """
+    result = subprocess.run([sys.executable, '-c', STARTUP_CODE], cwd=BASE_DIR,
+                            capture_output=True, text=True, check=True)
+    return set(result.stdout.strip().splitlines()[-1].split(','))
+
+
+def measure_cold_start():
+    """
+    Avvia un interprete nuovo che importa l'applicazione
+
+    Il tempo totale è misurato senza -X importtime, che rallenta gli import;
+    un secondo avvio con -X importtime fornisce il dettaglio per package.
+
+    Returns:
+        tuple: (secondi totali, {package: microsecondi}, insieme dei moduli caricati)
+    """
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', STARTUP_CODE], cwd=BASE_DIR,
+                   capture_output=True, check=True)
+    elapsed = time.perf_counter() - started
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    )
+    loaded = set(result.stdout.strip().splitlines()[-1].split(','))
+    return elapsed, parse_importtime(result.stderr), loaded
+
+
+def run_benchmark(runs=5):
+    """
+    Ripete la misura e calcola mediana e tempi per package
+
+    Args:
+        runs (int): Numero di avvii a freddo
+
+    Returns:
+        dict: Mediana, minimo, massimo in secondi, tempi mediani per package (ms),
+              moduli caricati e budget configurato
+    """
+    # Primo avvio escluso: compila i .pyc e scalda la cache del disco
+    measure_cold_start()
+
+    times, per_package = [], {}
+    loaded = set()
+    for _ in range(runs):
+        elapsed, packages, loaded = measure_cold_start()
+        times.append(elapsed)
+        for name, us in packages.items():
+            per_package.setdefault(name, []).append(us)
+
+    return {
+        'median': statistics.median(times),
+        'min': min(times),
+        'max': max(times),
+        'packages_ms': {name: statistics.median(values) / 1000 for name, values in per_package.items()},
+        'loaded': loaded,
+        'budget': get_config().STARTUP_TIME_BUDGET
+    }
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    result = run_benchmark(runs)
+
+    print(f"Avvio a freddo di app.py ({runs} avvii, interprete incluso)")
+    print(f"  mediana {result['median'] * 1000:.0f} ms  "
+          f"(min {result['min'] * 1000:.0f} ms, max {result['max'] * 1000:.0f} ms)")
+
+    print("\nImport per package (mediana, ms):")
+    top = sorted(result['packages_ms'].items(), key=lambda item: item[1], reverse=True)[:15]
+    for name, ms in top:
+        print(f"  {name:<22} {ms:8.1f}")
+
+    lazy = sorted({'reportlab', 'tinydb'} & result['loaded'])
+    print(f"\nModuli pesanti caricati all'avvio: {', '.join(lazy) if lazy else 'nessuno'}")
+
+    budget = result['budget']
+    if result['median'] > budget:
+        print(f"✗ Avvio oltre il budget: {result['median']:.2f} s > {budget:.2f} s (STARTUP_TIME_BUDGET)")
+        return 1
+    print(f"✓ Avvio nel budget: {result['median']:.2f} s <= {budget:.2f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Generatore deterministico di dati sintetici per i benchmark
+Crea elenchi studenti (da 30 a 100.000) e calendari di interrogazioni sempre
+uguali a parità di seme, più i file CSV/JSON nel formato accettato da
+/api/upload-students
+"""
+import csv
+import json
+import random
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+
+# Scale predefinite: una classe, una scuola, un istituto grande, un'intera rete di scuole
+SCALES = (30, 1000, 10000, 100000)
+
+DEFAULT_SEED = 20251210
+
+NOMI = (
+    'Alessandro', 'Alice', 'Andrea', 'Anna', 'Beatrice', 'Chiara', 'Davide', 'Elena',
+    'Emma', 'Federico', 'Francesca', 'Francesco', 'Gabriele', 'Giorgia', 'Giulia',
+    'Leonardo', 'Lorenzo', 'Luca', 'Marco', 'Martina', 'Matteo', 'Mattia', 'Nicolò',
+    'Riccardo', 'Sara', 'Simone', 'Sofia', 'Tommaso', 'Valentina', 'Vittoria'
+)
+
+COGNOMI = (
+    'Barbieri', 'Bianchi', 'Bruno', 'Caruso', 'Colombo', 'Conti', 'Costa', 'De Luca',
+    'Esposito', 'Fabbri', 'Ferrara', 'Ferrari', 'Fontana', 'Gallo', 'Giordano',
+    'Greco', 'Lombardi', 'Mancini', 'Marino', 'Mariani', 'Moretti', 'Ricci',
+    'Rinaldi', 'Rizzo', 'Romano', 'Rossi', 'Russo', 'Santoro', 'Villa', 'Zanetti'
+)
+
+
+def generate_roster(num_students, seed=DEFAULT_SEED):
+    """
+    Genera un elenco di studenti con registro progressivo
+
+    Args:
+        num_students (int): Numero di studenti
+        seed (int): Seme del generatore casuale
+
+    Returns:
+        list: Dizionari con id, registro_num, nome e cognome
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            'id': registro_num,
+            'registro_num': registro_num,
+            'nome': rng.choice(NOMI),
+            'cognome': rng.choice(COGNOMI)
+        }
+        for registro_num in range(1, num_students + 1)
+    ]
+
+
+def generate_calendar(roster, lessons_per_week=3, distribution=(3, 3, 3), seed=DEFAULT_SEED):
+    """
+    Genera un calendario come create_random_calendar, ma con un generatore dedicato
+
+    Args:
+        roster (list): Studenti
+        lessons_per_week (int): Giorni a settimana con interrogazioni
+        distribution (tuple): Studenti per giorno della settimana
+        seed (int): Seme del generatore casuale
+
+    Returns:
+        dict: Calendario con struttura {lezione_num: [studenti]}
+    """
+    from utils.calendar_search import layout_calendar
+
+    students = list(roster)
+    random.Random(seed).shuffle(students)
+    return layout_calendar(students, lessons_per_week, list(distribution))
+
+
+def calendar_to_interrogations(calendario, materia='Matematica', start=date(2025, 9, 15)):
+    """
+    Converte un calendario in oggetti con gli attributi di Interrogation
+
+    Le lezioni cadono in giorni feriali consecutivi a partire da start.
+    Gli oggetti bastano a generate_pdf_calendar senza un database.
+
+    Args:
+        calendario (dict): Calendario {lezione_num: [studenti]}
+        materia (str): Nome della materia
+        start (date): Data della prima lezione
+
+    Returns:
+        list: Oggetti con materia, lezione_num, ordine, data_lezione, student_id e student
+    """
+    interrogations = []
+    day = start
+    for lezione_num in sorted(calendario):
+        while day.weekday() >= 5:
+            day += timedelta(days=1)
+        for ordine, student in enumerate(calendario[lezione_num], 1):
+            interrogations.append(SimpleNamespace(
+                materia=materia,
+                lezione_num=lezione_num,
+                ordine=ordine,
+                data_lezione=day,
+                student_id=student['id'],
+                student=SimpleNamespace(**student)
+            ))
+        day += timedelta(days=1)
+    return interrogations
+
+
+def calendar_to_rows(calendario, materia='Matematica'):
+    """
+    Converte un calendario nelle righe salvate da TinyDBManager
+
+    Args:
+        calendario (dict): Calendario {lezione_num: [studenti]}
+        materia (str): Nome della materia
+
+    Returns:
+        list: Dizionari per import_interrogations_bulk
+    """
+    return [
+        {
+            'materia': materia,
+            'registro_num': student['registro_num'],
+            'lezione_num': lezione_num,
+            'ordine': ordine,
+            'data_lezione': None
+        }
+        for lezione_num, students in calendario.items()
+        for ordine, student in enumerate(students, 1)
+    ]
+
+
+def write_roster_csv(path, roster):
+    """
+    Scrive l'elenco nel formato CSV accettato da parse_csv
+
+    Args:
+        path (str): File di destinazione
+        roster (list): Studenti
+
+    Returns:
+        str: Il percorso scritto
+    """
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['registro_num', 'nome', 'cognome'])
+        for student in roster:
+            writer.writerow([student['registro_num'], student['nome'], student['cognome']])
+    return path
+
+
+def write_roster_json(path, roster):
+    """
+    Scrive l'elenco nel formato JSON accettato da parse_json ({"students": [...]})
+
+    Args:
+        path (str): File di destinazione
+        roster (list): Studenti
+
+    Returns:
+        str: Il percorso scritto
+    """
+    students = [
+        {'registro_num': s['registro_num'], 'nome': s['nome'], 'cognome': s['cognome']}
+        for s in roster
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'students': students}, f, ensure_ascii=False)
+    return path
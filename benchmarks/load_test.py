@@ -0,0 +1,448 @@
+"""
+Test di carico HTTP con più docenti simulati in parallelo
+Ogni docente è un thread con una propria connessione keep-alive verso
+un'istanza già avviata su localhost (python app.py o gunicorn) e segue uno
+scenario realistico: carica l'elenco della sua classe, crea il calendario
+della sua materia, poi alterna consultazioni di get-calendar (con ETag),
+modifiche ed esportazioni PDF. Al termine riporta throughput e latenze
+p50/p95/p99 per endpoint
+
+ATTENZIONE: scrive studenti e calendari nel database dell'istanza: usare un
+database di prova. Le materie create iniziano con "Carico "
+
+Esegui con:
+    python benchmarks/load_test.py --teachers 20 --duration 60
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --output carico.json
+"""
+import io
+import os
+import sys
+import csv
+import json
+import math
+import gzip
+import time
+import uuid
+import random
+import argparse
+import threading
+import http.client
+from datetime import datetime
+from urllib.parse import urlsplit, quote
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from benchmarks.dataset import generate_roster
+
+
+# Il test non esce mai dalla macchina locale
+LOCAL_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+# Azioni del ciclo di ogni docente e loro peso (frequenza relativa)
+ACTION_WEIGHTS = {
+    'poll': 12,
+    'change_student': 3,
+    'modify_day': 2,
+    'export_pdf': 1,
+    'recreate': 1,
+}
+
+# Registri dei docenti simulati, lontani da quelli di una classe reale
+REGISTRO_BASE = 900000
+REGISTRO_STRIDE = 1000
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, pct):
+    """
+    Percentile con il metodo nearest-rank
+
+    Args:
+        sorted_values (list): Valori in ordine crescente
+        pct (float): Percentile (0-100)
+
+    Returns:
+        float: Valore del percentile (0 se la lista è vuota)
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """
+    Raccoglie latenze e codici di stato per endpoint da tutti i thread
+    """
+
+    def __init__(self):
+        """
+        Inizializza i contatori vuoti
+        """
+        self.latencies = {}
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, status):
+        """
+        Registra una richiesta completata
+
+        Args:
+            endpoint (str): Etichetta dell'endpoint (es. "GET /api/get-calendar/<materia>")
+            seconds (float): Latenza
+            status (int|str): Codice HTTP o nome dell'eccezione di rete
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            counts = self.statuses.setdefault(endpoint, {})
+            counts[status] = counts.get(status, 0) + 1
+
+    def summary(self, elapsed):
+        """
+        Calcola throughput e percentili per endpoint
+
+        Args:
+            elapsed (float): Durata del test in secondi
+
+        Returns:
+            dict: Totali e statistiche per endpoint (latenze in millisecondi)
+        """
+        endpoints = {}
+        with self._lock:
+            items = [(name, sorted(values), dict(self.statuses[name]))
+                     for name, values in self.latencies.items()]
+
+        total, total_errors = 0, 0
+        for name, values, statuses in sorted(items):
+            errors = sum(count for status, count in statuses.items() if not is_success(status))
+            total += len(values)
+            total_errors += errors
+            stats = {
+                'requests': len(values),
+                'errors': errors,
+                'throughput_rps': round(len(values) / elapsed, 2),
+                'mean_ms': round(sum(values) / len(values) * 1000, 2),
+                'max_ms': round(values[-1] * 1000, 2),
+                'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)}
+            }
+            for pct in PERCENTILES:
+                stats[f'p{pct}_ms'] = round(percentile(values, pct) * 1000, 2)
+            endpoints[name] = stats
+
+        return {
+            'duration_s': round(elapsed, 2),
+            'requests': total,
+            'errors': total_errors,
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+            'endpoints': endpoints
+        }
+
+
+def is_success(status):
+    """
+    Una risposta è riuscita se è 2xx o 304 (calendario non modificato)
+
+    Returns:
+        bool: True se la richiesta è andata a buon fine
+    """
+    return isinstance(status, int) and (200 <= status < 300 or status == 304)
+
+
+class Teacher(threading.Thread):
+    """
+    Docente simulato: una classe, una materia e una connessione keep-alive
+    """
+
+    def __init__(self, index, options, recorder, start_event, deadline_holder):
+        """
+        Prepara classe, materia e generatore casuale del docente
+
+        Args:
+            index (int): Numero del docente (0..N-1)
+            options (Namespace): Opzioni della riga di comando
+            recorder (Recorder): Raccoglitore condiviso delle misure
+            start_event (threading.Event): Partenza contemporanea di tutti i docenti
+            deadline_holder (list): [istante di fine] fissato alla partenza
+        """
+        super().__init__(name=f'docente-{index + 1}', daemon=True)
+        self.options = options
+        self.recorder = recorder
+        self.start_event = start_event
+        self.deadline_holder = deadline_holder
+        self.rng = random.Random(options.seed + index)
+
+        self.materia = f'Carico {index + 1}'
+        offset = REGISTRO_BASE + index * REGISTRO_STRIDE
+        self.roster = [
+            dict(student, registro_num=student['registro_num'] + offset)
+            for student in generate_roster(options.class_size, seed=options.seed + index)
+        ]
+        self.calendario = {}
+        self.etag = None
+        self.conn = None
+
+    # ========== HTTP ==========
+
+    def _connect(self):
+        url = urlsplit(self.options.url)
+        self.conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=self.options.timeout)
+
+    def request(self, endpoint, method, path, body=None, headers=None):
+        """
+        Esegue una richiesta e ne registra la latenza (corpo letto per intero)
+
+        Args:
+            endpoint (str): Etichetta per il report
+            method (str): Metodo HTTP
+            path (str): Percorso con query string
+            body (bytes, optional): Corpo della richiesta
+            headers (dict, optional): Header aggiuntivi
+
+        Returns:
+            tuple: (codice di stato, header, corpo decompresso) o (None, {}, b'') se la rete fallisce
+        """
+        headers = dict(headers or {}, **{'Accept-Encoding': 'gzip'})
+        if self.conn is None:
+            self._connect()
+
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.recorder.record(endpoint, time.perf_counter() - started, type(e).__name__)
+            self.conn.close()
+            self.conn = None
+            return None, {}, b''
+        elapsed = time.perf_counter() - started
+
+        self.recorder.record(endpoint, elapsed, response.status)
+        response_headers = {name.lower(): value for name, value in response.getheaders()}
+        if response_headers.get('content-encoding') == 'gzip':
+            data = gzip.decompress(data)
+        if response_headers.get('connection', '').lower() == 'close':
+            self.conn.close()
+            self.conn = None
+        return response.status, response_headers, data
+
+    def request_json(self, endpoint, method, path, payload):
+        """
+        Richiesta con corpo JSON
+
+        Returns:
+            tuple: (codice di stato, risposta JSON o None)
+        """
+        status, _, data = self.request(
+            endpoint, method, path, json.dumps(payload).encode('utf-8'),
+            {'Content-Type': 'application/json'}
+        )
+        return status, _parse_json(data)
+
+    # ========== SCENARIO ==========
+
+    def run(self):
+        """Scenario del docente: elenco, calendario, poi azioni casuali fino alla scadenza"""
+        self.start_event.wait()
+        try:
+            self.upload_roster()
+            self.create_calendar()
+            actions = list(ACTION_WEIGHTS)
+            weights = list(ACTION_WEIGHTS.values())
+            while time.monotonic() < self.deadline_holder[0]:
+                getattr(self, self.rng.choices(actions, weights)[0])()
+                if self.options.think_time:
+                    time.sleep(self.rng.uniform(0, self.options.think_time))
+        finally:
+            if self.conn is not None:
+                self.conn.close()
+
+    def upload_roster(self):
+        """Carica l'elenco della classe come file CSV (multipart)"""
+        output = io.StringIO(newline='')
+        writer = csv.writer(output)
+        writer.writerow(['registro_num', 'nome', 'cognome'])
+        writer.writerows([s['registro_num'], s['nome'], s['cognome']] for s in self.roster)
+
+        # Nome file diverso per docente: il server lo salva in uploads/ durante l'import
+        boundary = uuid.uuid4().hex
+        filename = f'carico_{self.name}.csv'
+        body = (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: text/csv\r\n\r\n{output.getvalue()}\r\n'
+            f'--{boundary}--\r\n'
+        ).encode('utf-8')
+        self.request('POST /api/upload-students', 'POST', '/api/upload-students', body,
+                     {'Content-Type': f'multipart/form-data; boundary={boundary}'})
+
+    def create_calendar(self):
+        """Crea (o ricrea) il calendario della materia"""
+        status, data = self.request_json('POST /api/create-calendar', 'POST', '/api/create-calendar', {
+            'materia': self.materia,
+            'num_lezioni': 3,
+            'distribuzione': [3, 3, 2]
+        })
+        if status == 200 and data:
+            self.etag = None
+            self.poll()
+
+    def recreate(self):
+        """Rigenera il calendario da capo (cancella anche le modifiche)"""
+        self.create_calendar()
+
+    def poll(self):
+        """Consulta il calendario come la pagina aperta nel browser (GET condizionale)"""
+        headers = {'If-None-Match': self.etag} if self.etag else None
+        status, headers, data = self.request(
+            'GET /api/get-calendar/<materia>', 'GET',
+            f'/api/get-calendar/{quote(self.materia)}', headers=headers
+        )
+        if status == 200:
+            self.etag = headers.get('etag')
+            result = _parse_json(data) or {}
+            self.calendario = result.get('calendario') or {}
+
+    def change_student(self):
+        """Sostituisce uno studente in una lezione con un altro della classe"""
+        lesson = self._random_lesson()
+        if lesson is None:
+            return self.poll()
+        lezione_num, interrogations = lesson
+        self.request_json('PUT /api/change-student-in-day', 'PUT', '/api/change-student-in-day', {
+            'materia': self.materia,
+            'lezione_num': int(lezione_num),
+            'old_student_id': self.rng.choice(interrogations)['student_id'],
+            'new_registro_num': self.rng.choice(self.roster)['registro_num']
+        })
+
+    def modify_day(self):
+        """Cambia di uno il numero di studenti di una lezione"""
+        lesson = self._random_lesson()
+        if lesson is None:
+            return self.poll()
+        lezione_num, interrogations = lesson
+        new_count = max(1, len(interrogations) + self.rng.choice((-1, 1)))
+        self.request_json('PUT /api/modify-day', 'PUT', '/api/modify-day', {
+            'materia': self.materia,
+            'lezione_num': int(lezione_num),
+            'new_count': new_count
+        })
+
+    def export_pdf(self):
+        """Scarica il PDF del calendario"""
+        self.request_json('POST /api/export (pdf)', 'POST', '/api/export', {
+            'materia': self.materia,
+            'format': 'pdf'
+        })
+
+    def _random_lesson(self):
+        lessons = [(num, items) for num, items in self.calendario.items() if items]
+        return self.rng.choice(lessons) if lessons else None
+
+
+def _parse_json(data):
+    try:
+        return json.loads(data) if data else None
+    except ValueError:
+        return None
+
+
+def run_load_test(options, log=print):
+    """
+    Avvia i docenti simulati e attende la fine del test
+
+    Args:
+        options (Namespace): Opzioni (url, teachers, duration, class_size, think_time, seed, timeout)
+        log (callable): Funzione per l'avanzamento (None per nessun output)
+
+    Returns:
+        dict: Riepilogo del test (vedi Recorder.summary) con i parametri usati
+    """
+    recorder = Recorder()
+    start_event = threading.Event()
+    deadline_holder = [0.0]
+    teachers = [Teacher(i, options, recorder, start_event, deadline_holder) for i in range(options.teachers)]
+    for teacher in teachers:
+        teacher.start()
+
+    if log:
+        log(f"{options.teachers} docenti su {options.url} per {options.duration:.0f} s "
+            f"(classi da {options.class_size}, pausa max {options.think_time} s)")
+    started = time.monotonic()
+    deadline_holder[0] = started + options.duration
+    start_event.set()
+    for teacher in teachers:
+        teacher.join()
+    elapsed = time.monotonic() - started
+
+    summary = recorder.summary(elapsed)
+    summary.update({
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'url': options.url,
+        'teachers': options.teachers,
+        'class_size': options.class_size,
+        'think_time_s': options.think_time
+    })
+    return summary
+
+
+def print_report(summary):
+    """
+    Stampa la tabella per endpoint
+
+    Args:
+        summary (dict): Risultato di run_load_test
+
+    Returns:
+        None
+    """
+    print(f"\n{'Endpoint':<36} {'Req':>6} {'Err':>5} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for name, stats in summary['endpoints'].items():
+        print(f"{name:<36} {stats['requests']:>6} {stats['errors']:>5} {stats['throughput_rps']:>8.1f} "
+              f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms "
+              f"{stats['max_ms']:>7.1f}ms")
+    print(f"\nTotale: {summary['requests']} richieste in {summary['duration_s']:.1f} s "
+          f"({summary['throughput_rps']:.1f} req/s), {summary['errors']} errori")
+
+    for name, stats in summary['endpoints'].items():
+        failed = {status: count for status, count in stats['statuses'].items()
+                  if not (status.isdigit() and is_success(int(status)))}
+        if failed:
+            print(f"  {name}: {failed}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Test di carico con docenti simulati (solo localhost)')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Istanza da testare')
+    parser.add_argument('--teachers', type=int, default=20, help='Docenti simulati in parallelo')
+    parser.add_argument('--duration', type=float, default=30, help='Durata del test in secondi')
+    parser.add_argument('--class-size', type=int, default=25, help='Studenti per classe')
+    parser.add_argument('--think-time', type=float, default=0.5,
+                        help='Pausa massima tra due azioni di un docente (0 = nessuna pausa)')
+    parser.add_argument('--seed', type=int, default=1, help='Seme per scenari ripetibili')
+    parser.add_argument('--timeout', type=float, default=60, help='Timeout di una richiesta in secondi')
+    parser.add_argument('--output', help='File JSON dove salvare i risultati')
+    options = parser.parse_args(argv)
+
+    url = urlsplit(options.url)
+    if url.scheme != 'http' or url.hostname not in LOCAL_HOSTS:
+        parser.error(f"Solo istanze locali via http ({', '.join(LOCAL_HOSTS)}): {options.url}")
+
+    summary = run_load_test(options)
+    print_report(summary)
+
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Risultati salvati in {options.output}")
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
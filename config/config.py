@@ -23,11 +23,19 @@ class Config:
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', '')
     MYSQL_DATABASE = os.getenv('MYSQL_DATABASE', 'interrogazioni_db')
     
-    # SQLAlchemy
-    SQLALCHEMY_DATABASE_URI = (
-        f"mysql://{MYSQL_USER}:{MYSQL_PASSWORD}@"
-        f"{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
-    )
+    # Database SQLite (DB_BACKEND=sqlite): un file locale, per installazioni su un solo server
+    SQLITE_PATH = os.getenv('SQLITE_PATH', 'database/interrogazioni.db')
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))  # ms di attesa se un altro processo scrive
+    
+    # SQLAlchemy ('mysql' o 'sqlite')
+    DB_BACKEND = os.getenv('DB_BACKEND', 'mysql').lower()
+    if DB_BACKEND == 'sqlite':
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.abspath(SQLITE_PATH)}"
+    else:
+        SQLALCHEMY_DATABASE_URI = (
+            f"mysql://{MYSQL_USER}:{MYSQL_PASSWORD}@"
+            f"{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+        )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # TinyDB
@@ -38,12 +46,54 @@ class Config:
     PORT = int(os.getenv('PORT', 5000))
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
     
+    # Server di produzione (gunicorn.conf.py)
+    WSGI_WORKERS = int(os.getenv('WSGI_WORKERS', 0)) or None  # None = 2 * CPU + 1
+    WSGI_THREADS = int(os.getenv('WSGI_THREADS', 4))  # thread per processo
+    WSGI_TIMEOUT = int(os.getenv('WSGI_TIMEOUT', 60))  # secondi prima di riavviare un worker bloccato
+    WSGI_PRELOAD = os.getenv('WSGI_PRELOAD', 'True').lower() == 'true'  # app caricata una volta nel master
+    STARTUP_TIME_BUDGET = float(os.getenv('STARTUP_TIME_BUDGET', 1.5))  # secondi (benchmarks/bench_startup.py)
+    
     # Upload
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB max upload
     ALLOWED_EXTENSIONS = {'csv', 'json'}
     
+    # Compressione risposte
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'True').lower() == 'true'
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))  # 1 (veloce) - 9 (massima)
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 500))  # byte
+    COMPRESS_BROTLI = os.getenv('COMPRESS_BROTLI', 'True').lower() == 'true'  # se installato
+    
     # Esportazioni
     EXPORT_FOLDER = 'exports'
+    EXPORT_MAX_BYTES = int(os.getenv('EXPORT_MAX_BYTES', 50 * 1024 * 1024))  # 50 MB su disco, per processo
+    EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', 0)) or None  # None = numero di CPU
+    
+    # Metriche Prometheus (endpoint /metrics, senza autenticazione: attivare solo in rete interna)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False').lower() == 'true'
+    
+    # Profilazione su richiesta (header X-Profile + X-Admin-Token; vuoto = disattivata)
+    PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+    PROFILING_FOLDER = os.getenv('PROFILING_FOLDER', 'profiles')
+    PROFILING_MIN_INTERVAL = float(os.getenv('PROFILING_MIN_INTERVAL', 10))  # secondi tra due profili per processo
+    PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', 50))  # profili conservati su disco
+    
+    # Rilevatore di query N+1 (default: attivo con DEBUG o TESTING, errore con TESTING)
+    NPLUSONE_ENABLED = os.getenv('NPLUSONE_ENABLED', '').lower() == 'true' if os.getenv('NPLUSONE_ENABLED') else None
+    NPLUSONE_THRESHOLD = int(os.getenv('NPLUSONE_THRESHOLD', 10))  # ripetizioni della stessa query per richiesta
+    NPLUSONE_RAISE = os.getenv('NPLUSONE_RAISE', '').lower() == 'true' if os.getenv('NPLUSONE_RAISE') else None
+    
+    # Ricerca del calendario migliore (create-calendar con "search": true)
+    CALENDAR_SEARCH_CANDIDATES = int(os.getenv('CALENDAR_SEARCH_CANDIDATES', 64))  # K candidati (massimo)
+    CALENDAR_SEARCH_TIME_BUDGET = float(os.getenv('CALENDAR_SEARCH_TIME_BUDGET', 2.0))  # secondi (massimo)
+    
+    # Log delle modifiche al calendario (get-calendar?since=): righe conservate per materia
+    CALENDAR_CHANGES_RETAIN = int(os.getenv('CALENDAR_CHANGES_RETAIN', 1000))
+    
+    # Notifiche in tempo reale (Server-Sent Events)
+    EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', 100))  # eventi in attesa per client
+    EVENTS_HEARTBEAT = int(os.getenv('EVENTS_HEARTBEAT', 15))  # secondi tra due keep-alive
+    EVENTS_MAX_CONNECTIONS = int(os.getenv('EVENTS_MAX_CONNECTIONS', 2))  # flussi aperti per processo (0 = nessun limite)
+    EVENTS_MAX_LIFETIME = int(os.getenv('EVENTS_MAX_LIFETIME', 300))  # secondi prima di chiudere un flusso
 
 
 class DevelopmentConfig(Config):
@@ -0,0 +1,26 @@
+"""
+Fixture condivise dai test che usano l'applicazione completa
+"""
+
+import pytest
+
+import config.config as app_config
+from utils.app_loader import load_app_module
+
+
+@pytest.fixture
+def sqlite_app(tmp_path, monkeypatch):
+    """Applicazione con SQLite, TinyDB ed esportazioni in una cartella temporanea"""
+    sqlite_path = tmp_path / 'db' / 'test.db'
+    monkeypatch.setattr(app_config.DevelopmentConfig, 'DB_BACKEND', 'sqlite')
+    monkeypatch.setattr(app_config.DevelopmentConfig, 'SQLITE_PATH', str(sqlite_path))
+    monkeypatch.setattr(app_config.DevelopmentConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{sqlite_path}')
+    monkeypatch.setattr(app_config.DevelopmentConfig, 'TINYDB_PATH', str(tmp_path / 'local_db.json'))
+    monkeypatch.setattr(app_config.DevelopmentConfig, 'EXPORT_FOLDER', str(tmp_path / 'exports'))
+
+    module = load_app_module()
+    app = module.create_app('development')
+    assert module.init_database(app)
+    yield module, app
+    with app.app_context():
+        module.db.engine.dispose()
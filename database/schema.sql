@@ -30,7 +30,9 @@ CREATE TABLE IF NOT EXISTS interrogations (
     FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
     INDEX idx_materia (materia),
     INDEX idx_lezione (lezione_num),
-    INDEX idx_student (student_id)
+    INDEX idx_student (student_id),
+    INDEX idx_materia_updated (materia, updated_at),
+    INDEX idx_materia_lezione_ordine (materia, lezione_num, ordine, id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Tabella delle configurazioni del calendario
@@ -43,6 +45,16 @@ CREATE TABLE IF NOT EXISTS calendar_configurations (
     INDEX idx_materia (materia)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Registro delle modifiche al calendario (id = versione, lezione_num NULL = intero calendario)
+CREATE TABLE IF NOT EXISTS interrogation_changes (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    materia VARCHAR(100) NOT NULL,
+    lezione_num INT NULL,
+    op VARCHAR(20) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_materia_id (materia, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- Inserimento dati di esempio (opzionale)
 -- INSERT INTO students (registro_num, nome, cognome) VALUES
 -- (1, 'Mario', 'Rossi'),
@@ -56,3 +68,4 @@ SHOW TABLES;
 DESCRIBE students;
 DESCRIBE interrogations;
 DESCRIBE calendar_configurations;
+DESCRIBE interrogation_changes;
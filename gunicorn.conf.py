@@ -0,0 +1,58 @@
+"""
+Configurazione di gunicorn per la produzione
+Processi e thread sono letti da config/config.py (variabili WSGI_* nel file .env)
+
+Avvio: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import gc
+import os
+import multiprocessing
+
+from config.config import get_config
+
+_config = get_config(os.getenv('FLASK_CONFIG', 'production'))
+
+bind = f"{_config.HOST}:{_config.PORT}"
+
+# Processi worker con più thread ciascuno: i thread servono le richieste che
+# attendono il database e le connessioni SSE (/api/calendar-events, al massimo
+# EVENTS_MAX_CONNECTIONS per worker). Gli eventi SSE restano nel worker che ha
+# servito la modifica: con più worker gli altri client li ricevono solo alla
+# riconnessione (vedi DEPLOY.md); per notifiche immediate WSGI_WORKERS=1
+workers = _config.WSGI_WORKERS or multiprocessing.cpu_count() * 2 + 1
+threads = _config.WSGI_THREADS
+worker_class = 'gthread'
+timeout = _config.WSGI_TIMEOUT
+keepalive = 5
+
+# L'app viene importata una sola volta nel master: moduli, template e gestori
+# sono condivisi con i worker in copy-on-write invece di essere ricaricati
+preload_app = _config.WSGI_PRELOAD
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    """
+    Dopo il caricamento dell'app nel master, prima del fork dei worker
+
+    Importa i moduli caricati altrimenti al primo utilizzo (es. reportlab) e
+    sposta gli oggetti già allocati nella generazione permanente del garbage
+    collector: le sue scansioni nei worker non li toccano e le pagine di
+    memoria restano condivise invece di essere copiate.
+    """
+    if preload_app:
+        from wsgi import main
+        main.preload_modules()
+        gc.collect()
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """
+    Nel worker appena creato: rilascia le risorse ereditate dal master
+    """
+    if preload_app:
+        from wsgi import app, main
+        main.init_worker(app)
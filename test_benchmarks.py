@@ -0,0 +1,77 @@
+"""
+Test del generatore di dati sintetici e del confronto con la baseline
+(benchmarks/dataset.py, benchmarks/bench_functions.py) e dei calcoli del
+test di carico (benchmarks/load_test.py)
+Esegui con: python -m pytest test_benchmarks.py
+"""
+
+import pytest
+
+from benchmarks.dataset import generate_roster, generate_calendar, calendar_to_rows
+from benchmarks.bench_functions import compare, run_suite
+from benchmarks.load_test import Recorder, main as load_test_main, percentile
+
+
+def test_dataset_is_deterministic():
+    """Stesso seme, stessi studenti e stesso calendario"""
+    first = generate_roster(1000)
+    assert first == generate_roster(1000)
+    assert first != generate_roster(1000, seed=1)
+    assert [s['registro_num'] for s in first] == list(range(1, 1001))
+
+    calendario = generate_calendar(first)
+    assert calendario == generate_calendar(generate_roster(1000))
+    assert sorted(s['registro_num'] for s in sum(calendario.values(), [])) == list(range(1, 1001))
+    assert len(calendar_to_rows(calendario)) == 1000
+
+
+def test_compare_flags_regressions():
+    """Solo i casi oltre la tolleranza sono regressioni; i casi nuovi sono ignorati"""
+    baseline = {'parse_csv[30]': {'median_ms': 1.0}, 'parse_json[30]': {'median_ms': 1.0}}
+    results = {
+        'parse_csv[30]': {'median_ms': 1.4},
+        'parse_json[30]': {'median_ms': 1.6},
+        'parse_csv[1000]': {'median_ms': 9.0}
+    }
+    comparison = {item['case']: item for item in compare(results, baseline, tolerance=0.5)}
+
+    assert set(comparison) == {'parse_csv[30]', 'parse_json[30]'}
+    assert not comparison['parse_csv[30]']['regression']
+    assert comparison['parse_json[30]']['regression']
+
+
+def test_suite_runs_at_smallest_scale():
+    """I casi selezionati girano sulla scala di una classe"""
+    run = run_suite(scales=(30,), only=['parse', 'tinydb_get_all'], log=None)
+    assert set(run['results']) == {'parse_csv[30]', 'parse_json[30]', 'tinydb_get_all_students[30]'}
+    assert all(result['median_ms'] > 0 for result in run['results'].values())
+
+
+def test_percentile_nearest_rank():
+    """Percentili con il metodo nearest-rank"""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) == 0.0
+
+
+def test_recorder_summary_counts_errors():
+    """304 è un successo, 5xx ed errori di rete no"""
+    recorder = Recorder()
+    for status in (200, 304, 304, 500):
+        recorder.record('GET /api/get-calendar/<materia>', 0.01, status)
+    recorder.record('POST /api/export (pdf)', 0.2, 'ConnectionResetError')
+
+    summary = recorder.summary(elapsed=2.0)
+    poll = summary['endpoints']['GET /api/get-calendar/<materia>']
+    assert poll['requests'] == 4 and poll['errors'] == 1
+    assert poll['throughput_rps'] == 2.0
+    assert summary['requests'] == 5 and summary['errors'] == 2
+
+
+def test_load_test_refuses_remote_hosts():
+    """Il test di carico non parte verso host non locali"""
+    with pytest.raises(SystemExit):
+        load_test_main(['--url', 'http://example.com'])
@@ -0,0 +1,706 @@
+"""
+Test delle API del calendario sul backend SQLite (DB_BACKEND=sqlite)
+Usa la fixture sqlite_app di conftest.py
+Esegui con: python -m pytest test_calendar_api.py
+"""
+
+import io
+import re
+import json
+import zlib
+import base64
+import zipfile
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+import config.config as app_config
+
+
+def setup_class(client, num_students=6, materia='Storia', num_lezioni=2, distribuzione=(2, 1)):
+    """Importa gli studenti e crea il calendario della materia"""
+    roster = 'registro_num,nome,cognome\n' + '\n'.join(
+        f'{i},Nome{i},Cognome{i}' for i in range(1, num_students + 1)
+    )
+    response = client.post('/api/upload-students', data={'file': (io.BytesIO(roster.encode()), 'classe.csv')})
+    assert response.json['imported'] == num_students
+    assert client.post('/api/create-calendar', json={
+        'materia': materia, 'num_lezioni': num_lezioni, 'distribuzione': list(distribuzione)
+    }).status_code == 200
+
+
+def test_etag_depends_on_representation_and_students(sqlite_app):
+    """L'ETag cambia con fields/shape e con gli studenti, non solo con le interrogazioni"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client)
+
+    full = client.get('/api/get-calendar/Storia')
+    partial = client.get('/api/get-calendar/Storia?fields=student_id')
+    assert full.status_code == partial.status_code == 200
+    assert full.headers['ETag'] != partial.headers['ETag']
+
+    # Lo stesso ETag con un'altra rappresentazione non deve dare 304
+    response = client.get('/api/get-calendar/Storia?fields=student_id',
+                          headers={'If-None-Match': full.headers['ETag']})
+    assert response.status_code == 200
+    assert client.get('/api/get-calendar/Storia',
+                      headers={'If-None-Match': full.headers['ETag']}).status_code == 304
+
+    assert client.post('/api/add-student', json={
+        'registro_num': 99, 'nome': 'Nuovo', 'cognome': 'Studente'
+    }).status_code in (200, 201)
+    assert client.get('/api/get-calendar/Storia',
+                      headers={'If-None-Match': full.headers['ETag']}).status_code == 200
+
+
+def test_etag_changes_within_the_same_second(sqlite_app):
+    """Due modifiche nello stesso secondo (updated_at di MySQL) danno ETag diversi"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client)
+    first = min(get_positions(module, app))
+
+    def update_student(registro_num):
+        assert client.put('/api/interrogations/update-students-batch', json={'operations': [
+            {'interrogation_id': first, 'new_registro_num': registro_num}
+        ]}).json['updated'] == 1
+        # Stesso updated_at per tutte le righe, come una colonna TIMESTAMP al secondo
+        with app.app_context():
+            module.db.session.execute(text("UPDATE interrogations SET updated_at = '2025-10-06 10:00:00'"))
+            module.db.session.commit()
+        return client.get('/api/get-calendar/Storia')
+
+    before = update_student(5)
+    after = update_student(6)
+    assert before.headers['ETag'] != after.headers['ETag']
+    assert client.get('/api/get-calendar/Storia',
+                      headers={'If-None-Match': before.headers['ETag']}).status_code == 200
+
+
+def test_interrogations_by_materia_is_conditional(sqlite_app):
+    """/api/interrogations con materia (usato da interrogations.html) risponde 304 se nulla è cambiato"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client)
+
+    url = '/api/interrogations?materia=Storia&shape=normalized&fields=id,lezione_num,student.nome'
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/interrogations?materia=Storia', headers={'If-None-Match': etag}).status_code == 200
+    assert 'ETag' not in client.get('/api/interrogations').headers
+
+    # Una modifica alla materia invalida l'ETag
+    with app.app_context():
+        module.db.session.get(module.Interrogation, response.json['interrogations'][0][0]).ordine = 9
+        module.db.session.commit()
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+
+def get_positions(module, app, materia='Storia'):
+    """Posizioni correnti {id: (lezione_num, ordine, data_lezione)}"""
+    with app.app_context():
+        return {
+            row.id: (row.lezione_num, row.ordine, row.data_lezione)
+            for row in module.Interrogation.query.filter_by(materia=materia)
+        }
+
+
+def test_reorder_validation(sqlite_app):
+    """Il riordino rifiuta layout malformati, id ripetuti o sconosciuti e posizioni duplicate"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client)
+    positions = get_positions(module, app)
+    ids = sorted(positions)
+
+    def reorder(layout, materia='Storia'):
+        return client.put('/api/interrogations/reorder', json={'materia': materia, 'layout': layout})
+
+    assert reorder([]).status_code == 400
+    assert reorder([{'id': ids[0], 'lezione_num': 0, 'ordine': 1}]).status_code == 400
+    assert reorder([{'id': ids[0], 'lezione_num': True, 'ordine': 1}]).status_code == 400
+    assert reorder([
+        {'id': ids[0], 'lezione_num': 5, 'ordine': 1},
+        {'id': ids[0], 'lezione_num': 5, 'ordine': 2}
+    ]).status_code == 400
+    assert reorder([{'id': ids[0], 'lezione_num': 5, 'ordine': 1}], materia='Fisica').status_code == 404
+
+    # Posizione già occupata da un'interrogazione non spostata
+    other = next(i for i in ids if i != ids[0])
+    response = reorder([{'id': ids[0], 'lezione_num': positions[other][0], 'ordine': positions[other][1]}])
+    assert response.status_code == 400
+    assert 'Posizione duplicata' in response.json['error']
+
+    # Nessuna modifica dopo le richieste rifiutate
+    assert get_positions(module, app) == positions
+
+
+def test_reorder_moves_and_swaps(sqlite_app):
+    """Un solo UPDATE scambia due interrogazioni e porta la data della lezione di destinazione"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client)
+    assert client.put('/api/set-lesson-date', json={
+        'materia': 'Storia', 'lezione_num': 2, 'data_lezione': '2025-10-09'
+    }).status_code == 200
+
+    positions = get_positions(module, app)
+    first = next(i for i, pos in positions.items() if pos[:2] == (1, 1))
+    second = next(i for i, pos in positions.items() if pos[:2] == (2, 1))
+
+    response = client.put('/api/interrogations/reorder', json={'materia': 'Storia', 'layout': [
+        {'id': first, 'lezione_num': 2, 'ordine': 1},
+        {'id': second, 'lezione_num': 1, 'ordine': 1}
+    ]})
+    assert response.status_code == 200
+    assert response.json['updated'] == 2
+
+    moved = get_positions(module, app)
+    assert moved[first] == (2, 1, date(2025, 10, 9))
+    assert moved[second] == (1, 1, None)
+    assert {i: pos for i, pos in moved.items() if i not in (first, second)} == \
+        {i: pos for i, pos in positions.items() if i not in (first, second)}
+
+
+def test_update_students_batch(sqlite_app):
+    """Le operazioni valide sono applicate, quelle con id o registro sconosciuti riportano l'errore"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client)
+    ids = sorted(get_positions(module, app))
+
+    assert client.put('/api/interrogations/update-students-batch', json={'operations': []}).status_code == 400
+    assert client.put('/api/interrogations/update-students-batch', json={
+        'operations': [{'interrogation_id': ids[0]}]
+    }).status_code == 400
+
+    response = client.put('/api/interrogations/update-students-batch', json={'operations': [
+        {'interrogation_id': ids[0], 'new_registro_num': 5},
+        {'interrogation_id': ids[1], 'new_registro_num': 999},
+        {'interrogation_id': 999999, 'new_registro_num': 5}
+    ]})
+    assert response.status_code == 200
+    assert (response.json['updated'], response.json['failed']) == (1, 2)
+    assert [r['success'] for r in response.json['results']] == [True, False, False]
+    assert response.json['results'][0]['student']['registro_num'] == 5
+
+    with app.app_context():
+        assert module.db.session.get(module.Interrogation, ids[0]).student.registro_num == 5
+
+
+def test_calendar_delta_versions(sqlite_app):
+    """since= restituisce solo le lezioni modificate; un calendario ricreato richiede il completo"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client, num_lezioni=3, distribuzione=(2, 1, 1))
+
+    full = client.get('/api/get-calendar/Storia').json
+    version = full['version']
+    assert version > 0
+
+    response = client.get(f'/api/get-calendar/Storia?since={version}').json
+    assert (response['full'], response['calendario'], response['version']) == (False, {}, version)
+
+    assert client.put('/api/set-lesson-date', json={
+        'materia': 'Storia', 'lezione_num': 2, 'data_lezione': '2025-10-09'
+    }).status_code == 200
+    response = client.get(f'/api/get-calendar/Storia?since={version}').json
+    assert response['version'] > version
+    assert response['full'] is False
+    assert list(response['calendario']) == ['2']
+
+    # Versione futura (es. database ripristinato) o calendario ricreato: ricarica completa
+    assert client.get(f'/api/get-calendar/Storia?since={version + 100}').json['full'] is True
+    assert client.post('/api/shuffle-assignments', json={'materia': 'Storia'}).status_code == 200
+    response = client.get(f'/api/get-calendar/Storia?since={version}').json
+    assert response['full'] is True
+    assert response['total_interrogations'] == full['total_interrogations']
+
+    assert client.get('/api/get-calendar/Storia?since=-1').status_code == 400
+
+
+def test_event_streams_are_capped(sqlite_app):
+    """Oltre EVENTS_MAX_CONNECTIONS flussi aperti la richiesta riceve 503; chiudere un flusso libera il posto"""
+    module, app = sqlite_app
+    client = app.test_client()
+    app.extensions['calendar_events'].max_connections = 1
+
+    first = client.get('/api/calendar-events/Storia')
+    assert first.status_code == 200
+    assert next(first.response) == b'retry: 3000\n\n'
+
+    second = client.get('/api/calendar-events/Storia')
+    assert second.status_code == 503
+    assert 'Retry-After' in second.headers
+
+    first.close()
+    assert not app.extensions['calendar_events'].has_subscribers('Storia')
+    third = client.get('/api/calendar-events/Storia')
+    assert third.status_code == 200
+    third.close()
+
+
+def test_event_stream_lifetime(sqlite_app):
+    """Il flusso termina dopo EVENTS_MAX_LIFETIME secondi (il browser poi si riconnette)"""
+    module, app = sqlite_app
+    app.extensions['calendar_events'].max_lifetime = 0.05
+    app.extensions['calendar_events'].heartbeat = 0.01
+
+    response = app.test_client().get('/api/calendar-events/Storia')
+    messages = list(response.response)
+    assert messages[0] == b'retry: 3000\n\n'
+    assert set(messages[1:]) <= {b': keep-alive\n\n'}
+    response.close()
+    assert not app.extensions['calendar_events'].has_subscribers('Storia')
+
+
+def test_change_log_is_pruned(sqlite_app):
+    """Il log conserva CALENDAR_CHANGES_RETAIN righe per materia; versioni più vecchie ricevono il completo"""
+    module, app = sqlite_app
+    client = app.test_client()
+    app.config['CALENDAR_CHANGES_RETAIN'] = 3
+    setup_class(client, num_lezioni=3, distribuzione=(2, 1, 1))
+    version = client.get('/api/get-calendar/Storia').json['version']
+
+    for day in range(1, 4):
+        assert client.put('/api/set-lesson-date', json={
+            'materia': 'Storia', 'lezione_num': 1, 'data_lezione': f'2025-10-0{day}'
+        }).status_code == 200
+        with app.app_context():
+            assert module.InterrogationChange.query.filter_by(materia='Storia').count() <= 3
+    latest = client.get('/api/get-calendar/Storia').json['version']
+
+    # La versione iniziale è stata potata: calendario completo
+    response = client.get(f'/api/get-calendar/Storia?since={version}').json
+    assert response['full'] is True
+
+    # Le versioni ancora nel log restano incrementali
+    assert client.put('/api/set-lesson-date', json={
+        'materia': 'Storia', 'lezione_num': 2, 'data_lezione': '2025-10-09'
+    }).status_code == 200
+    response = client.get(f'/api/get-calendar/Storia?since={latest}').json
+    assert response['full'] is False
+    assert list(response['calendario']) == ['2']
+
+
+def test_create_calendar_search_flag(sqlite_app):
+    """search accetta solo booleani JSON; senza search non viene avviata la ricerca"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client)
+    payload = {'materia': 'Storia', 'num_lezioni': 2, 'distribuzione': [2, 1]}
+
+    response = client.post('/api/create-calendar', json={**payload, 'search': 'false'})
+    assert response.status_code == 400
+
+    response = client.post('/api/create-calendar', json={**payload, 'search': False})
+    assert response.status_code == 200
+    assert 'search' not in response.json
+
+    # candidates=0 non vale come "massimo"
+    response = client.post('/api/create-calendar', json={**payload, 'search': True, 'candidates': 0})
+    assert response.status_code == 400
+
+    response = client.post('/api/create-calendar', json={**payload, 'search': True, 'candidates': 4})
+    assert response.status_code == 200
+    assert response.json['search']['candidates'] == 4
+
+
+def test_bulk_routes_without_n_plus_one(sqlite_app, monkeypatch):
+    """Con TESTING il rilevatore N+1 solleva un errore: import e date di molte righe non ripetono query"""
+    module, _ = sqlite_app
+    monkeypatch.setattr(app_config.DevelopmentConfig, 'TESTING', True)
+    app = module.create_app('development')
+    client = app.test_client()
+
+    setup_class(client, num_students=30, num_lezioni=2, distribuzione=(1, 1))
+    roster = 'registro_num,nome,cognome\n' + '\n'.join(f'{i},Nome{i},Cognome{i}' for i in range(1, 41))
+    response = client.post('/api/upload-students', data={'file': (io.BytesIO(roster.encode()), 'classe.csv')})
+    assert (response.json['imported'], response.json['skipped']) == (10, 30)
+
+    response = client.post('/api/set-all-dates', json={
+        'materia': 'Storia', 'data_inizio': '2025-10-06', 'giorni_settimana': [0, 3]
+    })
+    assert response.status_code == 200
+    assert len(response.json['dates']) == 30
+    with app.app_context():
+        assert module.Interrogation.query.filter(module.Interrogation.data_lezione.is_(None)).count() == 0
+
+
+def read_events(subscription):
+    """Eventi 'lessons' in coda per un iscritto, decodificati"""
+    events = []
+    while not subscription.empty():
+        message = subscription.get_nowait()
+        if message.startswith('event: lessons'):
+            events.append(json.loads(message.split('data: ', 1)[1]))
+    return events
+
+
+def test_events_carry_their_own_version(sqlite_app):
+    """Con due modifiche concorrenti ogni evento ha la versione della propria modifica"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client)
+    subscription = app.extensions['calendar_events'].subscribe('Storia')
+
+    # Due modifiche salvate prima che la prima sia pubblicata
+    with app.test_request_context():
+        first = module.record_calendar_change('Storia', 'date', [1])
+        module.db.session.commit()
+        second = module.record_calendar_change('Storia', 'date', [2])
+        module.db.session.commit()
+        module.notify_calendar_change('Storia', first, [1])
+        module.notify_calendar_change('Storia', second, [2])
+
+    events = read_events(subscription)
+    assert first < second
+    assert [(event['version'], list(event['lessons'])) for event in events] == [(first, ['1']), (second, ['2'])]
+
+    # Via HTTP: la versione dell'evento è quella restituita poi da since=
+    for lezione_num in (1, 2):
+        assert client.put('/api/set-lesson-date', json={
+            'materia': 'Storia', 'lezione_num': lezione_num, 'data_lezione': '2025-10-06'
+        }).status_code == 200
+    versions = [event['version'] for event in read_events(subscription)]
+    assert versions[0] < versions[1] == client.get('/api/get-calendar/Storia').json['version']
+
+
+def test_delta_with_interleaved_materie(sqlite_app):
+    """Con modifiche alternate su due materie since= restituisce le versioni della materia richiesta"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client, num_lezioni=3, distribuzione=(2, 1, 1))
+    assert client.post('/api/create-calendar', json={
+        'materia': 'Fisica', 'num_lezioni': 3, 'distribuzione': [2, 1, 1]
+    }).status_code == 200
+    version = client.get('/api/get-calendar/Storia').json['version']
+
+    def set_date(materia, lezione_num):
+        assert client.put('/api/set-lesson-date', json={
+            'materia': materia, 'lezione_num': lezione_num, 'data_lezione': '2025-10-06'
+        }).status_code == 200
+
+    set_date('Storia', 1)
+    set_date('Fisica', 1)
+    set_date('Storia', 2)
+    set_date('Fisica', 2)
+
+    with app.app_context():
+        storia = [change.id for change in module.InterrogationChange.query.filter_by(materia='Storia')]
+        fisica = [change.id for change in module.InterrogationChange.query.filter_by(materia='Fisica')]
+    assert max(fisica) > max(storia)
+
+    response = client.get(f'/api/get-calendar/Storia?since={version}').json
+    assert response['full'] is False
+    assert sorted(response['calendario']) == ['1', '2']
+    assert response['version'] == max(storia)
+
+    # Da una versione intermedia arriva solo la lezione modificata dopo
+    response = client.get(f'/api/get-calendar/Storia?since={sorted(storia)[-2]}').json
+    assert (list(response['calendario']), response['version']) == (['2'], max(storia))
+
+    # Nessuna modifica successiva: la versione resta quella nota al client
+    response = client.get(f'/api/get-calendar/Storia?since={max(storia)}').json
+    assert (response['calendario'], response['version']) == ({}, max(storia))
+
+
+def test_export_bundle_contents(sqlite_app):
+    """Il pacchetto ZIP contiene un file per materia, generato nel pool di processi"""
+    module, app = sqlite_app
+    app.config['EXPORT_WORKERS'] = 2
+    client = app.test_client()
+    setup_class(client)
+    assert client.post('/api/create-calendar', json={
+        'materia': 'Fisica', 'num_lezioni': 3, 'distribuzione': [2, 2, 2]
+    }).status_code == 200
+
+    for format in ('csv', 'json', 'pdf'):
+        response = client.get(f'/api/interrogations/export-bundle/{format}')
+        assert response.status_code == 200
+        assert response.headers['Content-Type'] == 'application/zip'
+
+        with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+            names = sorted(archive.namelist())
+            assert len(names) == 2
+            assert names[0].startswith('interrogazioni_Fisica_') and names[0].endswith(f'.{format}')
+            assert names[1].startswith('interrogazioni_Storia_') and names[1].endswith(f'.{format}')
+            contents = [archive.read(name) for name in names]
+
+        if format == 'csv':
+            lines = [content.decode('utf-8').splitlines() for content in contents]
+            assert lines[0][0] == 'Lezione,Data,Ordine,Registro,Nome,Cognome'
+            assert [len(rows) - 1 for rows in lines] == [6, 6]
+        elif format == 'json':
+            exports = [json.loads(content) for content in contents]
+            assert [export['materia'] for export in exports] == ['Fisica', 'Storia']
+            assert all(sum(len(e['studenti']) for e in export['estrazioni']) == 6 for export in exports)
+        else:
+            assert all(content.startswith(b'%PDF') for content in contents)
+
+    assert client.get('/api/interrogations/export-bundle/xml').status_code == 400
+
+
+def pdf_cells(content):
+    """Testi scritti nei content stream di un PDF reportlab (ASCII85 + Flate)"""
+    cells = []
+    for stream in re.findall(rb'stream\r?\n(.*?)endstream', content, re.S):
+        text = zlib.decompress(base64.a85decode(stream.strip(), adobe=True))
+        cells.extend(cell.decode('latin-1') for cell in re.findall(rb'\((.*?)\) Tj', text))
+    return cells
+
+
+def test_agenda_batch_matches_single_student(sqlite_app):
+    """Ogni agenda del pacchetto elenca le stesse interrogazioni di /api/interrogations?student_id="""
+    module, app = sqlite_app
+    app.config['EXPORT_WORKERS'] = 2
+    client = app.test_client()
+    setup_class(client)
+    assert client.post('/api/create-calendar', json={
+        'materia': 'Fisica', 'num_lezioni': 3, 'distribuzione': [2, 2, 2]
+    }).status_code == 200
+    assert client.put('/api/set-lesson-date', json={
+        'materia': 'Fisica', 'lezione_num': 2, 'data_lezione': '2099-01-10'
+    }).status_code == 200
+
+    response = client.get('/api/students/agenda-batch')
+    assert response.status_code == 200
+    assert response.headers['X-Agenda-Count'] == '6'
+
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        agendas = {name: archive.read(name) for name in archive.namelist()}
+    assert len(agendas) == 6
+
+    for student in client.get('/api/students').json['students']:
+        interrogations = client.get(f"/api/interrogations?student_id={student['id']}").json['interrogations']
+        # Prima le lezioni con data, poi quelle da definire, per materia e lezione
+        interrogations.sort(key=lambda i: (i['data_lezione'] is None, i['data_lezione'] or '',
+                                           i['materia'], i['lezione_num']))
+        expected = []
+        for interr in interrogations:
+            data = date.fromisoformat(interr['data_lezione'][:10]).strftime('%d/%m/%Y') if interr['data_lezione'] else 'Da definire'
+            expected += [data, interr['materia'], str(interr['lezione_num']), str(interr['ordine'])]
+
+        name = f"agenda_{student['registro_num']:03d}_{student['cognome']}_{student['nome']}.pdf"
+        cells = pdf_cells(agendas[name])
+        assert cells[cells.index('Ordine') + 1:] == expected
+
+
+def read_pages(client, url, limit):
+    """Legge tutte le pagine seguendo next_cursor"""
+    items, cursor = [], None
+    while True:
+        page = client.get(url, query_string={'limit': limit, **({'cursor': cursor} if cursor else {})}).json
+        assert page['success'] and page['count'] <= limit
+        items.extend(page[url.rsplit('/', 1)[1]])
+        cursor = page['next_cursor']
+        if not cursor:
+            return items
+
+
+def test_keyset_pagination_round_trip(sqlite_app):
+    """Le pagine a cursore coprono tutti gli elementi, senza duplicati né buchi"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client, num_students=7)
+    assert client.post('/api/create-calendar', json={
+        'materia': 'Fisica', 'num_lezioni': 3, 'distribuzione': [3, 2, 2]
+    }).status_code == 200
+
+    for url in ('/api/students', '/api/interrogations'):
+        everything = client.get(url).json[url.rsplit('/', 1)[1]]
+        for limit in (1, 3, 5, 100):
+            paged = read_pages(client, url, limit)
+            assert [item['id'] for item in paged] == [item['id'] for item in everything]
+
+
+def test_invalid_cursor_is_rejected(sqlite_app):
+    """Un cursore manomesso risponde 400, anche se ha il numero giusto di valori"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client)
+
+    def cursor(values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    for url, values in (
+        ('/api/interrogations', [{}, 1, 2, 3]),
+        ('/api/interrogations', ['Storia', '1', 2, 3]),
+        ('/api/interrogations', ['Storia', 1, 2]),
+        ('/api/interrogations', ['Storia', 1, True, 3]),
+        ('/api/students', [None]),
+        ('/api/students', 'abc'),
+    ):
+        response = client.get(url, query_string={'cursor': cursor(values)})
+        assert response.status_code == 400, values
+        assert response.json['error'] == 'Cursore non valido'
+
+    assert client.get('/api/students?cursor=%%%').status_code == 400
+    assert client.get('/api/interrogations', query_string={
+        'cursor': cursor(['Storia', 1, 1, 1])
+    }).status_code == 200
+
+
+def python_calendar(module, app, materia):
+    """Calendario {lezione_num: [studenti]} letto dagli oggetti ORM, come faceva l'advisor"""
+    with app.app_context():
+        calendario = {}
+        for interr in module.Interrogation.query.filter_by(materia=materia).all():
+            calendario.setdefault(interr.lezione_num, []).append(interr.student.to_dict())
+        return calendario, module.Student.query.count()
+
+
+def test_ai_advice_matches_python_evaluation(sqlite_app):
+    """Gli aggregati SQL danno le stesse analisi della valutazione in Python"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client, num_students=8)
+    assert client.post('/api/create-calendar', json={
+        'materia': 'Fisica', 'num_lezioni': 2, 'distribuzione': [6, 1]
+    }).status_code == 200
+
+    def compare(materia):
+        calendario, total = python_calendar(module, app, materia)
+        advisor = module.ai_advisor
+        expected = {
+            'distribution': advisor.analyze_distribution(calendario),
+            'quality': advisor.evaluate_schedule_quality(calendario, total),
+            'study_time': advisor.generate_study_time_advice(calendario)
+        }
+        for advice_type, result in expected.items():
+            response = client.post('/api/ai-advice', json={'materia': materia, 'advice_type': advice_type})
+            assert response.json['advice'] == json.loads(json.dumps(result)), (materia, advice_type)
+        return expected['quality']
+
+    assert compare('Storia')['score'] == 100
+    assert 'Distribuzione sbilanciata tra le lezioni' in compare('Fisica')['issues']
+
+    # Uno studente ripetuto: compare tra i duplicati in entrambe le valutazioni
+    with app.app_context():
+        first, other = module.Interrogation.query.filter_by(materia='Storia').order_by(
+            module.Interrogation.lezione_num.desc(), module.Interrogation.ordine
+        ).limit(2).all()
+        first, registro_num = first.id, other.student.registro_num
+    assert client.put('/api/interrogations/update-students-batch', json={'operations': [
+        {'interrogation_id': first, 'new_registro_num': registro_num}
+    ]}).json['updated'] == 1
+    assert 'Presenti studenti duplicati' in compare('Storia')['issues']
+
+
+def test_mutations_invalidate_cached_analysis(sqlite_app):
+    """Dopo ogni modifica del calendario l'analisi AI viene ricalcolata"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client)
+    cache = app.extensions['analysis_cache']
+
+    def advice(advice_type='distribution'):
+        response = client.post('/api/ai-advice', json={'materia': 'Storia', 'advice_type': advice_type})
+        assert response.status_code == 200
+        return response.json['advice']
+
+    def assert_recomputed(mutate):
+        before = advice()
+        misses = cache.misses
+        assert advice() == before and cache.misses == misses
+        assert mutate().status_code == 200
+        after = advice()
+        assert cache.misses > misses
+        return before, after
+
+    positions = get_positions(module, app)
+    first = next(i for i, pos in positions.items() if pos[:2] == (1, 1))
+    second = next(i for i, pos in positions.items() if pos[:2] == (1, 2))
+
+    # Spostare un'interrogazione in una nuova lezione cambia la distribuzione
+    before, after = assert_recomputed(lambda: client.put('/api/interrogations/reorder', json={
+        'materia': 'Storia', 'layout': [{'id': first, 'lezione_num': 9, 'ordine': 1}]
+    }))
+    assert after['statistics']['lessons'] == before['statistics']['lessons'] + 1
+
+    # Uno studente ripetuto compare nella valutazione di qualità
+    with app.app_context():
+        registro_num = module.db.session.get(module.Interrogation, second).student.registro_num
+    assert 'Presenti studenti duplicati' not in advice('quality')['issues']
+    assert_recomputed(lambda: client.put('/api/interrogations/update-student', json={
+        'interrogation_id': first, 'new_registro_num': registro_num
+    }))
+    assert 'Presenti studenti duplicati' in advice('quality')['issues']
+
+    assert_recomputed(lambda: client.post('/api/set-all-dates', json={
+        'materia': 'Storia', 'data_inizio': '2099-01-05', 'giorni_settimana': [0, 2]
+    }))
+
+
+def test_sparse_fieldsets(sqlite_app):
+    """fields= restituisce solo i campi richiesti; senza fields la forma è quella di to_dict()"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client)
+
+    with app.app_context():
+        expected = [
+            interr.to_dict()
+            for interr in module.Interrogation.query.order_by(
+                module.Interrogation.materia, module.Interrogation.lezione_num,
+                module.Interrogation.ordine, module.Interrogation.id
+            )
+        ]
+    full = client.get('/api/interrogations').json['interrogations']
+    assert full == json.loads(module.json_dumps(expected))
+
+    partial = client.get('/api/interrogations?fields=id,ordine,student.nome').json['interrogations']
+    assert [set(item) for item in partial] == [{'id', 'ordine', 'student'}] * len(full)
+    assert partial == [
+        {'id': item['id'], 'ordine': item['ordine'], 'student': {'nome': item['student']['nome']}}
+        for item in full
+    ]
+
+    single = client.get(f"/api/interrogations/{full[0]['id']}?fields=materia,student").json['interrogation']
+    assert single == {'materia': 'Storia', 'student': full[0]['student']}
+
+    response = client.get('/api/interrogations?fields=id,voto')
+    assert response.status_code == 400
+    assert response.json['error'] == 'Campo non valido: voto'
+    assert client.get('/api/interrogations?fields=student.voto').status_code == 400
+
+
+def test_json_dates_are_iso_8601(sqlite_app, monkeypatch):
+    """Date e datetime sono serializzate in ISO 8601, con orjson e con il modulo json standard"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client)
+    assert client.put('/api/set-lesson-date', json={
+        'materia': 'Storia', 'lezione_num': 1, 'data_lezione': '2025-10-09'
+    }).status_code == 200
+
+    item = next(i for i in client.get('/api/interrogations').json['interrogations'] if i['lezione_num'] == 1)
+    assert item['data_lezione'] == '2025-10-09'
+    datetime.fromisoformat(item['created_at'])
+    datetime.fromisoformat(item['student']['created_at'])
+
+    groups = client.get('/api/interrogations/by-materia/Storia').json['groups']
+    assert groups[0]['data_lezione'] == '2025-10-09'
+
+    import utils.json_provider as json_provider
+    payload = {1: [date(2025, 10, 9), datetime(2025, 10, 9, 8, 30)], 'nome': 'Niccolò'}
+    fast = json_provider.dumps(payload), json_provider.dumps(payload, indent=True)
+    monkeypatch.setattr(json_provider, 'orjson', None)
+    assert (json_provider.dumps(payload), json_provider.dumps(payload, indent=True)) == fast
+
+
+def test_cached_json_export_has_no_stale_timestamp(sqlite_app):
+    """L'esportazione JSON riusata dall'archivio è identica e senza orario di esportazione"""
+    module, app = sqlite_app
+    client = app.test_client()
+    setup_class(client)
+
+    first = client.post('/api/export', json={'materia': 'Storia', 'format': 'json'})
+    second = client.post('/api/export', json={'materia': 'Storia', 'format': 'json'})
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data
+    assert set(json.loads(first.data)) == {'materia', 'interrogations'}
+    assert app.extensions['export_store'].stats()['hits'] == 1
@@ -0,0 +1,54 @@
+"""
+Test della ricerca del calendario migliore (utils/calendar_search.py)
+Esegui con: python -m pytest test_calendar_search.py
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.calendar_search import score_calendar, search_batch, search_calendar
+
+STUDENTS = list(range(1, 25))
+DISTRIBUTION = [3, 2, 3]
+
+
+def other_positions():
+    """Metà degli studenti sempre all'inizio nelle altre materie, metà sempre alla fine"""
+    return {i: [0.0, 0.0] if i % 2 else [1.0, 1.0] for i in STUDENTS}
+
+
+def test_score_calendar_fairness():
+    """Chi è sempre tra i primi altrove dovrebbe essere tra gli ultimi qui"""
+    positions = other_positions()
+    fair = {1: [2, 4], 2: [6, 8], 3: [1, 3], 4: [5, 7]}     # pari all'inizio, dispari alla fine
+    unfair = {1: [1, 3], 2: [5, 7], 3: [2, 4], 4: [6, 8]}   # dispari all'inizio: sempre i primi
+
+    fair_detail = score_calendar(fair, 8, positions)
+    unfair_detail = score_calendar(unfair, 8, positions)
+
+    assert fair_detail['quality'] == unfair_detail['quality'] == 100
+    assert fair_detail['fairness'] > unfair_detail['fairness']
+    assert fair_detail['score'] > unfair_detail['score']
+    assert set(fair_detail) == {'score', 'quality', 'fairness'}
+
+
+def test_best_of_k_never_worse_than_one():
+    """Con lo stesso seme il primo candidato è lo stesso: il migliore di K non è mai peggiore"""
+    deadline = time.time() + 60
+    for seed in range(20):
+        _, single, _ = search_batch(STUDENTS, 3, DISTRIBUTION, len(STUDENTS), other_positions(), 1, seed, deadline)
+        best, detail, scores = search_batch(STUDENTS, 3, DISTRIBUTION, len(STUDENTS), other_positions(), 16, seed, deadline)
+
+        assert len(scores) == 16
+        assert detail['score'] == max(scores) >= single['score']
+        assert sorted(i for ids in best.values() for i in ids) == STUDENTS
+
+
+def test_search_calendar_summary():
+    """La ricerca restituisce il migliore tra tutti i candidati dei gruppi"""
+    with ThreadPoolExecutor(2) as pool:
+        result = search_calendar(pool, 2, STUDENTS, 3, DISTRIBUTION, len(STUDENTS), other_positions(), 10, 10.0)
+
+    assert result['candidates'] == 10
+    assert result['best']['score'] == result['score_distribution']['max']
+    assert sorted(i for ids in result['calendario'].values() for i in ids) == STUDENTS
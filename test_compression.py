@@ -0,0 +1,67 @@
+"""
+Test della compressione delle risposte (utils/compression.py)
+Esegui con: python -m pytest test_compression.py
+"""
+
+import os
+import gzip
+
+from flask import Flask, jsonify
+
+from utils.compression import ResponseCompressor
+
+
+def make_app(static_folder):
+    """Applicazione minima con due file statici comprimibili e una route JSON"""
+    (static_folder / 'style.css').write_text('body { color: red; }\n' * 100)
+    (static_folder / 'script.js').write_text('console.log("ciao");\n' * 100)
+
+    app = Flask(__name__, static_folder=str(static_folder), static_url_path='/static')
+    app.config['COMPRESS_BROTLI'] = False
+
+    @app.route('/data')
+    def data():
+        return jsonify({'valori': list(range(500))})
+
+    compressor = ResponseCompressor(app)
+    return app, compressor
+
+
+def test_compressed_responses_and_headers(tmp_path):
+    """Risposte JSON e file statici sono compressi solo se il client accetta gzip"""
+    app, compressor = make_app(tmp_path)
+    client = app.test_client()
+
+    for url in ('/data', '/static/style.css'):
+        plain = client.get(url)
+        assert 'Content-Encoding' not in plain.headers
+        assert 'Accept-Encoding' in plain.headers['Vary']
+
+        compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in compressed.headers['Vary']
+        assert gzip.decompress(compressed.data) == plain.data
+
+
+def test_changed_static_file_is_recompressed_alone(tmp_path):
+    """Solo il file modificato viene ricompresso; un file eliminato non causa errori"""
+    app, compressor = make_app(tmp_path)
+    client = app.test_client()
+    script = compressor.static_cache['script.js']
+
+    style = tmp_path / 'style.css'
+    style.write_text('p { margin: 0; }\n' * 100)
+    os.utime(style, (0, 0))
+
+    response = client.get('/static/style.css', headers={'Accept-Encoding': 'gzip'})
+    assert gzip.decompress(response.data) == style.read_bytes()
+    assert compressor.static_cache['style.css']['mtime'] == 0
+    assert compressor.static_cache['script.js'] is script
+
+    # Eliminato dopo l'avvio: 404 e voce rimossa dalla cache
+    (tmp_path / 'script.js').unlink()
+    assert client.get('/static/script.js', headers={'Accept-Encoding': 'gzip'}).status_code == 404
+    with app.test_request_context('/static/script.js', headers={'Accept-Encoding': 'gzip'}):
+        response = app.make_response(('x' * 1000, 200, {'Content-Type': 'text/css'}))
+        assert compressor._serve_precompressed(response, 'gzip') is response
+    assert 'script.js' not in compressor.static_cache
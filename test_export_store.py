@@ -0,0 +1,48 @@
+"""
+Test dell'archivio delle esportazioni (utils/export_store.py)
+Esegui con: python -m pytest test_export_store.py
+"""
+
+import os
+
+from utils.export_store import ExportStore
+
+
+def test_foreign_files_are_never_evicted(tmp_path):
+    """I file non scritti dall'archivio non sono indicizzati né eliminati"""
+    user_file = tmp_path / 'calendario_Storia_20240101.pdf'
+    user_file.write_bytes(b'x' * 500)
+    old_store_file = tmp_path / (ExportStore.make_key('vecchio') + '.csv')
+    old_store_file.write_bytes(b'y' * 500)
+
+    store = ExportStore(str(tmp_path), max_bytes=600)
+    assert store.stats()['files'] == 1
+
+    path = store.get_or_create(ExportStore.make_key('nuovo'), 'csv', lambda: b'z' * 500)
+
+    assert os.path.exists(path)
+    assert user_file.exists()
+    assert not old_store_file.exists()  # file dell'archivio: eliminato per LRU
+    assert store.stats()['evictions'] == 1
+
+
+def test_open_file_survives_eviction(tmp_path):
+    """Il file restituito da open resta leggibile anche se viene subito eliminato"""
+    store = ExportStore(str(tmp_path), max_bytes=600)
+
+    with store.open(ExportStore.make_key('primo'), 'csv', lambda: b'a' * 500) as first:
+        store.get_or_create(ExportStore.make_key('secondo'), 'csv', lambda: b'b' * 500)
+        assert store.stats()['evictions'] == 1
+        assert first.read() == b'a' * 500
+
+
+def test_file_removed_by_another_worker_is_regenerated(tmp_path):
+    """Un file indicizzato ma eliminato da un altro processo viene rigenerato"""
+    store = ExportStore(str(tmp_path))
+    key = ExportStore.make_key('calendario')
+    os.remove(store.get_or_create(key, 'json', lambda: b'{}'))
+
+    with store.open(key, 'json', lambda: b'{"nuovo":1}') as f:
+        assert f.read() == b'{"nuovo":1}'
+    assert store.stats()['misses'] == 2
+    assert store.stats()['bytes_on_disk'] == len(b'{"nuovo":1}')
@@ -0,0 +1,75 @@
+"""
+Test delle metriche Prometheus (utils/metrics.py)
+Esegui con: python -m pytest test_metrics.py
+"""
+
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from utils.metrics import Histogram, RequestMetrics
+
+
+def make_app(**config):
+    """Applicazione minima con le metriche attive e un database SQLite in memoria"""
+    app = Flask(__name__)
+    app.config.update({'METRICS_ENABLED': True, **config})
+    metrics = RequestMetrics(app)
+    engine = create_engine('sqlite://')
+
+    @app.route('/students/<int:num>')
+    def students(num):
+        with engine.connect() as conn:
+            for _ in range(num):
+                conn.execute(text('SELECT 1'))
+        return 'ok'
+
+    return app, metrics, engine
+
+
+def test_histogram_buckets():
+    """Un valore uguale al limite cade nel bucket (le = minore o uguale); oltre l'ultimo solo in +Inf"""
+    histogram = Histogram((1, 5, 10))
+    for value in (0, 1, 3, 10, 50):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [(1, 2), (5, 3), (10, 4)]
+    assert (histogram.count, histogram.sum) == (5, 64)
+
+
+def test_render_counts_queries_per_route():
+    """Le query eseguite durante la richiesta finiscono nell'istogramma della route"""
+    app, metrics, engine = make_app()
+    client = app.test_client()
+    client.get('/students/3')
+    client.get('/students/3')
+    client.get('/missing')
+
+    text_output = metrics.render()
+    route = 'route="/students/<int:num>",method="GET"'
+    assert f'http_requests_total{{{route},status="200"}} 2' in text_output
+    assert 'http_requests_total{route="unmatched",method="GET",status="404"} 1' in text_output
+    assert f'http_request_db_queries_bucket{{{route},le="2"}} 0' in text_output
+    assert f'http_request_db_queries_bucket{{{route},le="5"}} 2' in text_output
+    assert f'http_request_db_queries_bucket{{{route},le="+Inf"}} 2' in text_output
+    assert f'http_request_db_queries_sum{{{route}}} 6' in text_output
+    assert f'http_request_duration_seconds_bucket{{{route},le="0.005"}}' in text_output
+
+    # Fuori da una richiesta la query è contata come query in background
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+    assert metrics._background_queries == 1
+    assert 'db_background_queries_total 1' in metrics.render()
+
+
+def test_disabled_by_default():
+    """Senza METRICS_ENABLED le metriche non sono raccolte"""
+    app = Flask(__name__)
+    metrics = RequestMetrics(app)
+
+    @app.route('/students')
+    def students():
+        return 'ok'
+
+    app.test_client().get('/students')
+    assert not metrics.enabled
+    assert 'http_requests_total{' not in metrics.render()
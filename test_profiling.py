@@ -0,0 +1,90 @@
+"""
+Test della profilazione su richiesta (utils/profiling.py)
+Esegui con: python -m pytest test_profiling.py
+"""
+
+import pstats
+
+from flask import Flask
+
+from utils.profiling import RequestProfiler
+
+TOKEN = 'segreto'
+HEADERS = {'X-Profile': '1', 'X-Admin-Token': TOKEN}
+
+
+def make_app(folder, **config):
+    """Applicazione minima con il profilatore attivo"""
+    app = Flask(__name__)
+    app.config.update({'PROFILING_TOKEN': TOKEN, 'PROFILING_FOLDER': str(folder), **config})
+    profiler = RequestProfiler(app)
+
+    @app.route('/students')
+    def students():
+        return 'ok'
+
+    return app, profiler
+
+
+def test_profile_is_saved(tmp_path):
+    """Con header e token corretti il profilo è salvato e leggibile con pstats"""
+    app, profiler = make_app(tmp_path)
+    response = app.test_client().get('/students', headers=HEADERS)
+
+    assert response.headers['X-Profile-Status'] == 'ok'
+    path = profiler.get_path(response.headers['X-Profile-Id'])
+    assert path is not None
+    assert pstats.Stats(path).total_calls > 0
+
+
+def test_wrong_token_is_not_profiled(tmp_path):
+    """Un token errato non avvia il profilo ma la richiesta è servita"""
+    app, profiler = make_app(tmp_path)
+    response = app.test_client().get('/students', headers={'X-Profile': '1', 'X-Admin-Token': 'no'})
+
+    assert response.status_code == 200
+    assert response.headers['X-Profile-Status'] == 'unauthorized'
+    assert 'X-Profile-Id' not in response.headers
+    assert profiler.profiled == 0
+
+
+def test_non_ascii_token_is_unauthorized(tmp_path):
+    """Un token con caratteri non ASCII è rifiutato senza errori"""
+    app, profiler = make_app(tmp_path)
+    client = app.test_client()
+    # Gli header HTTP arrivano decodificati in latin-1
+    token = 'segretò'.encode('utf-8').decode('latin-1')
+    response = client.get('/students', headers={'X-Profile': '1', 'X-Admin-Token': token})
+
+    assert response.status_code == 200
+    assert response.headers['X-Profile-Status'] == 'unauthorized'
+    assert not profiler.check_token('è')
+
+    app, profiler = make_app(tmp_path, PROFILING_TOKEN='città')
+    assert profiler.check_token('città')
+
+
+def test_rate_limit_and_retention(tmp_path):
+    """Entro l'intervallo minimo le richieste non sono profilate; i file oltre il limite sono eliminati"""
+    app, profiler = make_app(tmp_path, PROFILING_MIN_INTERVAL=60)
+    client = app.test_client()
+
+    assert client.get('/students', headers=HEADERS).headers['X-Profile-Status'] == 'ok'
+    assert client.get('/students', headers=HEADERS).headers['X-Profile-Status'] == 'rate-limited'
+    assert profiler.rate_limited == 1
+
+    app, profiler = make_app(tmp_path / 'pochi', PROFILING_MIN_INTERVAL=0, PROFILING_MAX_FILES=2)
+    client = app.test_client()
+    for _ in range(4):
+        client.get('/students', headers=HEADERS)
+    assert len(list((tmp_path / 'pochi').glob('*.prof'))) == 2
+
+
+def test_disabled_without_token(tmp_path):
+    """Senza PROFILING_TOKEN gli header sono ignorati"""
+    app, profiler = make_app(tmp_path, PROFILING_TOKEN='')
+    response = app.test_client().get('/students', headers=HEADERS)
+
+    assert 'X-Profile-Status' not in response.headers
+    assert not profiler.check_token(TOKEN)
+    assert profiler.get_path('qualsiasi') is None
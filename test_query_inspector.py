@@ -0,0 +1,63 @@
+"""
+Test del rilevatore di query N+1 (utils/query_inspector.py)
+Esegui con: python -m pytest test_query_inspector.py
+"""
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from utils.query_inspector import NPlusOneDetector, NPlusOneError, normalize_statement
+
+
+def make_app(queries, **config):
+    """Applicazione minima con una route che esegue la stessa query più volte"""
+    app = Flask(__name__)
+    app.config.update(TESTING=True, NPLUSONE_THRESHOLD=3, **config)
+    NPlusOneDetector(app)
+    engine = create_engine('sqlite://')
+
+    @app.route('/students')
+    def students():
+        with engine.connect() as conn:
+            for student_id in range(queries):
+                conn.execute(text('SELECT :id AS id'), {'id': student_id})
+        return 'ok'
+
+    return app
+
+
+def test_normalize_statement():
+    """Valori, parametri e liste IN non cambiano la forma della query"""
+    first = normalize_statement("SELECT * FROM students WHERE id = 1 AND nome = 'Mario'")
+    second = normalize_statement("SELECT *\n  FROM students WHERE id = 42 AND nome = 'Anna'")
+    assert first == second == 'SELECT * FROM students WHERE id = ? AND nome = ?'
+
+    assert (normalize_statement('SELECT * FROM students WHERE id IN (?, ?, ?)')
+            == normalize_statement('SELECT * FROM students WHERE id IN (%(id_1)s, %(id_2)s)'))
+
+
+def test_repeated_query_raises_in_tests():
+    """Con TESTING la query ripetuta oltre la soglia fa fallire la richiesta"""
+    client = make_app(queries=5).test_client()
+
+    with pytest.raises(NPlusOneError) as error:
+        client.get('/students')
+
+    report = str(error.value)
+    assert 'GET /students: 5 query uguali' in report
+    assert 'test_query_inspector.py' in report  # riga che ha eseguito la query
+
+
+def test_queries_under_threshold_are_allowed():
+    """Fino alla soglia nessuna segnalazione"""
+    client = make_app(queries=3).test_client()
+    assert client.get('/students').status_code == 200
+
+
+def test_warning_when_not_raising():
+    """Senza NPLUSONE_RAISE viene emesso un avviso e la risposta è inviata"""
+    client = make_app(queries=5, NPLUSONE_RAISE=False).test_client()
+
+    with pytest.warns(UserWarning, match='N\\+1 in GET /students'):
+        assert client.get('/students').status_code == 200
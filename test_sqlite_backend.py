@@ -0,0 +1,90 @@
+"""
+Test del backend SQLite (DB_BACKEND=sqlite)
+Crea l'applicazione su un file temporaneo e verifica PRAGMA, indici e date
+Esegui con: python -m pytest test_sqlite_backend.py
+"""
+
+import io
+import os
+import re
+from datetime import date
+
+from sqlalchemy import text
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_pragmas_applied(sqlite_app):
+    """Ogni connessione usa WAL, chiavi esterne e busy_timeout"""
+    module, app = sqlite_app
+    with app.app_context(), module.db.engine.connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert conn.execute(text('PRAGMA foreign_keys')).scalar() == 1
+        assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert conn.execute(text('PRAGMA busy_timeout')).scalar() == app.config['SQLITE_BUSY_TIMEOUT']
+
+
+def test_same_indexes_as_schema(sqlite_app):
+    """Gli indici creati sono quelli di database/schema.sql"""
+    module, app = sqlite_app
+    with open(os.path.join(BASE_DIR, 'database', 'schema.sql'), encoding='utf-8') as f:
+        schema = f.read()
+
+    expected = {}
+    for table, body in re.findall(r'CREATE TABLE IF NOT EXISTS (\w+) \((.*?)\) ENGINE', schema, re.S):
+        expected[table] = {tuple(c.strip() for c in columns.split(','))
+                           for columns in re.findall(r'INDEX \w+ \(([^)]*)\)', body)}
+
+    with app.app_context(), module.db.engine.connect() as conn:
+        for table, indexes in expected.items():
+            created = set()
+            for row in conn.execute(text(f"PRAGMA index_list('{table}')")):
+                columns = conn.execute(text(f"PRAGMA index_info('{row[1]}')")).fetchall()
+                created.add(tuple(column[2] for column in sorted(columns)))
+            assert indexes <= created, f'{table}: mancano {indexes - created}'
+
+
+def test_lesson_dates_are_saved(sqlite_app):
+    """set-lesson-date e set-all-dates salvano date vere (SQLite rifiuta le stringhe)"""
+    module, app = sqlite_app
+    client = app.test_client()
+
+    roster = 'registro_num,nome,cognome\n' + '\n'.join(f'{i},Nome{i},Cognome{i}' for i in range(1, 7))
+    response = client.post('/api/upload-students', data={'file': (io.BytesIO(roster.encode()), 'classe.csv')})
+    assert response.json['imported'] == 6
+    assert client.post('/api/create-calendar', json={
+        'materia': 'Storia', 'num_lezioni': 2, 'distribuzione': [2, 1]
+    }).status_code == 200
+
+    response = client.put('/api/set-lesson-date', json={
+        'materia': 'Storia', 'lezione_num': 1, 'data_lezione': '2025-10-06'
+    })
+    assert response.status_code == 200
+    assert client.put('/api/set-lesson-date', json={
+        'materia': 'Storia', 'lezione_num': 1, 'data_lezione': '06/10/2025'
+    }).status_code == 400
+
+    response = client.post('/api/set-all-dates', json={
+        'materia': 'Storia', 'data_inizio': '2025-10-06', 'giorni_settimana': [0, 3]
+    })
+    assert response.status_code == 200
+
+    with app.app_context():
+        dates = {row.lezione_num: row.data_lezione for row in module.Interrogation.query.all()}
+    assert dates[1] == date(2025, 10, 6)
+    assert dates[2] == date(2025, 10, 9)
+
+
+def test_apps_do_not_share_state(sqlite_app, tmp_path):
+    """Una seconda create_app nello stesso processo non modifica i gestori della prima"""
+    module, app = sqlite_app
+    other = module.create_app('development')
+
+    for name in ('export_store', 'calendar_events', 'analysis_cache', 'metrics', 'profiler'):
+        assert app.extensions[name] is not other.extensions[name]
+    assert app.extensions['export_store'].folder == str(tmp_path / 'exports')
+
+    client = app.test_client()
+    assert client.get('/api/exports/stats').status_code == 200
+    with app.app_context():
+        assert module.get_export_store() is app.extensions['export_store']
@@ -0,0 +1,17 @@
+"""
+Test dell'avvio di app.py
+Verifica che i moduli pesanti (reportlab, TinyDB) non siano importati all'avvio.
+Il tempo di avvio rispetto a STARTUP_TIME_BUDGET si misura a parte con
+python benchmarks/bench_startup.py
+Esegui con: python -m pytest test_startup.py
+"""
+
+from benchmarks.bench_startup import loaded_packages
+
+# Moduli che devono essere caricati solo al primo utilizzo
+LAZY_PACKAGES = {'reportlab', 'tinydb'}
+
+
+def test_heavy_packages_are_lazy():
+    """Creare l'app non importa i moduli pesanti"""
+    assert not LAZY_PACKAGES & loaded_packages(), 'moduli pesanti importati all\'avvio'
@@ -0,0 +1,218 @@
+"""
+Stress test di TinyDBManager con più processi sullo stesso file
+Simula più worker di gunicorn che scrivono e leggono local_db.json insieme:
+nessuna scrittura deve andare persa e le letture senza lock non devono mai
+trovare il file a metà
+Esegui con: python test_tinydb_concurrency.py  (oppure con pytest)
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import multiprocessing
+
+from utils.database_manager import TinyDBManager
+
+# Configurazione
+NUM_PROCESSES = 6
+WRITES_PER_PROCESS = 40
+
+
+def writer(db_path, worker_id, writes, start_event):
+    """Processo che aggiunge studenti uno alla volta e in blocco"""
+    manager = TinyDBManager(db_path)
+    start_event.wait()
+    for i in range(writes):
+        registro_num = worker_id * 10000 + i
+        if i % 10 == 9:
+            # Ogni tanto un inserimento in blocco dentro una transazione
+            with manager.transaction():
+                manager.import_students_bulk([
+                    {'registro_num': registro_num, 'nome': f'W{worker_id}', 'cognome': f'B{i}'}
+                ])
+        else:
+            manager.add_student(registro_num, f'W{worker_id}', f'S{i}')
+        manager.add_interrogation('Stress', registro_num, i + 1, 1)
+
+
+def reader(db_path, start_event, stop_event, result_queue):
+    """Processo che legge senza lock mentre gli altri scrivono"""
+    manager = TinyDBManager(db_path)
+    start_event.wait()
+    reads, errors, last_count = 0, 0, 0
+    while not stop_event.is_set():
+        try:
+            count = len(manager.get_all_students())
+            # Con la sostituzione atomica il numero di studenti non può diminuire
+            if count < last_count:
+                errors += 1
+            last_count = count
+            reads += 1
+        except Exception:
+            errors += 1
+    result_queue.put((reads, errors))
+
+
+def run_stress(num_processes=NUM_PROCESSES, writes=WRITES_PER_PROCESS):
+    """
+    Esegue lo stress test in una cartella temporanea
+
+    Returns:
+        dict: Risultati (studenti, interrogazioni, id duplicati, letture, errori, secondi)
+    """
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'local_db.json')
+        start_event = ctx.Event()
+        stop_event = ctx.Event()
+        result_queue = ctx.Queue()
+
+        writers = [
+            ctx.Process(target=writer, args=(db_path, worker_id, writes, start_event))
+            for worker_id in range(1, num_processes + 1)
+        ]
+        readers = [ctx.Process(target=reader, args=(db_path, start_event, stop_event, result_queue))
+                   for _ in range(2)]
+
+        for process in writers + readers:
+            process.start()
+
+        started = time.perf_counter()
+        start_event.set()
+        for process in writers:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        stop_event.set()
+        reads, read_errors = 0, 0
+        for _ in readers:
+            r, e = result_queue.get(timeout=30)
+            reads += r
+            read_errors += e
+        for process in readers:
+            process.join()
+
+        # Il file finale deve essere JSON valido e completo
+        with open(db_path, encoding='utf-8') as f:
+            data = json.load(f)
+
+        students = list(data.get('students', {}).values())
+        registri = [s['registro_num'] for s in students]
+        return {
+            'students': len(students),
+            'interrogations': len(data.get('interrogations', {})),
+            'duplicates': len(registri) - len(set(registri)),
+            'reads': reads,
+            'read_errors': read_errors,
+            'exit_codes': [p.exitcode for p in writers + readers],
+            'seconds': round(elapsed, 2)
+        }
+
+
+def test_concurrent_writers_lose_nothing():
+    """Tutte le scritture di tutti i processi devono essere presenti"""
+    result = run_stress()
+    expected = NUM_PROCESSES * WRITES_PER_PROCESS
+
+    assert result['exit_codes'] == [0] * len(result['exit_codes'])
+    assert result['students'] == expected
+    assert result['interrogations'] == expected
+    assert result['duplicates'] == 0
+    assert result['read_errors'] == 0
+    assert result['reads'] > 0
+
+
+def test_external_changes_are_visible():
+    """Un gestore vede le modifiche fatte da un altro sullo stesso file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'local_db.json')
+        first = TinyDBManager(db_path)
+        second = TinyDBManager(db_path)
+
+        first.add_student(1, 'Mario', 'Rossi')
+        assert second.get_student_by_registro(1)['nome'] == 'Mario'
+
+        second.update_student(1, nome='Luigi')
+        second.add_student(2, 'Anna', 'Bianchi')
+        assert first.get_student_by_registro(1)['nome'] == 'Luigi'
+
+        # Il prossimo id è ricalcolato: nessun documento sovrascritto
+        first.add_student(3, 'Paolo', 'Verdi')
+        assert len(second.get_all_students()) == 3
+
+
+def test_failed_transaction_is_discarded():
+    """Un errore dentro una transazione non lascia modifiche a metà"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'local_db.json')
+        manager = TinyDBManager(db_path)
+        manager.add_student(1, 'Mario', 'Rossi')
+
+        try:
+            with manager.transaction():
+                manager.clear_students()
+                raise RuntimeError('errore simulato')
+        except RuntimeError:
+            pass
+
+        assert len(manager.get_all_students()) == 1
+        assert len(TinyDBManager(db_path).get_all_students()) == 1
+
+
+def test_readers_do_not_see_uncommitted_changes():
+    """Le letture senza lock di altri thread non vedono una transazione in corso o annullata"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'local_db.json')
+        manager = TinyDBManager(db_path)
+        manager.add_student(1, 'Mario', 'Rossi')
+        changed, resume = threading.Event(), threading.Event()
+
+        def write(fail):
+            try:
+                with manager.transaction():
+                    manager.update_student(1, nome='Luigi')
+                    manager.add_student(2, 'Anna', 'Bianchi')
+                    # Dentro la transazione il thread vede le proprie modifiche
+                    assert manager.get_student_by_registro(1)['nome'] == 'Luigi'
+                    changed.set()
+                    resume.wait(5)
+                    if fail:
+                        raise RuntimeError('errore simulato')
+            except RuntimeError:
+                pass
+
+        for fail in (True, False):
+            changed.clear()
+            resume.clear()
+            thread = threading.Thread(target=write, args=(fail,))
+            thread.start()
+            assert changed.wait(5)
+            assert manager.get_student_by_registro(1)['nome'] == 'Mario'
+            assert len(manager.get_all_students()) == 1
+            resume.set()
+            thread.join(5)
+
+        assert manager.get_student_by_registro(1)['nome'] == 'Luigi'
+        assert len(manager.get_all_students()) == 2
+        assert len(TinyDBManager(db_path).get_all_students()) == 2
+
+
+def main():
+    """Esegue lo stress test e stampa i risultati"""
+    print(f"Stress test TinyDB: {NUM_PROCESSES} processi x {WRITES_PER_PROCESS} scritture + 2 lettori")
+    result = run_stress()
+    for key, value in result.items():
+        print(f"  {key}: {value}")
+
+    expected = NUM_PROCESSES * WRITES_PER_PROCESS
+    passed = (result['students'] == expected and result['interrogations'] == expected
+              and result['duplicates'] == 0 and result['read_errors'] == 0)
+    print("✓ PASS" if passed else f"✗ FAIL (attesi {expected} studenti e interrogazioni)")
+    return passed
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -2,8 +2,17 @@
 Package utils per funzionalità di supporto
 """
 
-from .database_manager import TinyDBManager
 from .ai_advisor import AIAdvisor
+from .export_store import ExportStore
+from .events import EventBroker
 from .helpers import *
 
-__all__ = ['TinyDBManager', 'AIAdvisor']
+__all__ = ['TinyDBManager', 'AIAdvisor', 'ExportStore', 'EventBroker']
+
+
+def __getattr__(name):
+    # TinyDB è importato solo al primo utilizzo di TinyDBManager (avvio più veloce)
+    if name == 'TinyDBManager':
+        from .database_manager import TinyDBManager
+        return TinyDBManager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
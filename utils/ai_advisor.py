@@ -28,11 +28,22 @@ class AIAdvisor:
         Returns:
             dict: Analisi e suggerimenti
         """
-        suggestions = []
-        warnings = []
-        
         # Conta studenti per lezione
         student_counts = {lezione: len(studenti) for lezione, studenti in calendario.items()}
+        return self.analyze_distribution_counts(student_counts)
+    
+    def analyze_distribution_counts(self, student_counts):
+        """
+        Analizza la distribuzione a partire dal numero di interrogazioni per lezione
+        
+        Args:
+            student_counts (dict): Dizionario con struttura {lezione_num: numero interrogazioni}
+            
+        Returns:
+            dict: Analisi e suggerimenti
+        """
+        suggestions = []
+        warnings = []
         
         # Controlla bilanciamento
         if student_counts:
@@ -64,7 +75,7 @@ class AIAdvisor:
         return {
             'statistics': {
                 'total_interrogations': sum(student_counts.values()),
-                'lessons': len(calendario),
+                'lessons': len(student_counts),
                 'avg_per_lesson': avg_count if student_counts else 0,
                 'max_per_lesson': max_count if student_counts else 0,
                 'min_per_lesson': min_count if student_counts else 0
@@ -120,6 +131,19 @@ class AIAdvisor:
         student_counter = Counter(all_students)
         duplicates = {k: v for k, v in student_counter.items() if v > 1}
         
+        return self.check_repetition_counts(duplicates, len(all_students))
+    
+    def check_repetition_counts(self, duplicates, total_slots):
+        """
+        Controlla le ripetizioni a partire dalle occorrenze già contate
+        
+        Args:
+            duplicates (dict): Studenti ripetuti {registro_num: occorrenze (> 1)}
+            total_slots (int): Numero totale di interrogazioni
+            
+        Returns:
+            dict: Analisi ripetizioni
+        """
         warnings = []
         if duplicates:
             for registro_num, count in duplicates.items():
@@ -133,8 +157,9 @@ class AIAdvisor:
             'has_duplicates': len(duplicates) > 0,
             'duplicates': duplicates,
             'warnings': warnings,
-            'unique_students': len(set(all_students)),
-            'total_slots': len(all_students)
+            # Ogni studente ripetuto occupa più di un posto
+            'unique_students': total_slots - sum(count - 1 for count in duplicates.values()),
+            'total_slots': total_slots
         }
     
     def suggest_best_days(self, num_lessons):
@@ -189,7 +214,8 @@ class AIAdvisor:
         Genera consigli sui tempi di studio per gli studenti
         
         Args:
-            calendario (dict): Calendario interrogazioni
+            calendario (dict): Calendario interrogazioni (bastano i numeri di lezione
+                               come chiavi, es. i conteggi per lezione)
             
         Returns:
             dict: Consigli sui tempi di studio
@@ -326,13 +352,58 @@ class AIAdvisor:
             'priority_tips': [tip for tip in advice if tip['importance'] == 'alta']
         }
     
-    def evaluate_schedule_quality(self, calendario, studenti_totali):
+    def evaluate_schedule_quality(self, calendario, studenti_totali,
+                                  distribution_analysis=None, repetition_check=None):
         """
         Valuta la qualità complessiva del calendario
         
         Args:
             calendario (dict): Calendario interrogazioni
             studenti_totali (int): Numero totale studenti
+            distribution_analysis (dict, optional): Risultato già calcolato di analyze_distribution
+            repetition_check (dict, optional): Risultato già calcolato di check_student_repetitions
+            
+        Returns:
+            dict: Valutazione con punteggio
+        """
+        if distribution_analysis is None:
+            distribution_analysis = self.analyze_distribution(calendario)
+        if repetition_check is None:
+            repetition_check = self.check_student_repetitions(calendario)
+        
+        return self.evaluate_quality_analyses(distribution_analysis, repetition_check, studenti_totali)
+    
+    def evaluate_schedule_quality_counts(self, student_counts, duplicates, studenti_totali,
+                                         distribution_analysis=None):
+        """
+        Valuta la qualità del calendario a partire da conteggi già aggregati
+        
+        Args:
+            student_counts (dict): Interrogazioni per lezione {lezione_num: numero}
+            duplicates (dict): Studenti ripetuti {registro_num: occorrenze (> 1)}
+            studenti_totali (int): Numero totale studenti
+            distribution_analysis (dict, optional): Risultato già calcolato di analyze_distribution_counts
+            
+        Returns:
+            dict: Valutazione con punteggio
+        """
+        if distribution_analysis is None:
+            distribution_analysis = self.analyze_distribution_counts(student_counts)
+        
+        return self.evaluate_quality_analyses(
+            distribution_analysis,
+            self.check_repetition_counts(duplicates, sum(student_counts.values())),
+            studenti_totali
+        )
+    
+    def evaluate_quality_analyses(self, distribution_analysis, repetition_check, studenti_totali):
+        """
+        Calcola il punteggio di qualità dalle analisi di distribuzione e ripetizioni
+        
+        Args:
+            distribution_analysis (dict): Risultato di analyze_distribution
+            repetition_check (dict): Risultato di check_student_repetitions
+            studenti_totali (int): Numero totale studenti
             
         Returns:
             dict: Valutazione con punteggio
@@ -341,12 +412,6 @@ class AIAdvisor:
         issues = []
         good_points = []
         
-        # Analizza distribuzione
-        distribution_analysis = self.analyze_distribution(calendario)
-        
-        # Controlla ripetizioni
-        repetition_check = self.check_student_repetitions(calendario)
-        
         if repetition_check['has_duplicates']:
             score -= 30
             issues.append('Presenti studenti duplicati')
@@ -0,0 +1,87 @@
+"""
+Cache delle analisi AI per materia
+Memorizza i risultati di AIAdvisor (distribuzione, qualità, ...) insieme alla
+versione dei dati da cui sono stati calcolati: una versione diversa li invalida
+"""
+import threading
+
+
+class AnalysisCache:
+    """
+    Classe per memorizzare le analisi di ogni materia per versione dei dati
+
+    Per ogni materia è conservata una sola versione: i risultati calcolati
+    su una versione precedente vengono scartati al primo accesso.
+    """
+
+    def __init__(self):
+        """
+        Inizializza la cache vuota
+        """
+        # materia -> (versione, {nome analisi: risultato})
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, materia, version, name, compute):
+        """
+        Restituisce un'analisi dalla cache o la calcola
+
+        Args:
+            materia (str): Nome materia
+            version: Versione dei dati (qualsiasi valore confrontabile)
+            name (str): Nome dell'analisi (es. 'distribution', 'quality')
+            compute (callable): Funzione senza argomenti che calcola l'analisi
+
+        Returns:
+            Risultato dell'analisi
+        """
+        with self._lock:
+            entry = self._entries.get(materia)
+            if entry is not None and entry[0] == version and name in entry[1]:
+                self.hits += 1
+                return entry[1][name]
+
+        # Calcolo fuori dal lock: può richiedere query al database
+        result = compute()
+        self.store(materia, version, **{name: result})
+
+        with self._lock:
+            self.misses += 1
+        return result
+
+    def store(self, materia, version, **analyses):
+        """
+        Salva analisi già calcolate per una versione dei dati
+
+        Args:
+            materia (str): Nome materia
+            version: Versione dei dati
+            **analyses: Analisi da salvare, per nome
+
+        Returns:
+            None
+        """
+        with self._lock:
+            entry = self._entries.get(materia)
+            if entry is None or entry[0] != version:
+                entry = (version, {})
+                self._entries[materia] = entry
+            entry[1].update(analyses)
+
+    def invalidate(self, materia=None):
+        """
+        Elimina le analisi di una materia o di tutte
+
+        Args:
+            materia (str, optional): Nome materia; None per svuotare la cache
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if materia is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(materia, None)
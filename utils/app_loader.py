@@ -0,0 +1,34 @@
+"""
+Caricamento del modulo app.py
+app.py ha lo stesso nome del package app/, quindi non si può importare con
+"import app": va caricato dal percorso del file con un nome proprio
+"""
+import os
+import sys
+import importlib.util
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Nome con cui app.py è registrato in sys.modules
+APP_MODULE_NAME = 'interrogazioni_app'
+
+
+def load_app_module():
+    """
+    Carica app.py una sola volta per processo (nessuna app creata, nessun server avviato)
+
+    Returns:
+        module: Modulo dell'applicazione (create_app, init_database, ...)
+    """
+    if APP_MODULE_NAME in sys.modules:
+        return sys.modules[APP_MODULE_NAME]
+
+    spec = importlib.util.spec_from_file_location(APP_MODULE_NAME, os.path.join(BASE_DIR, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[spec.name]
+        raise
+    return module
@@ -0,0 +1,235 @@
+"""
+Ricerca del calendario migliore tra più candidati casuali
+Genera K calendari in parallelo (pool di processi), assegna a ciascuno un
+punteggio rapido ispirato a AIAdvisor.evaluate_schedule_quality, esteso con
+l'equità tra le materie, e restituisce il migliore
+"""
+import time
+import random
+import statistics
+
+
+# Peso del termine di equità (punti tolti al massimo)
+FAIRNESS_WEIGHT = 20
+
+
+def layout_calendar(students, lessons_per_week, distribution_per_lesson):
+    """
+    Distribuisce gli studenti (già in ordine casuale) nelle lezioni
+
+    Cicla la distribuzione settimanale finché tutti gli studenti sono assegnati.
+
+    Args:
+        students (list): Studenti nell'ordine di estrazione
+        lessons_per_week (int): Numero di giorni a settimana con interrogazioni
+        distribution_per_lesson (list): Numero di studenti per ciascun giorno della settimana
+
+    Returns:
+        dict: Calendario con struttura {lezione_num: [studenti]}
+    """
+    calendario = {}
+    student_index = 0
+    lezione_num = 1
+    total_students = len(students)
+
+    if sum(distribution_per_lesson[:lessons_per_week]) <= 0:
+        return calendario  # Distribuzione vuota: nessuno studente assegnabile
+
+    while student_index < total_students:
+        for day_index in range(lessons_per_week):
+            if student_index >= total_students:
+                break
+
+            students_for_lesson = students[student_index:student_index + distribution_per_lesson[day_index]]
+            student_index += len(students_for_lesson)
+
+            if students_for_lesson:  # Solo se ci sono studenti
+                calendario[lezione_num] = students_for_lesson
+                lezione_num += 1
+
+    return calendario
+
+
+def quality_score(student_counts, duplicates, total_students):
+    """
+    Punteggio di qualità senza messaggi (stesse regole di evaluate_schedule_quality)
+
+    Args:
+        student_counts (list): Numero di interrogazioni per lezione
+        duplicates (int): Numero di studenti ripetuti
+        total_students (int): Numero totale studenti
+
+    Returns:
+        int: Punteggio 0-100
+    """
+    score = 100
+    if duplicates:
+        score -= 30
+
+    if student_counts:
+        max_count = max(student_counts)
+        if max_count - min(student_counts) > 2:
+            score -= 20
+        if max_count > 5:
+            score -= 10
+
+    coverage = (sum(student_counts) / total_students * 100) if total_students > 0 else 0
+    if coverage < 80:
+        score -= 15
+
+    return max(0, score)
+
+
+def score_calendar(calendario, total_students, other_positions):
+    """
+    Punteggio di un calendario candidato
+
+    Oltre alla qualità di base considera l'equità: quanto varia tra gli studenti
+    la posizione media (0 = prima lezione, 1 = ultima) considerando anche le
+    altre materie; nessuno dovrebbe essere sempre tra i primi o sempre tra gli
+    ultimi. Le sovrapposizioni con le altre materie non sono valutate: il numero
+    di lezione è solo l'ordine nella materia e le date sono assegnate dopo la
+    creazione (set-all-dates), quindi non c'è un giorno da confrontare.
+
+    Args:
+        calendario (dict): Calendario {lezione_num: [id studenti]}
+        total_students (int): Numero totale studenti
+        other_positions (dict): id studente -> lista delle posizioni relative nelle altre materie
+
+    Returns:
+        dict: score, quality, fairness
+    """
+    counts = [len(ids) for ids in calendario.values()]
+    assigned = sum(counts)
+    quality = quality_score(counts, assigned - len({i for ids in calendario.values() for i in ids}), total_students)
+
+    last_lesson = max(calendario) if calendario else 1
+    means = []
+    for lezione_num, ids in calendario.items():
+        position = (lezione_num - 1) / (last_lesson - 1) if last_lesson > 1 else 0.5
+        for student_id in ids:
+            others = other_positions.get(student_id)
+            if others:
+                means.append((position + sum(others)) / (len(others) + 1))
+
+    # Deviazione standard massima delle medie: 0.5 (metà a 0, metà a 1)
+    spread = statistics.pstdev(means) if len(means) > 1 else 0.0
+    fairness = max(0.0, 1 - spread / 0.5)
+
+    score = quality - FAIRNESS_WEIGHT * (1 - fairness)
+
+    return {
+        'score': round(max(0.0, score), 2),
+        'quality': quality,
+        'fairness': round(fairness, 3)
+    }
+
+
+def search_batch(student_ids, lessons_per_week, distribution_per_lesson, total_students,
+                 other_positions, candidates, seed, deadline):
+    """
+    Genera e valuta un gruppo di candidati (eseguito in un processo del pool)
+
+    Si ferma prima di aver generato tutti i candidati se supera la scadenza.
+
+    Args:
+        student_ids (list): Id degli studenti da assegnare
+        lessons_per_week (int): Giorni a settimana con interrogazioni
+        distribution_per_lesson (list): Studenti per giorno della settimana
+        total_students (int): Numero totale studenti
+        other_positions (dict): Vedi score_calendar
+        candidates (int): Numero massimo di candidati da generare
+        seed (int): Seme del generatore casuale
+        deadline (float): Istante (time.time()) oltre il quale fermarsi
+
+    Returns:
+        tuple: (miglior calendario, suo punteggio, lista di tutti i punteggi)
+    """
+    rng = random.Random(seed)
+    best, best_detail, scores = None, None, []
+
+    for _ in range(candidates):
+        # Almeno un candidato per gruppo, anche a tempo scaduto
+        if scores and time.time() >= deadline:
+            break
+
+        order = list(student_ids)
+        rng.shuffle(order)
+        calendario = layout_calendar(order, lessons_per_week, distribution_per_lesson)
+        detail = score_calendar(calendario, total_students, other_positions)
+
+        scores.append(detail['score'])
+        if best_detail is None or detail['score'] > best_detail['score']:
+            best, best_detail = calendario, detail
+
+    return best, best_detail, scores
+
+
+def search_calendar(pool, workers, student_ids, lessons_per_week, distribution_per_lesson,
+                    total_students, other_positions, candidates, time_budget):
+    """
+    Cerca il calendario migliore tra più candidati, distribuiti sui processi del pool
+
+    Args:
+        pool (Executor): Pool di processi
+        workers (int): Numero di gruppi in cui dividere i candidati
+        student_ids (list): Id degli studenti da assegnare
+        lessons_per_week (int): Giorni a settimana con interrogazioni
+        distribution_per_lesson (list): Studenti per giorno della settimana
+        total_students (int): Numero totale studenti
+        other_positions (dict): Vedi score_calendar
+        candidates (int): Numero di candidati da generare (K)
+        time_budget (float): Tempo massimo di ricerca in secondi
+
+    Returns:
+        dict: calendario (id studenti), punteggio del migliore, distribuzione dei punteggi
+    """
+    started = time.time()
+    deadline = started + time_budget
+    workers = max(1, min(workers, candidates))
+    seeds = random.SystemRandom()
+
+    # Candidati divisi in parti uguali tra i processi
+    futures = [
+        pool.submit(
+            search_batch, student_ids, lessons_per_week, distribution_per_lesson, total_students,
+            other_positions, candidates // workers + (1 if i < candidates % workers else 0),
+            seeds.randrange(2 ** 32), deadline
+        )
+        for i in range(workers)
+    ]
+
+    best, best_detail, scores = None, None, []
+    for future in futures:
+        calendario, detail, batch_scores = future.result()
+        scores.extend(batch_scores)
+        if best_detail is None or detail['score'] > best_detail['score']:
+            best, best_detail = calendario, detail
+
+    return {
+        'calendario': best,
+        'best': best_detail,
+        'candidates': len(scores),
+        'score_distribution': summarize_scores(scores),
+        'elapsed_seconds': round(time.time() - started, 3)
+    }
+
+
+def summarize_scores(scores):
+    """
+    Riassume la distribuzione dei punteggi dei candidati
+
+    Args:
+        scores (list): Punteggi dei candidati valutati
+
+    Returns:
+        dict: min, max, media, mediana, 90° percentile
+    """
+    ordered = sorted(scores)
+    return {
+        'min': ordered[0],
+        'max': ordered[-1],
+        'mean': round(statistics.fmean(ordered), 2),
+        'p50': round(statistics.median(ordered), 2),
+        'p90': ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))]
+    }
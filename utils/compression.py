@@ -0,0 +1,241 @@
+"""
+Compressione delle risposte HTTP
+Comprime con gzip (o brotli, se installato) le risposte JSON, CSV e testuali
+secondo l'header Accept-Encoding del client; i file statici sono compressi
+una sola volta all'avvio
+"""
+import os
+import gzip
+import mimetypes
+
+from flask import request, current_app
+
+try:
+    import brotli
+except ImportError:  # brotli è opzionale
+    brotli = None
+
+
+# Tipi di contenuto che vale la pena comprimere
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+    'text/csv',
+    'text/css',
+    'text/html',
+    'text/plain',
+    'image/svg+xml'
+}
+
+
+class ResponseCompressor:
+    """
+    Classe per comprimere le risposte dell'applicazione Flask
+    """
+
+    def __init__(self, app=None):
+        """
+        Inizializza il compressore
+
+        Args:
+            app (Flask, optional): Applicazione da configurare
+        """
+        self.level = 6
+        self.min_size = 500
+        self.encodings = ['gzip']
+        self.static_cache = {}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Registra il compressore sull'applicazione e pre-comprime i file statici
+
+        Args:
+            app (Flask): Applicazione Flask
+
+        Returns:
+            None
+        """
+        if not app.config.get('COMPRESS_ENABLED', True):
+            return
+
+        self.level = app.config.get('COMPRESS_LEVEL', 6)
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+
+        # Brotli ha priorità su gzip a parità di preferenza del client
+        self.encodings = ['gzip']
+        if brotli is not None and app.config.get('COMPRESS_BROTLI', True):
+            self.encodings.insert(0, 'br')
+
+        if app.static_folder and os.path.isdir(app.static_folder):
+            self._precompress_static(app.static_folder)
+
+        app.after_request(self.after_request)
+
+    def _compress(self, data, encoding, level):
+        """
+        Comprime i dati con la codifica indicata
+
+        Args:
+            data (bytes): Dati da comprimere
+            encoding (str): 'gzip' o 'br'
+            level (int): Livello di compressione (scala gzip 1-9)
+
+        Returns:
+            bytes: Dati compressi
+        """
+        if encoding == 'br':
+            # Riporta il livello gzip (1-9) sulla scala brotli (0-11)
+            return brotli.compress(data, quality=min(11, round(level * 11 / 9)))
+        return gzip.compress(data, compresslevel=level, mtime=0)
+
+    def _precompress_static(self, static_folder):
+        """
+        Comprime tutti i file statici comprimibili al livello massimo
+
+        Args:
+            static_folder (str): Cartella dei file statici
+
+        Returns:
+            None
+        """
+        for root, _, files in os.walk(static_folder):
+            for name in files:
+                if mimetypes.guess_type(name)[0] not in COMPRESSIBLE_MIMETYPES:
+                    continue
+                filename = os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+                self._precompress_file(static_folder, filename)
+
+    def _precompress_file(self, static_folder, filename):
+        """
+        Comprime un singolo file statico e aggiorna la cache
+
+        Args:
+            static_folder (str): Cartella dei file statici
+            filename (str): Percorso del file relativo alla cartella
+
+        Returns:
+            dict: Voce della cache, o None se il file è troppo piccolo o non esiste più
+        """
+        path = os.path.join(static_folder, filename)
+        try:
+            mtime = os.path.getmtime(path)
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.static_cache.pop(filename, None)
+            return None
+
+        if len(data) < self.min_size:
+            self.static_cache.pop(filename, None)
+            return None
+
+        entry = {
+            'mtime': mtime,
+            'variants': {encoding: self._compress(data, encoding, 9) for encoding in self.encodings}
+        }
+        self.static_cache[filename] = entry
+        return entry
+
+    def _negotiate(self):
+        """
+        Sceglie la codifica migliore accettata dal client
+
+        Returns:
+            str: Codifica scelta o None
+        """
+        return request.accept_encodings.best_match(self.encodings)
+
+    def after_request(self, response):
+        """
+        Comprime la risposta se il client lo permette
+
+        Args:
+            response (Response): Risposta da inviare
+
+        Returns:
+            Response: Risposta eventualmente compressa
+        """
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        if response.status_code != 200 or 'Content-Encoding' in response.headers:
+            return response
+
+        encoding = self._negotiate()
+        if not encoding:
+            return response
+
+        if request.endpoint == 'static':
+            return self._serve_precompressed(response, encoding)
+
+        if response.is_streamed and not response.direct_passthrough:
+            return response
+
+        # I file inviati con send_file (es. esportazioni) vengono letti in memoria
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        response.set_data(self._compress(data, encoding, self.level))
+        self._mark_encoded(response, encoding)
+        return response
+
+    def _serve_precompressed(self, response, encoding):
+        """
+        Sostituisce il corpo di un file statico con la versione pre-compressa
+
+        Args:
+            response (Response): Risposta generata da send_static_file
+            encoding (str): Codifica scelta
+
+        Returns:
+            Response: Risposta con il file compresso, o quella originale
+        """
+        filename = (request.view_args or {}).get('filename')
+        cached = self.static_cache.get(filename)
+        if not cached or encoding not in cached['variants']:
+            return response
+
+        # Il file è cambiato dopo l'avvio: ricomprimiamo solo quello
+        path = os.path.join(current_app.static_folder, filename)
+        try:
+            changed = os.path.getmtime(path) != cached['mtime']
+        except FileNotFoundError:
+            self.static_cache.pop(filename, None)
+            return response
+
+        if changed:
+            cached = self._precompress_file(current_app.static_folder, filename)
+            if not cached:
+                return response
+
+        response.close()
+        response.direct_passthrough = False
+        response.set_data(cached['variants'][encoding])
+        self._mark_encoded(response, encoding)
+        return response
+
+    @staticmethod
+    def _mark_encoded(response, encoding):
+        """
+        Aggiorna gli header di una risposta compressa
+
+        Args:
+            response (Response): Risposta compressa
+            encoding (str): Codifica usata
+
+        Returns:
+            None
+        """
+        response.headers['Content-Encoding'] = encoding
+        # Come nginx: la versione compressa è equivalente ma non identica byte per byte
+        etag, _ = response.get_etag()
+        if etag:
+            response.set_etag(etag, weak=True)
@@ -1,16 +1,272 @@
 """
 Gestione database TinyDB per salvataggio locale
-Fornisce funzioni per operazioni CRUD su database locale JSON
+Fornisce funzioni per operazioni CRUD su database locale JSON.
+Il file può essere condiviso da più processi (worker di gunicorn): le scritture
+sono serializzate da un lock su file e sostituiscono il file in modo atomico,
+le letture usano una copia in memoria ricaricata quando il file cambia
 """
 from tinydb import TinyDB, Query
+from tinydb.storages import Storage
+from tinydb.table import Table
+from contextlib import contextmanager
 import os
+import copy
 import json
+import time
+import threading
 from datetime import datetime
 
+from .file_lock import FileLock
+
+
+class AtomicJSONStorage(Storage):
+    """
+    Storage TinyDB su file JSON con scrittura atomica
+
+    Ogni scrittura crea un file temporaneo e lo sostituisce all'originale con
+    os.replace: chi legge trova sempre il file vecchio o quello nuovo completo,
+    mai uno scritto a metà. I dati letti restano in memoria finché il file non
+    cambia (inode, dimensione o data di modifica diversi).
+
+    Durante una transazione (begin/end) il thread che scrive lavora su una
+    copia dei dati: le letture senza lock degli altri thread vedono i dati
+    salvati finché la scrittura atomica non è riuscita.
+    """
+
+    def __init__(self, path, encoding='utf-8'):
+        """
+        Inizializza lo storage senza aprire il file
+
+        Args:
+            path (str): Percorso del file JSON
+            encoding (str): Codifica del file
+        """
+        self.path = path
+        self.encoding = encoding
+        self._data = None
+        self._signature = None
+        self._writer = None  # thread che esegue la transazione in corso
+        self._pending = None  # copia dei dati modificata dalla transazione
+        self._dirty = False
+
+    def _stat_signature(self):
+        """
+        Firma del file su disco usata per riconoscere le modifiche
+
+        Returns:
+            tuple: (inode, dimensione, mtime in ns) o None se il file non esiste
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def changed(self):
+        """
+        Indica se il file è stato modificato dopo l'ultima lettura o scrittura
+
+        Returns:
+            bool: True se i dati in memoria non sono aggiornati
+        """
+        return self._data is None or self._stat_signature() != self._signature
+
+    def reload(self):
+        """
+        Rilegge il file dal disco
+
+        Returns:
+            None
+        """
+        signature = self._stat_signature()
+        if signature is None:
+            self._data, self._signature = {}, None
+            return
+
+        with open(self.path, 'r', encoding=self.encoding) as f:
+            content = f.read()
+        self._data = json.loads(content) if content.strip() else {}
+        self._signature = signature
+
+    def begin(self):
+        """
+        Inizia una transazione nel thread corrente: write() salva solo in
+        memoria, su una copia dei dati, fino a flush()
+
+        Returns:
+            None
+        """
+        self._writer = threading.get_ident()
+        self._pending = None
+        self._dirty = False
+
+    def end(self):
+        """
+        Chiude la transazione scartando le modifiche non salvate con flush()
+
+        Returns:
+            None
+        """
+        self._writer = None
+        self._pending = None
+        self._dirty = False
+
+    def in_transaction(self):
+        """
+        Indica se il thread corrente sta eseguendo una transazione
+
+        Returns:
+            bool: True dentro begin/end
+        """
+        return self._writer == threading.get_ident()
+
+    def read(self):
+        """
+        Restituisce i dati del database (in memoria dopo la prima lettura)
+
+        Returns:
+            dict: Tabelle del database (la copia di lavoro durante una transazione)
+        """
+        if self.in_transaction():
+            if self._pending is None:
+                # TinyDB modifica i dati letti: mai quelli visti dai lettori
+                self._pending = copy.deepcopy(self._committed())
+            return self._pending
+        return self._committed()
+
+    def _committed(self):
+        """
+        Dati salvati su disco, letti dal file alla prima richiesta
+
+        Returns:
+            dict: Tabelle del database
+        """
+        data = self._data
+        if data is None:
+            self.reload()
+            data = self._data
+        return data
+
+    def write(self, data):
+        """
+        Salva i dati sostituendo il file in modo atomico
+
+        Args:
+            data (dict): Tabelle del database
+
+        Returns:
+            None
+        """
+        if self.in_transaction():
+            self._pending = data
+            self._dirty = True
+            return
+        self._write_file(data)
+
+    def flush(self):
+        """
+        Scrive sul file le modifiche della transazione e le rende visibili ai lettori
+
+        Returns:
+            None
+        """
+        if self._dirty:
+            self._write_file(self._pending)
+
+    def _write_file(self, data):
+        """
+        Scrive i dati su un file temporaneo e lo sostituisce all'originale
+
+        Args:
+            data (dict): Tabelle del database
+
+        Returns:
+            None
+        """
+        tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding=self.encoding) as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Su Windows la sostituzione fallisce se un lettore ha il file aperto
+        for attempt in range(50):
+            try:
+                os.replace(tmp_path, self.path)
+                break
+            except PermissionError:
+                if attempt == 49:
+                    os.remove(tmp_path)
+                    raise
+                time.sleep(0.01)
+
+        # Solo dopo la sostituzione riuscita i lettori vedono i nuovi dati
+        self._signature = self._stat_signature()
+        self._data = data
+        self._dirty = False
+
+    def close(self):
+        """
+        Nessun file resta aperto tra le operazioni
+
+        Returns:
+            None
+        """
+        pass
+
+
+class SharedTable(Table):
+    """
+    Tabella TinyDB che può essere modificata anche da altri processi
+    """
+
+    def search(self, cond):
+        """
+        Cerca i documenti che soddisfano la condizione
+
+        Dentro una transazione i risultati non vengono messi nella cache delle
+        query, condivisa con i lettori: conterrebbero dati non ancora salvati.
+
+        Args:
+            cond (Query): Condizione di ricerca
+
+        Returns:
+            list: Documenti trovati
+        """
+        if not self._storage.in_transaction():
+            return super().search(cond)
+        return [
+            self.document_class(doc, self.document_id_class(doc_id))
+            for doc_id, doc in self._read_table().items()
+            if cond(doc)
+        ]
+
+    def reset(self):
+        """
+        Scarta la cache delle query e il prossimo id calcolato in memoria,
+        non più validi dopo una modifica del file da parte di un altro processo
+
+        Returns:
+            None
+        """
+        self.clear_cache()
+        self._next_id = None
+
+
+class SharedTinyDB(TinyDB):
+    """
+    TinyDB con tabelle SharedTable
+    """
+    table_class = SharedTable
+
 
 class TinyDBManager:
     """
     Classe per gestire le operazioni con TinyDB
+
+    Le operazioni di scrittura acquisiscono un lock esclusivo sul file
+    '<db_path>.lock' e rileggono il database se un altro processo lo ha
+    modificato; le letture non usano il lock.
     """
     
     def __init__(self, db_path='database/local_db.json'):
@@ -23,11 +279,63 @@ class TinyDBManager:
         # Crea la directory se non esiste
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
-        self.db = TinyDB(db_path)
+        self.db = SharedTinyDB(db_path, storage=AtomicJSONStorage)
+        self.storage = self.db.storage
+        self.lock = FileLock(f'{db_path}.lock')
+        self._depth = 0  # livello di annidamento di transaction()
         self.students_table = self.db.table('students')
         self.interrogations_table = self.db.table('interrogations')
         self.configurations_table = self.db.table('configurations')
     
+    def _refresh(self):
+        """
+        Ricarica il database se il file è stato modificato da un altro processo
+        
+        Returns:
+            None
+        """
+        if self.storage.changed():
+            self.storage.reload()
+            for table in (self.students_table, self.interrogations_table, self.configurations_table):
+                table.reset()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Contesto di scrittura: lock esclusivo tra processi e dati aggiornati
+        
+        Le operazioni eseguite nel contesto sono salvate con un'unica scrittura
+        del file all'uscita, oppure annullate tutte se si verifica un errore.
+        I contesti annidati fanno parte di quello più esterno.
+        
+        Yields:
+            None
+        """
+        with self.lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            
+            self._refresh()
+            self._depth = 1
+            self.storage.begin()
+            try:
+                yield
+                self.storage.flush()
+            except BaseException:
+                # Le modifiche erano solo nella copia di lavoro: basta scartarla,
+                # insieme ai prossimi id calcolati su di essa
+                for table in (self.students_table, self.interrogations_table, self.configurations_table):
+                    table.reset()
+                raise
+            finally:
+                self.storage.end()
+                self._depth = 0
+    
     # ========== OPERAZIONI STUDENTI ==========
     
     def add_student(self, registro_num, nome, cognome):
@@ -42,13 +350,14 @@ class TinyDBManager:
         Returns:
             int: ID del documento inserito
         """
-        student = {
-            'registro_num': registro_num,
-            'nome': nome,
-            'cognome': cognome,
-            'created_at': datetime.now().isoformat()
-        }
-        return self.students_table.insert(student)
+        with self.transaction():
+            student = {
+                'registro_num': registro_num,
+                'nome': nome,
+                'cognome': cognome,
+                'created_at': datetime.now().isoformat()
+            }
+            return self.students_table.insert(student)
     
     def get_all_students(self):
         """
@@ -57,6 +366,7 @@ class TinyDBManager:
         Returns:
             list: Lista di tutti gli studenti
         """
+        self._refresh()
         return self.students_table.all()
     
     def get_student_by_registro(self, registro_num):
@@ -69,6 +379,7 @@ class TinyDBManager:
         Returns:
             dict: Dati dello studente o None
         """
+        self._refresh()
         Student = Query()
         return self.students_table.get(Student.registro_num == registro_num)
     
@@ -84,14 +395,15 @@ class TinyDBManager:
         Returns:
             list: Lista di IDs aggiornati
         """
-        Student = Query()
-        updates = {}
-        if nome:
-            updates['nome'] = nome
-        if cognome:
-            updates['cognome'] = cognome
-        
-        return self.students_table.update(updates, Student.registro_num == registro_num)
+        with self.transaction():
+            Student = Query()
+            updates = {}
+            if nome:
+                updates['nome'] = nome
+            if cognome:
+                updates['cognome'] = cognome
+            
+            return self.students_table.update(updates, Student.registro_num == registro_num)
     
     def delete_student(self, registro_num):
         """
@@ -103,8 +415,9 @@ class TinyDBManager:
         Returns:
             list: Lista di IDs eliminati
         """
-        Student = Query()
-        return self.students_table.remove(Student.registro_num == registro_num)
+        with self.transaction():
+            Student = Query()
+            return self.students_table.remove(Student.registro_num == registro_num)
     
     def clear_students(self):
         """
@@ -113,7 +426,8 @@ class TinyDBManager:
         Returns:
             None
         """
-        self.students_table.truncate()
+        with self.transaction():
+            self.students_table.truncate()
     
     def import_students_bulk(self, students_list):
         """
@@ -125,9 +439,10 @@ class TinyDBManager:
         Returns:
             list: Lista di IDs inseriti
         """
-        for student in students_list:
-            student['created_at'] = datetime.now().isoformat()
-        return self.students_table.insert_multiple(students_list)
+        with self.transaction():
+            for student in students_list:
+                student['created_at'] = datetime.now().isoformat()
+            return self.students_table.insert_multiple(students_list)
     
     # ========== OPERAZIONI INTERROGAZIONI ==========
     
@@ -145,15 +460,16 @@ class TinyDBManager:
         Returns:
             int: ID del documento inserito
         """
-        interrogation = {
-            'materia': materia,
-            'registro_num': registro_num,
-            'lezione_num': lezione_num,
-            'ordine': ordine,
-            'data_lezione': data_lezione,
-            'created_at': datetime.now().isoformat()
-        }
-        return self.interrogations_table.insert(interrogation)
+        with self.transaction():
+            interrogation = {
+                'materia': materia,
+                'registro_num': registro_num,
+                'lezione_num': lezione_num,
+                'ordine': ordine,
+                'data_lezione': data_lezione,
+                'created_at': datetime.now().isoformat()
+            }
+            return self.interrogations_table.insert(interrogation)
     
     def get_all_interrogations(self):
         """
@@ -162,6 +478,7 @@ class TinyDBManager:
         Returns:
             list: Lista di tutte le interrogazioni
         """
+        self._refresh()
         return self.interrogations_table.all()
     
     def get_interrogations_by_materia(self, materia):
@@ -174,6 +491,7 @@ class TinyDBManager:
         Returns:
             list: Lista di interrogazioni
         """
+        self._refresh()
         Interrogation = Query()
         return self.interrogations_table.search(Interrogation.materia == materia)
     
@@ -187,6 +505,7 @@ class TinyDBManager:
         Returns:
             list: Lista di interrogazioni
         """
+        self._refresh()
         Interrogation = Query()
         return self.interrogations_table.search(Interrogation.lezione_num == lezione_num)
     
@@ -201,7 +520,8 @@ class TinyDBManager:
         Returns:
             list: Lista di IDs aggiornati
         """
-        return self.interrogations_table.update(kwargs, doc_ids=[doc_id])
+        with self.transaction():
+            return self.interrogations_table.update(kwargs, doc_ids=[doc_id])
     
     def delete_interrogation(self, doc_id):
         """
@@ -213,7 +533,8 @@ class TinyDBManager:
         Returns:
             list: Lista di IDs eliminati
         """
-        return self.interrogations_table.remove(doc_ids=[doc_id])
+        with self.transaction():
+            return self.interrogations_table.remove(doc_ids=[doc_id])
     
     def clear_interrogations(self):
         """
@@ -222,7 +543,8 @@ class TinyDBManager:
         Returns:
             None
         """
-        self.interrogations_table.truncate()
+        with self.transaction():
+            self.interrogations_table.truncate()
     
     def import_interrogations_bulk(self, interrogations_list):
         """
@@ -234,9 +556,10 @@ class TinyDBManager:
         Returns:
             list: Lista di IDs inseriti
         """
-        for interrogation in interrogations_list:
-            interrogation['created_at'] = datetime.now().isoformat()
-        return self.interrogations_table.insert_multiple(interrogations_list)
+        with self.transaction():
+            for interrogation in interrogations_list:
+                interrogation['created_at'] = datetime.now().isoformat()
+            return self.interrogations_table.insert_multiple(interrogations_list)
     
     # ========== OPERAZIONI CONFIGURAZIONI ==========
     
@@ -252,13 +575,14 @@ class TinyDBManager:
         Returns:
             int: ID del documento inserito
         """
-        config = {
-            'materia': materia,
-            'num_lezioni': num_lezioni,
-            'distribuzione': json.dumps(distribuzione) if not isinstance(distribuzione, str) else distribuzione,
-            'created_at': datetime.now().isoformat()
-        }
-        return self.configurations_table.insert(config)
+        with self.transaction():
+            config = {
+                'materia': materia,
+                'num_lezioni': num_lezioni,
+                'distribuzione': json.dumps(distribuzione) if not isinstance(distribuzione, str) else distribuzione,
+                'created_at': datetime.now().isoformat()
+            }
+            return self.configurations_table.insert(config)
     
     def get_latest_configuration(self):
         """
@@ -267,6 +591,7 @@ class TinyDBManager:
         Returns:
             dict: Ultima configurazione o None
         """
+        self._refresh()
         configs = self.configurations_table.all()
         return configs[-1] if configs else None
     
@@ -277,6 +602,7 @@ class TinyDBManager:
         Returns:
             list: Lista di configurazioni
         """
+        self._refresh()
         return self.configurations_table.all()
     
     # ========== UTILITÀ ==========
@@ -292,6 +618,7 @@ class TinyDBManager:
             bool: True se successo
         """
         try:
+            self._refresh()
             data = {
                 'students': self.students_table.all(),
                 'interrogations': self.interrogations_table.all(),
@@ -320,14 +647,15 @@ class TinyDBManager:
             with open(filepath, 'r', encoding='utf-8') as f:
                 data = json.load(f)
             
-            if 'students' in data:
-                self.students_table.insert_multiple(data['students'])
-            
-            if 'interrogations' in data:
-                self.interrogations_table.insert_multiple(data['interrogations'])
-            
-            if 'configurations' in data:
-                self.configurations_table.insert_multiple(data['configurations'])
+            with self.transaction():
+                if 'students' in data:
+                    self.students_table.insert_multiple(data['students'])
+                
+                if 'interrogations' in data:
+                    self.interrogations_table.insert_multiple(data['interrogations'])
+                
+                if 'configurations' in data:
+                    self.configurations_table.insert_multiple(data['configurations'])
             
             return True
         except Exception as e:
@@ -0,0 +1,175 @@
+"""
+Notifiche in tempo reale delle modifiche al calendario (Server-Sent Events)
+Broker in memoria che distribuisce gli eventi di una materia a tutti i client
+in ascolto; ogni client ha una coda limitata e non usa connessioni al database
+"""
+import queue
+import threading
+import time
+
+from .json_provider import dumps as json_dumps
+
+
+class EventBroker:
+    """
+    Classe per distribuire eventi SSE ai client iscritti a una materia
+
+    Il messaggio SSE è serializzato una sola volta alla pubblicazione e la
+    stessa stringa viene accodata a ogni iscritto. Un client troppo lento
+    (coda piena) riceve un evento 'reset' e deve ricaricare il calendario.
+
+    Ogni flusso aperto occupa un thread del worker: le connessioni sono
+    limitate a max_connections e chiuse dopo max_lifetime secondi (il browser
+    si riconnette da solo e recupera le modifiche perse con since=).
+    """
+
+    def __init__(self, queue_size=100, heartbeat=15, max_connections=2, max_lifetime=300):
+        """
+        Inizializza il broker
+
+        Args:
+            queue_size (int): Eventi massimi in attesa per ogni client
+            heartbeat (int): Secondi tra due commenti di keep-alive
+            max_connections (int): Flussi aperti contemporaneamente nel processo (0 = nessun limite)
+            max_lifetime (int): Secondi dopo i quali un flusso viene chiuso (0 = nessun limite)
+        """
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.max_connections = max_connections
+        self.max_lifetime = max_lifetime
+
+        # materia -> insieme delle code dei client iscritti
+        self._subscribers = {}
+        self._connections = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def format_event(event, data, event_id=None):
+        """
+        Formatta un messaggio nel protocollo Server-Sent Events
+
+        Args:
+            event (str): Tipo di evento
+            data: Dati serializzabili in JSON
+            event_id (optional): Identificativo dell'evento (campo id:)
+
+        Returns:
+            str: Messaggio SSE
+        """
+        message = f'event: {event}\n'
+        if event_id is not None:
+            message += f'id: {event_id}\n'
+        return message + f"data: {json_dumps(data).decode('utf-8')}\n\n"
+
+    def subscribe(self, materia):
+        """
+        Iscrive un nuovo client agli eventi di una materia
+
+        Args:
+            materia (str): Nome materia
+
+        Returns:
+            Queue: Coda da cui leggere i messaggi, o None se il limite di
+                   connessioni è raggiunto
+        """
+        subscription = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if self.max_connections and self._connections >= self.max_connections:
+                return None
+            self._subscribers.setdefault(materia, set()).add(subscription)
+            self._connections += 1
+        return subscription
+
+    def unsubscribe(self, materia, subscription):
+        """
+        Rimuove l'iscrizione di un client
+
+        Args:
+            materia (str): Nome materia
+            subscription (Queue): Coda restituita da subscribe
+
+        Returns:
+            None
+        """
+        with self._lock:
+            subscribers = self._subscribers.get(materia)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._connections -= 1
+                if not subscribers:
+                    del self._subscribers[materia]
+
+    def has_subscribers(self, materia):
+        """
+        Indica se qualche client è in ascolto sulla materia
+
+        Args:
+            materia (str): Nome materia
+
+        Returns:
+            bool: True se c'è almeno un iscritto
+        """
+        with self._lock:
+            return bool(self._subscribers.get(materia))
+
+    def publish(self, materia, event, data, event_id=None):
+        """
+        Invia un evento a tutti i client iscritti alla materia
+
+        Args:
+            materia (str): Nome materia
+            event (str): Tipo di evento
+            data: Dati serializzabili in JSON
+            event_id (optional): Identificativo dell'evento
+
+        Returns:
+            int: Numero di client raggiunti
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(materia, ()))
+        if not subscribers:
+            return 0
+
+        message = self.format_event(event, data, event_id)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                # Client troppo lento: scarta gli eventi in coda e chiede un ricaricamento
+                with subscription.mutex:
+                    subscription.queue.clear()
+                subscription.put_nowait(self.format_event('reset', {'materia': materia}))
+        return len(subscribers)
+
+    def stream(self, materia, subscription):
+        """
+        Generatore dei messaggi SSE per un client
+
+        L'iscrizione dura finché il generatore è attivo: termina dopo
+        max_lifetime secondi oppure quando il server lo chiude perché il
+        client si è disconnesso.
+
+        Args:
+            materia (str): Nome materia
+            subscription (Queue): Coda restituita da subscribe
+
+        Yields:
+            str: Messaggi SSE, con keep-alive periodici
+        """
+        deadline = time.monotonic() + self.max_lifetime if self.max_lifetime else None
+        try:
+            # Ritardo di riconnessione suggerito al browser
+            yield 'retry: 3000\n\n'
+            while True:
+                timeout = self.heartbeat
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    timeout = min(timeout, remaining)
+                try:
+                    yield subscription.get(timeout=timeout)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            self.unsubscribe(materia, subscription)
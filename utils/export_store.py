@@ -0,0 +1,213 @@
+"""
+Archivio gestito dei file esportati
+Deduplica le esportazioni tramite hash del contenuto e limita lo spazio su disco
+con eliminazione LRU dei file meno usati
+"""
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# Nomi dei file scritti dall'archivio: hash SHA-256 esadecimale ed estensione
+STORE_FILE_NAME = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]+$')
+
+
+class ExportStore:
+    """
+    Classe per gestire la cartella delle esportazioni come cache su disco
+
+    Ogni file è identificato dall'hash SHA-256 del suo contenuto sorgente
+    (formato, materia e righe esportate): la stessa esportazione richiesta più
+    volte viene generata una sola volta e poi servita dal disco.
+
+    L'indice e il limite di spazio sono di ogni processo: con più worker
+    gunicorn che condividono la cartella l'occupazione può arrivare a
+    WSGI_WORKERS × max_bytes.
+    """
+
+    def __init__(self, folder, max_bytes=50 * 1024 * 1024):
+        """
+        Inizializza l'archivio e indicizza i file già presenti
+
+        Args:
+            folder (str): Cartella delle esportazioni
+            max_bytes (int): Dimensione massima totale dei file su disco
+        """
+        # Percorso assoluto: send_file risolve i percorsi relativi dalla root dell'app
+        self.folder = os.path.abspath(folder)
+        os.makedirs(self.folder, exist_ok=True)
+
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_on_disk = 0
+
+        # nome file -> dimensione, dal meno al più recentemente usato
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _scan(self):
+        """
+        Indicizza i file presenti nella cartella ordinandoli per ultimo utilizzo
+
+        Solo i file con il nome generato dall'archivio: gli altri file della
+        cartella (es. vecchie esportazioni) non vengono mai eliminati.
+
+        Returns:
+            None
+        """
+        files = []
+        for name in os.listdir(self.folder):
+            if not STORE_FILE_NAME.match(name):
+                continue
+            path = os.path.join(self.folder, name)
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name, stat.st_size))
+
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.bytes_on_disk += size
+
+        self._evict()
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        Calcola la chiave di contenuto di un'esportazione
+
+        Args:
+            *parts: Elementi che determinano il contenuto (formato, materia, righe...)
+
+        Returns:
+            str: Hash SHA-256 esadecimale
+        """
+        payload = json.dumps(parts, ensure_ascii=False, default=str, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_or_create(self, key, extension, render):
+        """
+        Restituisce il file associato alla chiave, generandolo solo se assente
+
+        Args:
+            key (str): Chiave di contenuto (vedi make_key)
+            extension (str): Estensione del file ('csv', 'json', 'pdf')
+            render (callable): Funzione senza argomenti che restituisce i bytes del file
+
+        Returns:
+            str: Percorso del file su disco
+        """
+        return self._get_or_create(key, extension, render, lambda path: path)
+
+    def open(self, key, extension, render):
+        """
+        Come get_or_create, ma restituisce il file già aperto in lettura
+
+        Il file è aperto prima di rilasciare il lock: se subito dopo viene
+        eliminato (LRU di questo o di un altro worker) resta leggibile.
+
+        Args:
+            key (str): Chiave di contenuto (vedi make_key)
+            extension (str): Estensione del file ('csv', 'json', 'pdf')
+            render (callable): Funzione senza argomenti che restituisce i bytes del file
+
+        Returns:
+            file: File binario aperto in lettura (da chiudere dal chiamante)
+        """
+        return self._get_or_create(key, extension, render, lambda path: open(path, 'rb'))
+
+    def _get_or_create(self, key, extension, render, opener):
+        """
+        Cerca o genera il file e lo passa a opener tenendo il lock
+
+        Args:
+            key (str): Chiave di contenuto
+            extension (str): Estensione del file
+            render (callable): Funzione che restituisce i bytes del file
+            opener (callable): Riceve il percorso e restituisce il risultato
+
+        Returns:
+            Risultato di opener
+        """
+        name = f'{key}.{extension}'
+        path = os.path.join(self.folder, name)
+
+        with self._lock:
+            if name in self._entries:
+                try:
+                    os.utime(path)  # Mantiene l'ordine LRU anche dopo un riavvio
+                    result = opener(path)
+                except FileNotFoundError:
+                    # Eliminato da un altro worker: va rigenerato
+                    self.bytes_on_disk -= self._entries.pop(name)
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(name)
+                    return result
+
+        # Generazione fuori dal lock: può essere lenta (es. PDF)
+        content = render()
+
+        with self._lock:
+            self.misses += 1
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+            self.bytes_on_disk -= self._entries.pop(name, 0)
+            self._entries[name] = len(content)
+            self.bytes_on_disk += len(content)
+            self._evict(keep=name)
+            return opener(path)
+
+    def _evict(self, keep=None):
+        """
+        Elimina i file meno usati finché la dimensione totale rientra nel limite
+
+        Args:
+            keep (str, optional): File da non eliminare (appena creato)
+
+        Returns:
+            None
+        """
+        while self.bytes_on_disk > self.max_bytes and self._entries:
+            name, size = next(iter(self._entries.items()))
+            if name == keep:
+                if len(self._entries) == 1:
+                    break
+                self._entries.move_to_end(name)
+                continue
+
+            del self._entries[name]
+            self.bytes_on_disk -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                # Già eliminato da un altro worker, o aperto (Windows): resta su disco
+                pass
+
+    def stats(self):
+        """
+        Restituisce i contatori dell'archivio
+
+        Returns:
+            dict: Hit, miss, eliminazioni e occupazione su disco
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 3) if total else 0.0,
+                'evictions': self.evictions,
+                'files': len(self._entries),
+                'bytes_on_disk': self.bytes_on_disk,
+                'max_bytes': self.max_bytes
+            }
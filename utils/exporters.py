@@ -0,0 +1,436 @@
+"""
+Generazione dei file di esportazione del calendario interrogazioni
+Le funzioni lavorano su righe semplici (dizionari) e non sugli oggetti ORM,
+così possono essere eseguite anche in processi separati
+"""
+import os
+import csv
+import zipfile
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from datetime import datetime
+from io import StringIO, BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .helpers import sanitize_filename
+from .json_provider import dumps as json_dumps
+
+# Pool di processi condiviso per le esportazioni (creato al primo utilizzo)
+_process_pool = None
+_process_pool_workers = None
+_process_pool_lock = threading.Lock()
+
+
+def interrogation_row(interr):
+    """
+    Converte un'interrogazione in una riga esportabile
+
+    Args:
+        interr (Interrogation): Oggetto Interrogation con lo studente caricato
+
+    Returns:
+        dict: Riga con i campi usati dagli export
+    """
+    return {
+        'materia': interr.materia,
+        'lezione_num': interr.lezione_num,
+        'data_lezione': interr.data_lezione,
+        'ordine': interr.ordine,
+        'registro_num': interr.student.registro_num,
+        'nome': interr.student.nome,
+        'cognome': interr.student.cognome
+    }
+
+
+def group_by_lezione(rows):
+    """
+    Raggruppa le righe per numero di lezione
+
+    Args:
+        rows (list): Righe ordinate per lezione e ordine
+
+    Returns:
+        dict: Struttura {lezione_num: [righe]}
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault(row['lezione_num'], []).append(row)
+    return groups
+
+
+def render_json(materia, rows):
+    """
+    Genera l'esportazione JSON raggruppata per estrazione
+
+    Args:
+        materia (str): Nome materia
+        rows (list): Righe delle interrogazioni
+
+    Returns:
+        bytes: Contenuto del file JSON
+    """
+    groups = group_by_lezione(rows)
+    data = {
+        'materia': materia,
+        'data_export': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'estrazioni': [
+            {
+                'lezione': lezione_num,
+                'data': groups[lezione_num][0]['data_lezione'],
+                'studenti': [
+                    {
+                        'ordine': row['ordine'],
+                        'registro_num': row['registro_num'],
+                        'nome': row['nome'],
+                        'cognome': row['cognome']
+                    }
+                    for row in groups[lezione_num]
+                ]
+            }
+            for lezione_num in sorted(groups.keys())
+        ]
+    }
+    return json_dumps(data, indent=True)
+
+
+def render_csv(materia, rows):
+    """
+    Genera l'esportazione CSV
+
+    Args:
+        materia (str): Nome materia
+        rows (list): Righe delle interrogazioni
+
+    Returns:
+        bytes: Contenuto del file CSV
+    """
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['Lezione', 'Data', 'Ordine', 'Registro', 'Nome', 'Cognome'])
+
+    for row in rows:
+        writer.writerow([
+            row['lezione_num'],
+            row['data_lezione'].strftime('%Y-%m-%d') if row['data_lezione'] else '',
+            row['ordine'],
+            row['registro_num'],
+            row['nome'],
+            row['cognome']
+        ])
+
+    return output.getvalue().encode('utf-8')
+
+
+def render_pdf(materia, rows):
+    """
+    Genera l'esportazione PDF con una tabella per ogni estrazione
+
+    Args:
+        materia (str): Nome materia
+        rows (list): Righe delle interrogazioni
+
+    Returns:
+        bytes: Contenuto del file PDF
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm,
+                            topMargin=2*cm, bottomMargin=2*cm)
+
+    elements = []
+    styles = getSampleStyleSheet()
+
+    # Titolo
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#2c3e50'),
+        spaceAfter=30,
+        alignment=1  # Center
+    )
+    elements.append(Paragraph(f"Calendario Interrogazioni - {materia}", title_style))
+    elements.append(Paragraph(f"Esportato il: {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+                              styles['Normal']))
+    elements.append(Spacer(1, 0.5*cm))
+
+    header_style = ParagraphStyle(
+        'GroupHeader',
+        parent=styles['Heading2'],
+        fontSize=14,
+        textColor=colors.HexColor('#3498db'),
+        spaceAfter=10
+    )
+
+    # Crea tabelle per ogni gruppo
+    groups = group_by_lezione(rows)
+    for lezione_num in sorted(groups.keys()):
+        data_lezione = groups[lezione_num][0]['data_lezione']
+        data_str = data_lezione.strftime('%d/%m/%Y') if data_lezione else 'Data non assegnata'
+        elements.append(Paragraph(f"Estrazione {lezione_num} - {data_str}", header_style))
+
+        # Tabella studenti
+        table_data = [['#', 'Registro', 'Nome', 'Cognome']]
+        for row in groups[lezione_num]:
+            table_data.append([
+                str(row['ordine']),
+                str(row['registro_num']),
+                row['nome'],
+                row['cognome']
+            ])
+
+        table = Table(table_data, colWidths=[1.5*cm, 2*cm, 6*cm, 6*cm])
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#ecf0f1')])
+        ]))
+
+        elements.append(table)
+        elements.append(Spacer(1, 0.8*cm))
+
+    # Statistiche finali
+    studenti_unici = len(set(row['registro_num'] for row in rows))
+    elements.append(Paragraph(
+        f"<b>Statistiche:</b><br/>"
+        f"• Totale interrogazioni: {len(rows)}<br/>"
+        f"• Numero lezioni: {len(groups)}<br/>"
+        f"• Studenti coinvolti: {studenti_unici}",
+        styles['Normal']
+    ))
+
+    # Genera PDF
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def render_student_agenda(student, rows):
+    """
+    Genera l'agenda personale di uno studente con tutte le sue interrogazioni
+
+    Args:
+        student (dict): Dati studente (registro_num, nome, cognome)
+        rows (list): Righe delle interrogazioni dello studente (tutte le materie)
+
+    Returns:
+        tuple: (nome file, contenuto PDF in bytes, numero di pagine)
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm,
+                            topMargin=2*cm, bottomMargin=2*cm)
+
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'AgendaTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#2c3e50'),
+        spaceAfter=10,
+        alignment=1  # Center
+    )
+
+    elements = [
+        Paragraph("Agenda Interrogazioni", title_style),
+        Paragraph(f"{student['cognome']} {student['nome']} - Registro n. {student['registro_num']}", styles['Heading3']),
+        Paragraph(f"Generata il: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']),
+        Spacer(1, 0.5*cm)
+    ]
+
+    # Prima le lezioni con data (in ordine cronologico), poi quelle ancora da programmare
+    ordered = sorted(rows, key=lambda r: (r['data_lezione'] is None, r['data_lezione'] or datetime.min.date(),
+                                          r['materia'], r['lezione_num']))
+
+    table_data = [['Data', 'Materia', 'Lezione', 'Ordine']]
+    for row in ordered:
+        table_data.append([
+            row['data_lezione'].strftime('%d/%m/%Y') if row['data_lezione'] else 'Da definire',
+            row['materia'],
+            str(row['lezione_num']),
+            str(row['ordine'])
+        ])
+
+    table = Table(table_data, colWidths=[3*cm, 7*cm, 2.5*cm, 2.5*cm])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (2, 0), (-1, -1), 'CENTER'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#ecf0f1')])
+    ]))
+    elements.append(table)
+
+    doc.build(elements)
+
+    filename = sanitize_filename(
+        f"agenda_{student['registro_num']:03d}_{student['cognome']}_{student['nome']}.pdf".replace(' ', '_')
+    )
+    return filename, buffer.getvalue(), doc.page
+
+
+# Renderer disponibili per formato: (funzione, content type)
+RENDERERS = {
+    'json': (render_json, 'application/json; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+    'pdf': (render_pdf, 'application/pdf')
+}
+
+
+def render_export(format_type, materia, rows):
+    """
+    Genera un'esportazione nel formato richiesto (eseguibile in un processo separato)
+
+    Args:
+        format_type (str): 'json', 'csv' o 'pdf'
+        materia (str): Nome materia
+        rows (list): Righe delle interrogazioni
+
+    Returns:
+        bytes: Contenuto del file
+    """
+    return RENDERERS[format_type][0](materia, rows)
+
+
+def _pool_context():
+    """
+    Contesto multiprocessing per il pool: i worker gunicorn sono multithread,
+    quindi i processi non vengono creati con fork ma da un forkserver
+    (spawn dove forkserver non è disponibile)
+
+    Returns:
+        BaseContext: Contesto multiprocessing
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def get_process_pool(max_workers=None):
+    """
+    Restituisce il pool di processi condiviso per le esportazioni
+
+    Il pool viene ricreato se cambia il numero di processi richiesto o se
+    il precedente è stato scartato da discard_process_pool.
+
+    Args:
+        max_workers (int, optional): Numero di processi (default: numero di CPU)
+
+    Returns:
+        ProcessPoolExecutor: Pool di processi
+    """
+    global _process_pool, _process_pool_workers
+    workers = max_workers or os.cpu_count() or 1
+
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_workers != workers:
+            if _process_pool is not None:
+                # I lavori già inviati al vecchio pool vengono completati
+                _process_pool.shutdown(wait=False)
+            _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+            _process_pool_workers = workers
+        return _process_pool
+
+
+def discard_process_pool(pool):
+    """
+    Scarta il pool condiviso (es. dopo BrokenProcessPool): la prossima
+    chiamata a get_process_pool ne crea uno nuovo
+
+    Args:
+        pool (ProcessPoolExecutor): Pool da scartare
+    """
+    global _process_pool, _process_pool_workers
+
+    with _process_pool_lock:
+        if _process_pool is not pool:
+            return
+        _process_pool = None
+        _process_pool_workers = None
+    pool.shutdown(wait=False)
+
+
+@contextmanager
+def process_pool(max_workers=None):
+    """
+    Usa il pool condiviso, scartandolo se un processo termina in modo anomalo
+
+    Args:
+        max_workers (int, optional): Numero di processi (default: numero di CPU)
+
+    Yields:
+        ProcessPoolExecutor: Pool di processi
+    """
+    pool = get_process_pool(max_workers)
+    try:
+        yield pool
+    except BrokenProcessPool:
+        discard_process_pool(pool)
+        raise
+
+
+class _ZipStreamBuffer:
+    """
+    Buffer di sola scrittura usato da zipfile per produrre l'archivio a blocchi
+    """
+
+    def __init__(self):
+        self._data = bytearray()
+        self._position = 0
+
+    def write(self, data):
+        self._data.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """
+        Restituisce e svuota i bytes accumulati
+
+        Returns:
+            bytes: Dati scritti dall'ultima chiamata
+        """
+        chunk = bytes(self._data)
+        self._data.clear()
+        return chunk
+
+
+def stream_zip(entries):
+    """
+    Produce un archivio ZIP a blocchi man mano che i file sono disponibili
+
+    Args:
+        entries (iterable): Coppie (nome file, contenuto in bytes)
+
+    Yields:
+        bytes: Blocchi dell'archivio ZIP
+    """
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in entries:
+            archive.writestr(name, content)
+            yield buffer.drain()
+    yield buffer.drain()
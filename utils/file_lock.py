@@ -0,0 +1,118 @@
+"""
+Lock tra processi basato su file
+Usa fcntl.flock su Linux/Mac e msvcrt.locking su Windows; un lock interno
+serializza anche i thread dello stesso processo
+"""
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Classe per un lock esclusivo condiviso tra processi e thread
+
+    Il lock è rientrante nello stesso thread. Il file viene aperto solo
+    mentre il lock è acquisito: nessun descrittore è ereditato dai processi
+    creati con fork (es. worker di gunicorn con preload).
+    """
+
+    def __init__(self, path):
+        """
+        Inizializza il lock
+
+        Args:
+            path (str): Percorso del file di lock (creato se non esiste)
+        """
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._fd = None
+        self._depth = 0
+
+    def acquire(self):
+        """
+        Acquisisce il lock, attendendo se è già preso da un altro processo o thread
+
+        Returns:
+            None
+        """
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                self._lock_fd(self._fd)
+            except BaseException:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        """
+        Rilascia il lock
+
+        Returns:
+            None
+        """
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                self._unlock_fd(self._fd)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._thread_lock.release()
+
+    @staticmethod
+    def _lock_fd(fd):
+        """
+        Blocca il file in modo esclusivo (chiamata bloccante)
+
+        Args:
+            fd (int): Descrittore del file di lock
+
+        Returns:
+            None
+        """
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            return
+
+        # msvcrt.locking(LK_LOCK) rinuncia dopo 10 tentativi: riprova finché riesce
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    @staticmethod
+    def _unlock_fd(fd):
+        """
+        Sblocca il file
+
+        Args:
+            fd (int): Descrittore del file di lock
+
+        Returns:
+            None
+        """
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
@@ -0,0 +1,111 @@
+"""
+Provider JSON veloce per le risposte Flask
+Usa orjson (se installato), che serializza date e datetime in modo nativo;
+altrimenti ricade sul modulo json standard con lo stesso formato di output
+"""
+import json
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson è opzionale
+    orjson = None
+
+
+def _default(obj):
+    """
+    Serializza i tipi non supportati nativamente (date in ISO 8601)
+
+    Args:
+        obj: Oggetto da serializzare
+
+    Returns:
+        Valore serializzabile
+    """
+    if isinstance(obj, date):
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj)
+
+
+def dumps(obj, indent=False):
+    """
+    Serializza un oggetto in JSON UTF-8
+
+    Le chiavi non stringa (es. i numeri di lezione) sono convertite in stringa
+    e date/datetime in ISO 8601, con o senza orjson.
+
+    Args:
+        obj: Oggetto da serializzare
+        indent (bool): Indenta l'output di 2 spazi
+
+    Returns:
+        bytes: JSON codificato in UTF-8
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+    return json.dumps(
+        obj,
+        default=_default,
+        ensure_ascii=False,
+        indent=2 if indent else None,
+        separators=None if indent else (',', ':')
+    ).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Provider JSON dell'applicazione, usato da jsonify e request.get_json
+    """
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        """
+        Serializza un oggetto in stringa JSON
+
+        Args:
+            obj: Oggetto da serializzare
+            **kwargs: Argomenti di json.dumps (se presenti si usa il modulo standard)
+
+        Returns:
+            str: Stringa JSON
+        """
+        if not kwargs or set(kwargs) <= {'indent', 'separators'}:
+            return dumps(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        """
+        Deserializza una stringa o bytes JSON
+
+        Args:
+            s (str|bytes): JSON da leggere
+            **kwargs: Argomenti di json.loads
+
+        Returns:
+            Oggetto Python
+        """
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        """
+        Crea la risposta JSON serializzando direttamente in bytes
+
+        Returns:
+            Response: Risposta con mimetype application/json
+        """
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(dumps(obj, indent=indent) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,319 @@
+"""
+Metriche delle richieste HTTP e delle query SQL in formato Prometheus
+Per ogni route registra la latenza (istogramma), i codici di stato, il numero
+di query SQL e il tempo passato nel database; le query sono contate tramite
+gli eventi dell'engine SQLAlchemy
+"""
+import time
+import bisect
+import weakref
+import threading
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Limiti superiori dei bucket degli istogrammi
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Etichetta delle richieste che non corrispondono a nessuna route (es. 404)
+UNMATCHED_ROUTE = 'unmatched'
+
+
+class Histogram:
+    """
+    Istogramma cumulativo in stile Prometheus (conteggi per bucket, somma, totale)
+    """
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        """
+        Inizializza l'istogramma vuoto
+
+        Args:
+            buckets (tuple): Limiti superiori dei bucket, in ordine crescente
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        Registra un valore
+
+        Args:
+            value (float): Valore osservato
+
+        Returns:
+            None
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        Conteggi cumulativi per bucket, come li espone Prometheus
+
+        Returns:
+            list: Coppie (limite superiore, osservazioni <= limite)
+        """
+        result, total = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+def _escape(value):
+    """
+    Applica l'escape di Prometheus al valore di un'etichetta
+
+    Args:
+        value (str): Valore dell'etichetta
+
+    Returns:
+        str: Valore sicuro tra virgolette
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    """
+    Formatta le etichette di una serie
+
+    Returns:
+        str: Etichette nel formato {nome="valore",...}
+    """
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _number(value):
+    """
+    Formatta un numero nel formato testuale di Prometheus
+
+    Args:
+        value (float): Valore
+
+    Returns:
+        str: Numero formattato
+    """
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class RequestMetrics:
+    """
+    Classe per raccogliere le metriche delle richieste dell'applicazione Flask
+
+    Sul percorso della richiesta fa solo poche operazioni in memoria; il testo
+    per Prometheus viene costruito solo quando viene letto /metrics. Le metriche
+    sono del singolo processo: con più worker ognuno espone le proprie.
+    """
+
+    def __init__(self, app=None):
+        """
+        Inizializza le metriche vuote
+
+        Args:
+            app (Flask, optional): Applicazione da configurare
+        """
+        self.enabled = False
+        self.started_at = time.time()
+
+        # (route, metodo) -> istogrammi; (route, metodo, stato) -> contatore
+        self._latency = {}
+        self._queries = {}
+        self._db_seconds = {}
+        self._statuses = {}
+        # Query eseguite fuori da una richiesta (avvio, thread in background)
+        self._background_queries = 0
+        self._background_db_seconds = 0.0
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Registra gli hook sull'applicazione e gli eventi sugli engine SQLAlchemy
+
+        Args:
+            app (Flask): Applicazione Flask
+
+        Returns:
+            None
+        """
+        if not app.config.get('METRICS_ENABLED', False):
+            return
+        self.enabled = True
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+        # Una sola registrazione per processo anche con più applicazioni
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _collectors.add(self)
+
+    def _before_request(self):
+        """
+        Avvia il cronometro e i contatori della richiesta
+        """
+        g._metrics_start = time.perf_counter()
+        g._metrics_queries = 0
+        g._metrics_db_seconds = 0.0
+        g._metrics_status = 500
+
+    def _after_request(self, response):
+        """
+        Memorizza il codice di stato della risposta
+        """
+        g._metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc=None):
+        """
+        Registra la richiesta terminata (anche dopo after_request e compressione)
+        """
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+
+        rule = request.url_rule
+        route = rule.rule if rule is not None else UNMATCHED_ROUTE
+        key = (route, request.method)
+        status = 500 if exc is not None else g._metrics_status
+
+        with self._lock:
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = Histogram(LATENCY_BUCKETS)
+                self._queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+                self._db_seconds[key] = 0.0
+            latency.observe(elapsed)
+            self._queries[key].observe(g._metrics_queries)
+            self._db_seconds[key] += g._metrics_db_seconds
+
+            status_key = key + (status,)
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+    def record_background_query(self, seconds):
+        """
+        Registra una query SQL eseguita fuori da una richiesta
+
+        Args:
+            seconds (float): Durata della query
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._background_queries += 1
+            self._background_db_seconds += seconds
+
+    def render(self):
+        """
+        Esporta le metriche nel formato testuale di Prometheus (versione 0.0.4)
+
+        Returns:
+            str: Testo per l'endpoint /metrics
+        """
+        with self._lock:
+            latency = {key: (list(h.cumulative()), h.sum, h.count) for key, h in self._latency.items()}
+            queries = {key: (list(h.cumulative()), h.sum, h.count) for key, h in self._queries.items()}
+            db_seconds = dict(self._db_seconds)
+            statuses = dict(self._statuses)
+            background = (self._background_queries, self._background_db_seconds)
+
+        lines = [
+            '# HELP http_requests_total Richieste HTTP per route, metodo e codice di stato',
+            '# TYPE http_requests_total counter'
+        ]
+        for (route, method, status), count in sorted(statuses.items()):
+            lines.append(f'http_requests_total{_labels(route=route, method=method, status=status)} {count}')
+
+        self._render_histogram(
+            lines, 'http_request_duration_seconds',
+            'Durata delle richieste HTTP in secondi', latency
+        )
+        self._render_histogram(
+            lines, 'http_request_db_queries',
+            'Query SQL eseguite per richiesta', queries
+        )
+
+        lines += [
+            '# HELP http_request_db_seconds_total Tempo passato nelle query SQL per route',
+            '# TYPE http_request_db_seconds_total counter'
+        ]
+        for (route, method), seconds in sorted(db_seconds.items()):
+            lines.append(f'http_request_db_seconds_total{_labels(route=route, method=method)} {_number(seconds)}')
+
+        lines += [
+            '# HELP db_background_queries_total Query SQL eseguite fuori dalle richieste',
+            '# TYPE db_background_queries_total counter',
+            f'db_background_queries_total {background[0]}',
+            '# HELP db_background_seconds_total Tempo delle query SQL eseguite fuori dalle richieste',
+            '# TYPE db_background_seconds_total counter',
+            f'db_background_seconds_total {_number(background[1])}',
+            '# HELP process_start_time_seconds Avvio del processo (epoch in secondi)',
+            '# TYPE process_start_time_seconds gauge',
+            f'process_start_time_seconds {_number(self.started_at)}'
+        ]
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histogram(lines, name, description, histograms):
+        """
+        Aggiunge le righe di un istogramma per tutte le route
+
+        Args:
+            lines (list): Righe di output, aggiornate sul posto
+            name (str): Nome della metrica
+            description (str): Testo di HELP
+            histograms (dict): (route, metodo) -> (bucket cumulativi, somma, totale)
+
+        Returns:
+            None
+        """
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} histogram')
+        for (route, method), (buckets, total_sum, count) in sorted(histograms.items()):
+            for bound, cumulative in buckets:
+                lines.append(f'{name}_bucket{_labels(route=route, method=method, le=_number(bound))} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(route=route, method=method, le="+Inf")} {count}')
+            lines.append(f'{name}_sum{_labels(route=route, method=method)} {_number(total_sum)}')
+            lines.append(f'{name}_count{_labels(route=route, method=method)} {count}')
+
+
+# Raccoglitori attivi nel processo (uno per applicazione, di solito uno solo)
+_collectors = weakref.WeakSet()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+
+    # Durante una richiesta i contatori stanno in g: nessun lock sul percorso caldo
+    if has_request_context() and '_metrics_start' in g:
+        g._metrics_queries += 1
+        g._metrics_db_seconds += elapsed
+    else:
+        for collector in _collectors:
+            collector.record_background_query(elapsed)
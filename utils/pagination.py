@@ -0,0 +1,129 @@
+"""
+Paginazione keyset (a cursore) per le query SQLAlchemy
+Ogni pagina riparte dall'ultima chiave letta invece che da un offset,
+quindi le pagine profonde costano quanto la prima
+"""
+import json
+import base64
+
+from sqlalchemy import and_, or_
+
+# Elementi per pagina se il client passa solo il cursore, e massimo consentito
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(values):
+    """
+    Codifica la chiave dell'ultimo elemento in un cursore opaco
+
+    Args:
+        values (list): Valori delle colonne di ordinamento
+
+    Returns:
+        str: Cursore base64 url-safe
+    """
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def column_type(column):
+    """
+    Tipo Python dei valori di una colonna di ordinamento
+
+    Args:
+        column (Column): Colonna SQLAlchemy
+
+    Returns:
+        type: Tipo Python (object se il tipo SQL non lo dichiara)
+    """
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return object
+
+
+def decode_cursor(cursor, columns):
+    """
+    Decodifica un cursore prodotto da encode_cursor
+
+    Ogni valore deve avere il tipo della colonna corrispondente: un cursore
+    manomesso non deve arrivare alla query.
+
+    Args:
+        cursor (str): Cursore ricevuto dal client
+        columns (list): Colonne di ordinamento attese
+
+    Returns:
+        list: Valori delle colonne di ordinamento
+
+    Raises:
+        ValueError: Se il cursore non è valido
+    """
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, TypeError):
+        raise ValueError('Cursore non valido')
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Cursore non valido')
+
+    for value, column in zip(values, columns):
+        expected = column_type(column)
+        # bool è una sottoclasse di int, ma non è una chiave valida
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise ValueError('Cursore non valido')
+    return values
+
+
+def keyset_filter(columns, values):
+    """
+    Costruisce la condizione "riga successiva a values" nell'ordine di columns
+
+    Usa la forma espansa (a > x) OR (a = x AND b > y) ... che sia MySQL sia
+    SQLite risolvono con una scansione di intervallo sull'indice composto.
+
+    Args:
+        columns (list): Colonne di ordinamento (tutte ascendenti)
+        values (list): Valori dell'ultima riga letta
+
+    Returns:
+        ColumnElement: Condizione SQLAlchemy
+    """
+    clauses = []
+    for i, column in enumerate(columns):
+        equals = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equals, column > values[i]))
+    return or_(*clauses)
+
+
+def paginate_keyset(query, columns, limit, cursor=None):
+    """
+    Restituisce una pagina di risultati e il cursore della pagina successiva
+
+    Args:
+        query (Query): Query SQLAlchemy già filtrata
+        columns (list): Colonne di ordinamento, l'ultima deve essere univoca
+        limit (int): Numero di elementi per pagina
+        cursor (str, optional): Cursore restituito dalla pagina precedente
+
+    Returns:
+        tuple: (lista elementi, cursore successivo o None)
+
+    Raises:
+        ValueError: Se il cursore non è valido
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if cursor:
+        query = query.filter(keyset_filter(columns, decode_cursor(cursor, columns)))
+
+    # Un elemento in più dice se esiste una pagina successiva
+    items = query.order_by(*columns).limit(limit + 1).all()
+    if len(items) <= limit:
+        return items, None
+
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor(getattr(last, column.key) for column in columns)
@@ -0,0 +1,211 @@
+"""
+Profilazione su richiesta delle singole richieste HTTP
+Una richiesta con l'header X-Profile e il token di amministrazione corretto
+(X-Admin-Token) viene eseguita sotto cProfile; il profilo è salvato su disco
+e il suo id restituito nell'header X-Profile-Id della risposta
+"""
+import os
+import hmac
+import time
+import uuid
+import cProfile
+import threading
+
+from flask import g, request
+
+
+# Header della richiesta e della risposta
+PROFILE_HEADER = 'X-Profile'
+TOKEN_HEADER = 'X-Admin-Token'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+PROFILE_STATUS_HEADER = 'X-Profile-Status'
+
+
+class RequestProfiler:
+    """
+    Classe per profilare richieste scelte dall'amministratore
+
+    Disattivata se PROFILING_TOKEN è vuoto. Per non degradare il servizio
+    ogni processo profila una sola richiesta alla volta e al massimo una
+    ogni PROFILING_MIN_INTERVAL secondi; le altre richieste con X-Profile
+    sono servite normalmente con X-Profile-Status: rate-limited.
+    """
+
+    def __init__(self, app=None):
+        """
+        Inizializza il profilatore
+
+        Args:
+            app (Flask, optional): Applicazione da configurare
+        """
+        self.token = ''
+        self.folder = None
+        self.min_interval = 10.0
+        self.max_files = 50
+        self.profiled = 0
+        self.rate_limited = 0
+
+        self._lock = threading.Lock()
+        self._active = False
+        self._last_started = 0.0
+
+        if app is not None:
+            self.init_app(app)
+
+    @property
+    def enabled(self):
+        """
+        Il profilatore è attivo solo se è configurato un token
+        """
+        return bool(self.token)
+
+    def init_app(self, app):
+        """
+        Registra gli hook sull'applicazione
+
+        Args:
+            app (Flask): Applicazione Flask
+
+        Returns:
+            None
+        """
+        self.token = app.config.get('PROFILING_TOKEN', '')
+        if not self.enabled:
+            return
+
+        self.folder = os.path.abspath(app.config.get('PROFILING_FOLDER', 'profiles'))
+        self.min_interval = app.config.get('PROFILING_MIN_INTERVAL', 10.0)
+        self.max_files = app.config.get('PROFILING_MAX_FILES', 50)
+        os.makedirs(self.folder, exist_ok=True)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def check_token(self, token):
+        """
+        Verifica il token di amministrazione (confronto a tempo costante)
+
+        Args:
+            token (str): Token ricevuto
+
+        Returns:
+            bool: True se il profilatore è attivo e il token è corretto
+        """
+        # Confronto sui byte: compare_digest rifiuta le stringhe con caratteri non ASCII
+        return self.enabled and bool(token) and hmac.compare_digest(
+            token.encode('utf-8'), self.token.encode('utf-8')
+        )
+
+    def _acquire(self):
+        """
+        Riserva l'unico slot di profilazione del processo, se il limite lo consente
+
+        Returns:
+            bool: True se la richiesta può essere profilata
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._active or now - self._last_started < self.min_interval:
+                self.rate_limited += 1
+                return False
+            self._active = True
+            self._last_started = now
+            return True
+
+    def _release(self):
+        """
+        Libera lo slot di profilazione
+        """
+        with self._lock:
+            self._active = False
+
+    def _before_request(self):
+        """
+        Avvia il profilo se la richiesta lo chiede con un token valido
+        """
+        if PROFILE_HEADER not in request.headers:
+            return
+
+        if not self.check_token(request.headers.get(TOKEN_HEADER, '')):
+            g._profile_status = 'unauthorized'
+            return
+        if not self._acquire():
+            g._profile_status = 'rate-limited'
+            return
+
+        profile = cProfile.Profile()
+        g._profile = profile
+        profile.enable()
+
+    def _after_request(self, response):
+        """
+        Ferma il profilo, lo salva su disco e ne restituisce l'id
+
+        Registrato per primo, è eseguito per ultimo tra gli after_request:
+        il profilo comprende anche gli altri hook (es. compressione).
+        """
+        status = g.pop('_profile_status', None)
+        profile = g.pop('_profile', None)
+
+        if profile is not None:
+            profile.disable()
+            try:
+                response.headers[PROFILE_ID_HEADER] = self._save(profile)
+                status = 'ok'
+                self.profiled += 1
+            finally:
+                self._release()
+
+        if status is not None:
+            response.headers[PROFILE_STATUS_HEADER] = status
+        return response
+
+    def _teardown_request(self, exc=None):
+        """
+        Libera lo slot se la richiesta è terminata senza passare da after_request
+        """
+        profile = g.pop('_profile', None)
+        if profile is not None:
+            profile.disable()
+            self._release()
+
+    def _save(self, profile):
+        """
+        Scrive il profilo in formato pstats ed elimina i più vecchi oltre il limite
+
+        Args:
+            profile (cProfile.Profile): Profilo fermato
+
+        Returns:
+            str: Id del profilo
+        """
+        endpoint = (request.endpoint or 'unmatched').replace('.', '_')
+        profile_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{endpoint}_{uuid.uuid4().hex[:8]}"
+        profile.dump_stats(os.path.join(self.folder, f'{profile_id}.prof'))
+
+        files = sorted(
+            (entry for entry in os.scandir(self.folder) if entry.name.endswith('.prof')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+        return profile_id
+
+    def get_path(self, profile_id):
+        """
+        Percorso del file di un profilo salvato
+
+        Args:
+            profile_id (str): Id restituito in X-Profile-Id
+
+        Returns:
+            str: Percorso del file o None se non esiste (o id non valido)
+        """
+        if not self.enabled or not profile_id.replace('_', '').isalnum():
+            return None
+        path = os.path.join(self.folder, f'{profile_id}.prof')
+        return path if os.path.isfile(path) else None
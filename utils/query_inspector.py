@@ -0,0 +1,196 @@
+"""
+Rilevatore di query N+1 per sviluppo e test
+Raggruppa le query SQL di ogni richiesta per forma normalizzata (valori e
+liste IN sostituiti da segnaposto): se la stessa forma si ripete più volte
+della soglia, segnala la route e la riga di codice che l'ha generata
+"""
+import os
+import re
+import warnings
+import traceback
+
+from flask import g, request, current_app, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Normalizzazione delle query: valori letterali e parametri diventano '?'
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAMETER = re.compile(r'%\(\w+\)s|%s|:\w+|\$\d+')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+_THIS_FILE = os.path.abspath(__file__)
+
+
+class NPlusOneWarning(UserWarning):
+    """
+    Avviso emesso quando una richiesta ripete la stessa query troppe volte
+    """
+
+
+class NPlusOneError(Exception):
+    """
+    Errore sollevato al posto dell'avviso in modalità test (NPLUSONE_RAISE)
+    """
+
+
+def normalize_statement(statement):
+    """
+    Riduce una query SQL alla sua forma, senza valori
+
+    Args:
+        statement (str): Query SQL
+
+    Returns:
+        str: Forma normalizzata (es. "SELECT ... WHERE students.id = ?")
+    """
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _PARAMETER.sub('?', shape)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _WHITESPACE.sub(' ', shape).strip()
+    return _IN_LIST.sub('(?...)', shape)
+
+
+class NPlusOneDetector:
+    """
+    Classe per rilevare le query ripetute (N+1) durante le richieste
+
+    Attivo di default con DEBUG o TESTING; con TESTING solleva NPlusOneError
+    invece di emettere un avviso, così i test falliscono.
+    """
+
+    def __init__(self, app=None):
+        """
+        Inizializza il rilevatore
+
+        Args:
+            app (Flask, optional): Applicazione da configurare
+        """
+        self.enabled = False
+        self.threshold = 10
+        self.raise_errors = False
+        self.root_path = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Registra gli hook sull'applicazione e l'evento sugli engine SQLAlchemy
+
+        Args:
+            app (Flask): Applicazione Flask
+
+        Returns:
+            None
+        """
+        enabled = app.config.get('NPLUSONE_ENABLED')
+        self.enabled = (app.debug or app.testing) if enabled is None else enabled
+        if not self.enabled:
+            return
+
+        self.threshold = app.config.get('NPLUSONE_THRESHOLD', 10)
+        raise_errors = app.config.get('NPLUSONE_RAISE')
+        self.raise_errors = app.testing if raise_errors is None else raise_errors
+        self.root_path = os.path.abspath(app.root_path)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+        if not event.contains(Engine, 'before_cursor_execute', _record_statement):
+            event.listen(Engine, 'before_cursor_execute', _record_statement)
+
+    def _before_request(self):
+        """
+        Prepara il conteggio delle query della richiesta
+        """
+        g._nplusone_detector = self
+        g._nplusone_shapes = {}
+        g._nplusone_locations = {}
+
+    def _after_request(self, response):
+        """
+        Segnala le forme di query ripetute oltre la soglia
+
+        Args:
+            response (Response): Risposta da inviare
+
+        Returns:
+            Response: La stessa risposta
+
+        Raises:
+            NPlusOneError: Se NPLUSONE_RAISE è attivo e ci sono query ripetute
+        """
+        repeated = [
+            (count, shape) for shape, count in g.pop('_nplusone_shapes', {}).items()
+            if count > self.threshold
+        ]
+        if not repeated:
+            return response
+
+        locations = g.pop('_nplusone_locations', {})
+        repeated.sort(reverse=True)
+        messages = []
+        for count, shape in repeated:
+            location = locations.get(shape)
+            where = (f'{os.path.relpath(location[0], self.root_path)}:{location[1]} in {location[2]}'
+                     if location else 'posizione sconosciuta')
+            messages.append(
+                f'N+1 in {request.method} {request.path}: {count} query uguali da {where}\n    {shape}'
+            )
+        report = '\n'.join(messages)
+
+        if self.raise_errors:
+            raise NPlusOneError(report)
+        current_app.logger.warning(report)
+
+        # L'avviso punta alla riga dell'applicazione della query più ripetuta
+        location = locations.get(repeated[0][1])
+        if location:
+            warnings.warn_explicit(report, NPlusOneWarning, location[0], location[1])
+        else:
+            warnings.warn(report, NPlusOneWarning)
+        return response
+
+    def find_location(self):
+        """
+        Trova la riga di codice dell'applicazione che ha eseguito la query
+
+        Returns:
+            tuple: (file, riga, funzione) del frame più interno dell'applicazione, o None
+        """
+        for frame in reversed(traceback.extract_stack()):
+            # Codice generato a runtime (es. '<sqlalchemy generated ...>')
+            if frame.filename.startswith('<'):
+                continue
+            filename = os.path.abspath(frame.filename)
+            if filename == _THIS_FILE or not filename.startswith(self.root_path):
+                continue
+            if 'site-packages' in filename:
+                continue
+            return (filename, frame.lineno, frame.name)
+        return None
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    shapes = g.get('_nplusone_shapes')
+    if shapes is None:
+        return
+
+    # Solo le letture: il flush dell'ORM esegue un INSERT per riga quando deve
+    # leggere gli id generati, e non è un problema di caricamento
+    if statement.lstrip()[:6].upper() != 'SELECT':
+        return
+
+    shape = normalize_statement(statement)
+    count = shapes.get(shape, 0) + 1
+    shapes[shape] = count
+
+    # Lo stack viene letto una sola volta, quando la forma supera la soglia
+    detector = g._nplusone_detector
+    if count == detector.threshold + 1:
+        g._nplusone_locations[shape] = detector.find_location()
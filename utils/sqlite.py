@@ -0,0 +1,54 @@
+"""
+Impostazioni di SQLite per l'uso come database principale
+Ogni nuova connessione attiva il journal WAL (letture che non bloccano la
+scrittura e viceversa), l'attesa sul lock, i vincoli di chiave esterna e una
+cache più grande del default
+"""
+from sqlalchemy import event
+
+
+# PRAGMA applicati a ogni connessione (busy_timeout è aggiunto da configure_sqlite)
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),        # lettori e scrittore in parallelo, scritture sequenziali sul log
+    ('synchronous', 'NORMAL'),      # con WAL resta consistente anche dopo un crash, fsync solo al checkpoint
+    ('foreign_keys', 'ON'),         # come le FOREIGN KEY di schema.sql (in SQLite sono spente di default)
+    ('temp_store', 'MEMORY'),       # tabelle temporanee di ORDER BY/GROUP BY in memoria
+    ('cache_size', -20000),         # 20 MB di pagine in cache per connessione
+    ('mmap_size', 134217728),       # 128 MB letti tramite memory map
+)
+
+
+def is_sqlite_uri(uri):
+    """
+    Verifica se l'URI SQLAlchemy punta a un database SQLite
+
+    Args:
+        uri (str): SQLALCHEMY_DATABASE_URI
+
+    Returns:
+        bool: True per sqlite:// e varianti (es. sqlite+pysqlite://)
+    """
+    return uri.split(':', 1)[0].split('+', 1)[0] == 'sqlite'
+
+
+def configure_sqlite(engine, busy_timeout=5000):
+    """
+    Registra i PRAGMA sulle connessioni di un engine SQLite
+
+    Args:
+        engine (Engine): Engine SQLAlchemy (db.engine)
+        busy_timeout (int): Millisecondi di attesa quando un altro processo sta scrivendo
+
+    Returns:
+        None
+    """
+    pragmas = SQLITE_PRAGMAS + (('busy_timeout', int(busy_timeout)),)
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
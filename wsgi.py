@@ -0,0 +1,21 @@
+"""
+Punto di ingresso WSGI per i server di produzione
+Uso: gunicorn -c gunicorn.conf.py wsgi:app (vedi DEPLOY.md)
+"""
+import os
+import sys
+
+# In produzione la configurazione di default è 'production' (DEBUG disattivato)
+os.environ.setdefault('FLASK_CONFIG', 'production')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from utils.app_loader import load_app_module
+
+main = load_app_module()
+
+# Applicazione creata da create_app con la configurazione scelta
+app = main.create_app()
+main.init_database(app)